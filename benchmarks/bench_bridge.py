@@ -0,0 +1,269 @@
+"""Load and latency benchmark of the STT Bridge providers.
+
+Drives the real TTS and STT providers of a config entry against the local
+fake bridge from the tests. Needs the test requirements
+(pytest-homeassistant-custom-component). Run from the repository root:
+
+    python -m benchmarks.bench_bridge [--requests 200] [--concurrency 8]
+        [--tts-latency 0.05] [--stt-latency 0.1] [--jitter 0.02]
+        [--failure-rate 0] [--audio-seconds 2] [--realtime]
+        [--stt-transport auto|websocket|http]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from dataclasses import dataclass, field
+import time
+
+from homeassistant import loader
+from homeassistant.components import stt
+from homeassistant.components.tts import TTSAudioRequest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+import numpy as np
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from custom_components.sttbridge.const import (
+    CONF_CACHE_DISK_MB,
+    CONF_PARTIAL_STABLE_MS,
+    CONF_STT_MULTIPLEX,
+    CONF_STT_TRANSPORT,
+    DOMAIN,
+    STT_TRANSPORTS,
+    TRANSPORT_AUTO,
+)
+from custom_components.sttbridge.stt import STTBridgeSTTProvider
+from custom_components.sttbridge.tests.fake_bridge import (
+    FakeBridge,
+    FakeBridgeConfig,
+)
+from custom_components.sttbridge.tts import STTBridgeProvider
+
+SAMPLE_RATE = 16000
+CHUNK_MS = 20
+METADATA = stt.SpeechMetadata(
+    language="en-US",
+    format=stt.AudioFormats.WAV,
+    codec=stt.AudioCodecs.PCM,
+    bit_rate=stt.AudioBitRates.BITRATE_16,
+    sample_rate=stt.AudioSampleRates.SAMPLERATE_16000,
+    channel=stt.AudioChannels.CHANNEL_MONO,
+)
+
+
+@dataclass
+class Samples:
+    """Timings of one kind of request."""
+
+    latency: list[float] = field(default_factory=list)
+    ttfb: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+
+def _percentiles(values: list[float]) -> str:
+    """Return p50/p95/p99 of values in milliseconds."""
+    if not values:
+        return "-"
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return f"p50 {p50:7.1f}  p95 {p95:7.1f}  p99 {p99:7.1f} ms"
+
+
+def _report(name: str, samples: Samples, ttfb_label: str) -> None:
+    """Print the results of one kind of request."""
+    count = len(samples.latency) + samples.errors
+    print(
+        f"{name}: {count} requests, {samples.errors} errors, "
+        f"{count / samples.elapsed:.1f} req/s"
+    )
+    print(f"  latency        {_percentiles(samples.latency)}")
+    print(f"  {ttfb_label:<14} {_percentiles(samples.ttfb)}")
+
+
+async def _run_concurrently(
+    requests: int, concurrency: int, func: Callable[[int], Awaitable[None]]
+) -> float:
+    """Run func(0..requests-1) with bounded concurrency, return the wall time."""
+
+    async def worker(first: int) -> None:
+        for index in range(first, requests, concurrency):
+            await func(index)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(first) for first in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def _bench_tts(
+    provider: STTBridgeProvider, requests: int, concurrency: int
+) -> Samples:
+    """Measure streaming TTS latency and time to first audio byte."""
+    samples = Samples()
+
+    async def request(index: int) -> None:
+        async def message() -> AsyncGenerator[str, None]:
+            # Unique text so every request reaches the bridge
+            yield f"Benchmark sentence number {index}, the front door is open."
+
+        start = time.perf_counter()
+        first: float | None = None
+        try:
+            response = await provider.async_stream_tts_audio(
+                TTSAudioRequest(language="en-US", options={}, message_gen=message())
+            )
+            async for _chunk in response.data_gen:
+                if first is None:
+                    first = time.perf_counter() - start
+        except HomeAssistantError:
+            samples.errors += 1
+            return
+        samples.latency.append(time.perf_counter() - start)
+        if first is not None:
+            samples.ttfb.append(first)
+
+    samples.elapsed = await _run_concurrently(requests, concurrency, request)
+    return samples
+
+
+async def _bench_stt(
+    provider: STTBridgeSTTProvider,
+    requests: int,
+    concurrency: int,
+    audio_seconds: float,
+    realtime: bool,
+) -> Samples:
+    """Measure STT latency, and time to the result after the audio ended."""
+    samples = Samples()
+    chunk = bytes(SAMPLE_RATE * CHUNK_MS // 1000 * 2)
+    chunks = int(audio_seconds * 1000 / CHUNK_MS)
+
+    async def request(_index: int) -> None:
+        audio_end = 0.0
+
+        async def audio() -> AsyncGenerator[bytes, None]:
+            nonlocal audio_end
+            for _ in range(chunks):
+                if realtime:
+                    await asyncio.sleep(CHUNK_MS / 1000)
+                yield chunk
+            audio_end = time.perf_counter()
+
+        start = time.perf_counter()
+        result = await provider.async_process_audio_stream(METADATA, audio())
+        end = time.perf_counter()
+        if result.result != stt.SpeechResultState.SUCCESS:
+            samples.errors += 1
+            return
+        samples.latency.append(end - start)
+        samples.ttfb.append(end - audio_end)
+
+    samples.elapsed = await _run_concurrently(requests, concurrency, request)
+    return samples
+
+
+async def _async_setup_entry(
+    hass: HomeAssistant, bridge: FakeBridge, stt_transport: str, stt_multiplex: bool
+) -> MockConfigEntry:
+    """Set up a config entry for the fake bridge."""
+    # Let the loader find the integration in the repository
+    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": bridge.host, "port": bridge.port},
+        # Keep the benchmark from writing cache files; wait for finals
+        options={
+            CONF_CACHE_DISK_MB: 0,
+            CONF_PARTIAL_STABLE_MS: 0,
+            CONF_STT_TRANSPORT: stt_transport,
+            CONF_STT_MULTIPLEX: stt_multiplex,
+        },
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+    bridge = FakeBridge(
+        FakeBridgeConfig(
+            tts_latency=args.tts_latency,
+            stt_latency=args.stt_latency,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+            stt_multiplex=args.stt_multiplex,
+        )
+    )
+    await bridge.start()
+    try:
+        async with async_test_home_assistant() as hass:
+            entry = await _async_setup_entry(
+                hass, bridge, args.stt_transport, args.stt_multiplex
+            )
+            data = hass.data[DOMAIN][entry.entry_id]
+            print(
+                f"{args.requests} requests at concurrency {args.concurrency}, "
+                f"bridge latency TTS {args.tts_latency * 1000:.0f} ms / "
+                f"STT {args.stt_latency * 1000:.0f} ms "
+                f"+ up to {args.jitter * 1000:.0f} ms jitter, "
+                f"failure rate {args.failure_rate:.0%}"
+            )
+            _report(
+                "TTS",
+                await _bench_tts(
+                    STTBridgeProvider(hass, data, entry),
+                    args.requests,
+                    args.concurrency,
+                ),
+                "first byte",
+            )
+            _report(
+                f"STT ({args.stt_transport}, {args.audio_seconds:.1f} s audio"
+                f"{', multiplexed' if args.stt_multiplex else ''}"
+                f"{', real time' if args.realtime else ''})",
+                await _bench_stt(
+                    STTBridgeSTTProvider(hass, data, entry),
+                    args.requests,
+                    args.concurrency,
+                    args.audio_seconds,
+                    args.realtime,
+                ),
+                "after audio",
+            )
+            await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await bridge.stop()
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tts-latency", type=float, default=0.05)
+    parser.add_argument("--stt-latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    parser.add_argument(
+        "--realtime", action="store_true", help="pace STT audio like a microphone"
+    )
+    parser.add_argument(
+        "--stt-transport", choices=[TRANSPORT_AUTO, *STT_TRANSPORTS], default=TRANSPORT_AUTO
+    )
+    parser.add_argument(
+        "--stt-multiplex",
+        action="store_true",
+        help="share one WebSocket between concurrent STT sessions",
+    )
+    asyncio.run(_async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Replay a recorded STT corpus and compare against the recorded transcripts.
+
+Streams every utterance of a corpus written with the ``stt_capture`` option
+through the STT provider of a config entry, at the recorded pace or faster,
+and reports latency percentiles and the word error rate against the finals
+that were recorded. Runs against a bridge server, or against the local fake
+bridge from the tests when no host is given. Needs the test requirements
+(pytest-homeassistant-custom-component). Run from the repository root:
+
+    python -m benchmarks.bench_replay CORPUS_DIR [--host HOST --port PORT]
+        [--token TOKEN] [--speed 1] [--concurrency 1] [--limit N]
+        [--stt-transport auto|websocket|http]
+
+CORPUS_DIR is ``.storage/sttbridge/stt_corpus/<entry_id>`` of the Home
+Assistant configuration the corpus was recorded in. A speed of 0 sends the
+audio as fast as possible.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+from pathlib import Path
+import time
+
+from homeassistant import loader
+from homeassistant.components import stt
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from benchmarks.bench_bridge import Samples, _percentiles, _report, _run_concurrently
+from custom_components.sttbridge.const import (
+    CONF_CACHE_DISK_MB,
+    CONF_STT_TRANSPORT,
+    DOMAIN,
+    STT_TRANSPORTS,
+    TRANSPORT_AUTO,
+)
+from custom_components.sttbridge.corpus import (
+    CorpusEntry,
+    CorpusReader,
+    word_error_rate,
+)
+from custom_components.sttbridge.stt import STTBridgeSTTProvider
+from custom_components.sttbridge.tests.fake_bridge import FakeBridge
+
+CHUNK_MS = 20
+
+
+@dataclass
+class Accuracy:
+    """Word errors against the recorded transcripts."""
+
+    edits: int = 0
+    words: int = 0
+    # Utterances whose transcript differs from the recorded one
+    changed: int = 0
+    compared: int = 0
+    # Recorded time to the final, for comparison with the replay
+    recorded: list[float] = field(default_factory=list)
+
+    @property
+    def wer(self) -> float:
+        """Return the word error rate over all compared utterances."""
+        return self.edits / self.words if self.words else 0.0
+
+
+async def _replay(
+    provider: STTBridgeSTTProvider,
+    reader: CorpusReader,
+    entries: list[CorpusEntry],
+    speed: float,
+    concurrency: int,
+) -> tuple[Samples, Accuracy]:
+    """Stream the entries through the provider."""
+    samples = Samples()
+    accuracy = Accuracy()
+
+    async def request(index: int) -> None:
+        entry = entries[index]
+        chunk_bytes = entry.sample_rate * CHUNK_MS // 1000 * 2 * entry.channels
+        audio_end = 0.0
+
+        async def audio() -> AsyncGenerator[bytes, None]:
+            nonlocal audio_end
+            with reader.audio(entry) as pcm:
+                start = time.perf_counter()
+                for offset in range(0, len(pcm), chunk_bytes):
+                    if speed:
+                        # Pace against the clock, so slow sends don't add up
+                        due = start + offset / chunk_bytes * CHUNK_MS / 1000 / speed
+                        if (delay := due - time.perf_counter()) > 0:
+                            await asyncio.sleep(delay)
+                    yield bytes(pcm[offset : offset + chunk_bytes])
+            audio_end = time.perf_counter()
+
+        start = time.perf_counter()
+        result = await provider.async_process_audio_stream(entry.metadata, audio())
+        end = time.perf_counter()
+        if result.result != stt.SpeechResultState.SUCCESS or result.text is None:
+            samples.errors += 1
+            return
+        samples.latency.append(end - start)
+        samples.ttfb.append(end - audio_end)
+        if entry.final is None:
+            return
+        edits, words = word_error_rate(entry.final, result.text)
+        accuracy.edits += edits
+        accuracy.words += words
+        accuracy.changed += bool(edits)
+        accuracy.compared += 1
+        if entry.latency is not None:
+            accuracy.recorded.append(entry.latency)
+
+    samples.elapsed = await _run_concurrently(len(entries), concurrency, request)
+    return samples, accuracy
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Run the replay."""
+    with CorpusReader(Path(args.corpus)) as reader:
+        entries = reader.entries[: args.limit] if args.limit else reader.entries
+        if not entries:
+            print(f"No recorded utterances in {args.corpus}")
+            return
+        bridge: FakeBridge | None = None
+        host, port = args.host, args.port
+        if host is None:
+            bridge = FakeBridge()
+            await bridge.start()
+            host, port = bridge.host, bridge.port
+        try:
+            async with async_test_home_assistant() as hass:
+                # Let the loader find the integration in the repository
+                hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+                entry = MockConfigEntry(
+                    domain=DOMAIN,
+                    data={"host": host, "port": port, "token": args.token},
+                    options={
+                        CONF_CACHE_DISK_MB: 0,
+                        CONF_STT_TRANSPORT: args.stt_transport,
+                    },
+                )
+                entry.add_to_hass(hass)
+                await hass.config_entries.async_setup(entry.entry_id)
+                await hass.async_block_till_done()
+                audio = sum(e.duration for e in entries)
+                print(
+                    f"{len(entries)} utterances ({audio:.1f} s of audio) "
+                    f"to {host}:{port} at "
+                    f"{f'{args.speed:g}x' if args.speed else 'full'} speed, "
+                    f"concurrency {args.concurrency}"
+                )
+                samples, accuracy = await _replay(
+                    STTBridgeSTTProvider(
+                        hass, hass.data[DOMAIN][entry.entry_id], entry
+                    ),
+                    reader,
+                    entries,
+                    args.speed,
+                    args.concurrency,
+                )
+                _report(f"STT ({args.stt_transport})", samples, "after audio")
+                print(f"  recorded       {_percentiles(accuracy.recorded)}")
+                print(
+                    f"  WER {accuracy.wer:.1%} over {accuracy.words} words, "
+                    f"{accuracy.changed} of {accuracy.compared} transcripts changed"
+                )
+                await hass.config_entries.async_unload(entry.entry_id)
+        finally:
+            if bridge is not None:
+                await bridge.stop()
+
+
+def main() -> None:
+    """Parse the arguments and run the replay."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", help="directory of the recorded corpus")
+    parser.add_argument("--host", help="bridge server, default a local fake bridge")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--token")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="1 is real time, 0 full speed"
+    )
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--limit", type=int, help="replay only the first utterances")
+    parser.add_argument(
+        "--stt-transport",
+        choices=[TRANSPORT_AUTO, *STT_TRANSPORTS],
+        default=TRANSPORT_AUTO,
+    )
+    asyncio.run(_async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
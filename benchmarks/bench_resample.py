@@ -0,0 +1,50 @@
+"""Micro-benchmark of the STT Bridge streaming resampler.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_resample [--seconds 60] [--chunk-ms 20]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from custom_components.sttbridge.audio import StreamingResampler
+
+TARGET_RATE = 16000
+# (input rate, channels) combinations voice satellites commonly deliver
+FORMATS = [(48000, 2), (48000, 1), (44100, 1), (22050, 1), (8000, 1)]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--chunk-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"audio: {args.seconds:.1f} s in {args.chunk_ms} ms chunks -> {TARGET_RATE} Hz mono")
+    for rate, channels in FORMATS:
+        samples = int(rate * args.seconds) * channels
+        audio = rng.normal(0, 3000, samples).astype("<i2").tobytes()
+        chunk_bytes = rate * args.chunk_ms // 1000 * channels * 2
+
+        resampler = StreamingResampler(rate, TARGET_RATE, channels)
+        start = time.perf_counter()
+        for offset in range(0, len(audio), chunk_bytes):
+            resampler.process(audio[offset : offset + chunk_bytes])
+        elapsed = time.perf_counter() - start
+
+        chunks = len(audio) / chunk_bytes
+        print(
+            f"{rate:>6} Hz {channels} ch: {elapsed * 1000:8.1f} ms total, "
+            f"{elapsed / chunks * 1e6:6.1f} us/chunk, "
+            f"real-time factor {elapsed / args.seconds:.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
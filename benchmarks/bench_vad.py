@@ -0,0 +1,48 @@
+"""Micro-benchmark of the STT Bridge voice activity detector.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_vad [--seconds 60] [--chunk-ms 100]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from custom_components.sttbridge.vad import FRAME_MS, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * args.seconds)) / SAMPLE_RATE
+    audio = (4000 * np.sin(2 * np.pi * 220 * t) + rng.normal(0, 200, len(t))).astype(
+        "<i2"
+    ).tobytes()
+    chunk_bytes = SAMPLE_RATE * args.chunk_ms // 1000 * 2
+
+    # Never end the stream so every frame is analysed
+    vad = VoiceActivityDetector(SAMPLE_RATE, trailing_silence_ms=10**9)
+    start = time.perf_counter()
+    for offset in range(0, len(audio), chunk_bytes):
+        vad.process(audio[offset : offset + chunk_bytes])
+    elapsed = time.perf_counter() - start
+
+    frames = args.seconds * 1000 / FRAME_MS
+    print(f"audio:            {args.seconds:.1f} s in {args.chunk_ms} ms chunks")
+    print(f"processing time:  {elapsed * 1000:.1f} ms")
+    print(f"per {FRAME_MS} ms frame:   {elapsed / frames * 1e6:.2f} us")
+    print(f"real-time factor: {elapsed / args.seconds:.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,272 @@
 """The STT Bridge integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Mapping
+from functools import partial
 import logging
+from pathlib import Path
+import shutil
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .cache import TTSAudioCache
+from .const import (
+    CACHE_DIR,
+    CONF_CACHE_DISK_MB,
+    CONF_CACHE_MEMORY_MB,
+    CONF_CACHE_TTL_HOURS,
+    CONF_PREWARM_RATE,
+    CONF_STT_CAPTURE,
+    CONF_STT_CAPTURE_MB,
+    CONF_STT_MULTIPLEX,
+    CONF_TIMEOUT_CONNECT,
+    CONF_WS_MAX_IDLE,
+    CONF_WS_PING_INTERVAL,
+    CONF_WS_POOL_SIZE,
+    CORPUS_DIR,
+    DEFAULT_CACHE_DISK_MB,
+    DEFAULT_CACHE_MEMORY_MB,
+    DEFAULT_CACHE_TTL_HOURS,
+    DEFAULT_PREWARM_RATE,
+    DEFAULT_STT_CAPTURE,
+    DEFAULT_STT_CAPTURE_MB,
+    DEFAULT_STT_MULTIPLEX,
+    DEFAULT_TIMEOUT_CONNECT,
+    DEFAULT_WS_MAX_IDLE,
+    DEFAULT_WS_PING_INTERVAL,
+    DEFAULT_WS_POOL_SIZE,
+    DOMAIN,
+)
+from .corpus import CorpusWriter
+from .health import HealthCoordinator
+from .metrics import STTBridgeMetrics
+from .models import STTBridgeData
+from .mux import STTMultiplexer
+from .pool import Backend, BackendPool, entry_endpoints
+from .prewarm import async_remove_registrations
+from .scheduler import RequestScheduler, limits_from_options
+from .services import async_setup_services
+from .state import BridgeStateStore, async_remove_state
+from .session import async_preconnect, create_bridge_session
+from .voices import VoiceCatalog
+from .ws_pool import STTWebSocketPool
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.TTS, Platform.STT]
+PLATFORMS: list[Platform] = [Platform.TTS, Platform.STT, Platform.SENSOR]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+def _cache_directory(hass: HomeAssistant, entry: ConfigEntry) -> Path:
+    """Return the TTS cache directory of a config entry."""
+    return Path(hass.config.path(".storage", DOMAIN, CACHE_DIR, entry.entry_id))
+
+
+def _corpus_directory(hass: HomeAssistant, entry: ConfigEntry) -> Path:
+    """Return the STT capture corpus directory of a config entry."""
+    return Path(hass.config.path(".storage", DOMAIN, CORPUS_DIR, entry.entry_id))
+
+
+def _cache_settings(options: Mapping[str, Any]) -> tuple[int, int, float | None]:
+    """Return the TTS cache budgets in bytes and the entry lifetime in seconds."""
+    ttl_hours = options.get(CONF_CACHE_TTL_HOURS, DEFAULT_CACHE_TTL_HOURS)
+    return (
+        options.get(CONF_CACHE_MEMORY_MB, DEFAULT_CACHE_MEMORY_MB) * 1024 * 1024,
+        options.get(CONF_CACHE_DISK_MB, DEFAULT_CACHE_DISK_MB) * 1024 * 1024,
+        ttl_hours * 3600 if ttl_hours else None,
+    )
+
+
+@callback
+def _async_configure_connections(
+    hass: HomeAssistant, data: STTBridgeData, options: Mapping[str, Any]
+) -> None:
+    """Set up, change or stop the STT WebSocket pools and the multiplexer.
+
+    Connections in use are never closed; they finish their utterance first.
+    """
+    size = options.get(CONF_WS_POOL_SIZE, DEFAULT_WS_POOL_SIZE)
+    max_idle = options.get(CONF_WS_MAX_IDLE, DEFAULT_WS_MAX_IDLE)
+    ping_interval = options.get(CONF_WS_PING_INTERVAL, DEFAULT_WS_PING_INTERVAL)
+    connect_timeout = options.get(CONF_TIMEOUT_CONNECT, DEFAULT_TIMEOUT_CONNECT)
+    for backend in data.pool.backends:
+        ws_pool = data.ws_pools.get(backend)
+        if ws_pool is None and size:
+            ws_pool = data.ws_pools[backend] = STTWebSocketPool(
+                hass,
+                data.session,
+                backend,
+                data.token,
+                size=size,
+                max_idle=max_idle,
+                ping_interval=ping_interval,
+                connect_timeout=connect_timeout,
+            )
+            ws_pool.async_start()
+        elif ws_pool is not None and not size:
+            del data.ws_pools[backend]
+            hass.async_create_background_task(
+                ws_pool.async_stop(), f"{DOMAIN} stop WebSocket pool"
+            )
+        elif ws_pool is not None:
+            ws_pool.async_configure(size, max_idle, ping_interval, connect_timeout)
+
+    multiplex = options.get(CONF_STT_MULTIPLEX, DEFAULT_STT_MULTIPLEX)
+    if data.mux is not None and not multiplex:
+        data.mux.async_retire()
+        data.mux = None
+    elif data.mux is not None and data.mux.ping_interval != ping_interval:
+        # The next sessions open connections with the new heartbeat
+        data.mux.ping_interval = ping_interval
+        data.mux.async_retire()
+    elif data.mux is None and multiplex:
+        data.mux = STTMultiplexer(
+            hass, data.session, data.token, ping_interval=ping_interval
+        )
+
+
+async def _async_stop_connections(data: STTBridgeData) -> None:
+    """Close the STT WebSocket pools and the multiplexed connections."""
+    for ws_pool in data.ws_pools.values():
+        await ws_pool.async_stop()
+    if data.mux is not None:
+        await data.mux.async_stop()
+
+
+@callback
+def _async_configure_capture(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: STTBridgeData,
+    options: Mapping[str, Any],
+) -> None:
+    """Start, pause or resize the recording of utterances."""
+    enabled = options.get(CONF_STT_CAPTURE, DEFAULT_STT_CAPTURE)
+    max_bytes = options.get(CONF_STT_CAPTURE_MB, DEFAULT_STT_CAPTURE_MB) * 1024 * 1024
+    if data.corpus is not None:
+        data.corpus.configure(enabled, max_bytes)
+    elif enabled:
+        data.corpus = CorpusWriter(hass, _corpus_directory(hass, entry), max_bytes)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the STT Bridge services."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up STT Bridge from a config entry."""
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = entry.data
+    options = entry.options
+    tts_cache = TTSAudioCache(
+        hass, _cache_directory(hass, entry), *_cache_settings(options)
+    )
+    # Start from the state of the last run; the bridge is probed in the
+    # background, so a sleeping bridge doesn't hold up setup
+    state = BridgeStateStore(hass, entry.entry_id)
+    await asyncio.gather(tts_cache.async_load(), state.async_load())
+
+    token = entry.data.get("token")
+    pool = BackendPool(
+        [
+            Backend(host, port, RequestScheduler.from_options(options))
+            for host, port in entry_endpoints(entry.data)
+        ]
+    )
+    metrics = STTBridgeMetrics()
+    session = create_bridge_session(options, metrics.http)
+    # Unload callbacks run last-in first-out, so the session is closed after
+    # everything that uses it has been stopped
+    entry.async_on_unload(session.close)
+    entry.async_create_background_task(
+        hass,
+        async_preconnect(session, pool, token, options),
+        f"{DOMAIN} pre-connect",
+    )
+
+    voices = VoiceCatalog(
+        hass, session, pool, token, on_update=state.async_schedule_save
+    )
+
+    @callback
+    def _async_capabilities_changed() -> None:
+        """Save the new capabilities, and offer multiplexing to every server."""
+        state.async_schedule_save()
+        runtime: STTBridgeData | None = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+        if runtime is not None and runtime.mux is not None:
+            runtime.mux.async_clear_unsupported()
+
+    health = HealthCoordinator(
+        hass, session, pool, token, on_update=_async_capabilities_changed
+    )
+    state.async_restore(health, voices)
+    voices.async_start()
+    entry.async_on_unload(voices.async_stop)
+    health.async_start()
+    entry.async_on_unload(health.async_stop)
+
+    data = STTBridgeData(
+        host=entry.data["host"],
+        port=entry.data["port"],
+        token=token,
+        pool=pool,
+        tts_cache=tts_cache,
+        voices=voices,
+        health=health,
+        session=session,
+        metrics=metrics,
+    )
+    _async_configure_connections(hass, data, options)
+    entry.async_on_unload(partial(_async_stop_connections, data))
+    _async_configure_capture(hass, entry, data, options)
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = data
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_update_options))
 
     return True
 
 
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running entry, without reloading it.
+
+    Everything the options flow offers either is read for every request
+    (timeouts, frame size, transport, VAD, ...) or is changed in place here,
+    so utterances and syntheses in progress carry on undisturbed.
+    """
+    data: STTBridgeData = hass.data[DOMAIN][entry.entry_id]
+    options = entry.options
+    capacity, limits = limits_from_options(options)
+    for backend in data.pool.backends:
+        backend.scheduler.configure(capacity, limits)
+    _async_configure_connections(hass, data, options)
+    _async_configure_capture(hass, entry, data, options)
+    if data.prewarm is not None:
+        data.prewarm.async_set_rate(
+            options.get(CONF_PREWARM_RATE, DEFAULT_PREWARM_RATE)
+        )
+    await data.tts_cache.async_configure(*_cache_settings(options))
+    _LOGGER.debug("Applied the options of %s", entry.title)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached audio, recordings and stored state of an entry."""
+    for directory in (_cache_directory(hass, entry), _corpus_directory(hass, entry)):
+        await hass.async_add_executor_job(shutil.rmtree, directory, True)
+    await async_remove_registrations(hass, entry.entry_id)
+    await async_remove_state(hass, entry.entry_id)
@@ -0,0 +1,174 @@
+"""PCM audio processing for STT Bridge."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import numpy as np
+
+# Length of the anti-aliasing filter applied before downsampling
+FILTER_TAPS = 31
+
+
+def lowpass_taps(cutoff: float, taps: int = FILTER_TAPS) -> np.ndarray:
+    """Return a Hamming windowed-sinc low-pass filter.
+
+    cutoff is in cycles per sample (0.5 is the Nyquist frequency).
+    """
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+
+class StreamingResampler:
+    """Convert interleaved 16-bit PCM to mono at another sample rate.
+
+    Works chunk by chunk: the filter history, the interpolation position and
+    any partial sample frame are carried over between calls, so the output is
+    the same as converting the whole stream at once without ever holding it.
+    Downsampling runs a windowed-sinc anti-aliasing filter before linear
+    interpolation.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1) -> None:
+        """Initialize the resampler."""
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self._frame_bytes = 2 * channels
+        self._step = in_rate / out_rate
+        self._remainder = b""
+        self._taps: np.ndarray | None = None
+        self._history = np.zeros(0, dtype=np.float32)
+        if out_rate < in_rate:
+            # Keep 10% headroom below the new Nyquist frequency
+            self._taps = lowpass_taps(0.45 * out_rate / in_rate)
+            self._history = np.zeros(FILTER_TAPS - 1, dtype=np.float32)
+        self._prev: np.ndarray | None = None
+        self._pos = 0.0
+
+    @property
+    def passthrough(self) -> bool:
+        """Return if the input already has the output format."""
+        return self.in_rate == self.out_rate and self.channels == 1
+
+    def process(self, chunk: bytes) -> bytes:
+        """Convert a chunk of input PCM and return the converted PCM."""
+        if self.passthrough:
+            return chunk
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return b""
+
+        samples = np.frombuffer(data, dtype="<i2", count=usable // 2)
+        if self.channels > 1:
+            mono = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        else:
+            mono = samples.astype(np.float32)
+
+        if self._taps is not None:
+            padded = np.concatenate((self._history, mono))
+            self._history = padded[-(FILTER_TAPS - 1) :]
+            mono = np.convolve(padded, self._taps, mode="valid").astype(np.float32)
+
+        if self.in_rate == self.out_rate:
+            out = mono
+        else:
+            out = self._interpolate(mono)
+        return np.clip(np.rint(out), -32768, 32767).astype("<i2").tobytes()
+
+    def _interpolate(self, mono: np.ndarray) -> np.ndarray:
+        """Linearly interpolate mono at the output rate, continuing the stream."""
+        # buf[0] is the last sample of the previous chunk, so output samples
+        # that fall between two chunks are interpolated correctly.
+        buf = mono if self._prev is None else np.concatenate((self._prev, mono))
+        last = len(buf) - 1
+        if last < 1 or self._pos >= last:
+            count = 0
+        else:
+            count = int(np.ceil((last - self._pos) / self._step))
+        positions = self._pos + self._step * np.arange(count)
+        index = positions.astype(np.intp)
+        frac = (positions - index).astype(np.float32)
+        out = buf[index] * (1 - frac) + buf[np.minimum(index + 1, last)] * frac
+        self._pos += self._step * count - last
+        self._prev = buf[-1:]
+        return out
+
+
+class FrameCoalescer:
+    """Cut a stream of PCM chunks into frames of a fixed size.
+
+    Chunk tails are collected in a preallocated buffer rather than by
+    concatenating bytes. Frames are memoryviews that are only valid until the
+    next frame is requested, so each one must be sent before iterating on.
+    """
+
+    def __init__(self, frame_bytes: int) -> None:
+        """Initialize the coalescer."""
+        self.frame_bytes = frame_bytes
+        self._buffer = memoryview(bytearray(frame_bytes))
+        self._fill = 0
+
+    def feed(self, chunk: bytes) -> Iterator[memoryview]:
+        """Add a chunk and yield every frame that is complete."""
+        size = self.frame_bytes
+        view = memoryview(chunk)
+        if self._fill:
+            take = min(len(view), size - self._fill)
+            self._buffer[self._fill : self._fill + take] = view[:take]
+            self._fill += take
+            view = view[take:]
+            if self._fill < size:
+                return
+            self._fill = 0
+            yield self._buffer
+        # Whole frames inside the chunk are sent without copying
+        while len(view) >= size:
+            yield view[:size]
+            view = view[size:]
+        if view:
+            self._buffer[: len(view)] = view
+            self._fill = len(view)
+
+    def flush(self) -> memoryview:
+        """Return the incomplete last frame and empty the buffer."""
+        frame = self._buffer[: self._fill]
+        self._fill = 0
+        return frame
+
+
+class ReplayBuffer:
+    """Record the frames of an utterance so they can be sent again.
+
+    The buffer is allocated once with room for a fixed amount of audio. An
+    utterance that doesn't fit can't be replayed from its start, so once the
+    buffer is full it stops recording and reports the overflow.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize the buffer."""
+        self._buffer = memoryview(bytearray(capacity))
+        self._size = 0
+        self.overflowed = capacity == 0
+
+    def __len__(self) -> int:
+        """Return the number of recorded bytes."""
+        return self._size
+
+    def append(self, frame: bytes | memoryview) -> None:
+        """Copy a frame into the buffer."""
+        if self.overflowed:
+            return
+        end = self._size + len(frame)
+        if end > len(self._buffer):
+            self.overflowed = True
+            return
+        self._buffer[self._size : end] = frame
+        self._size = end
+
+    def frames(self, frame_bytes: int) -> Iterator[memoryview]:
+        """Yield the recorded audio in frames of frame_bytes."""
+        for offset in range(0, self._size, frame_bytes):
+            yield self._buffer[offset : min(offset + frame_bytes, self._size)]
@@ -0,0 +1,289 @@
+"""TTS audio cache for STT Bridge."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".wav"
+
+# Options that change the synthesized audio and therefore belong in the key
+KEY_OPTIONS = ("voice", "rate", "pitch")
+
+
+def make_cache_key(
+    message: str,
+    language: str,
+    options: dict[str, Any] | None,
+    catalog_version: str | None,
+    variant: str | None = None,
+) -> str:
+    """Return the cache key for a synthesis request.
+
+    variant names the post-processing applied to the audio, if any.
+    """
+    options = options or {}
+    normalized = json.dumps(
+        [
+            message,
+            language,
+            *(options.get(option) for option in KEY_OPTIONS),
+            catalog_version,
+            *([variant] if variant is not None else []),
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters of a TTSAudioCache."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+    expired: int = 0
+
+
+class TTSAudioCache:
+    """Two level LRU cache for synthesized audio.
+
+    A byte-bounded in-memory LRU sits in front of a byte-bounded directory of
+    WAV files. The in-memory and on-disk indexes are only touched from the
+    event loop; file I/O runs in the executor.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        directory: Path,
+        memory_budget: int,
+        disk_budget: int,
+        ttl: float | None = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Budgets are in bytes, a budget of 0 disables that level. ttl is in
+        seconds, None keeps entries until they are evicted.
+        """
+        self._hass = hass
+        self._directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.ttl = ttl
+        self.stats = CacheStats()
+        # key -> (data, stored at)
+        self._memory: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._memory_bytes = 0
+        # key -> (size, stored at), least recently used first
+        self._disk: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._disk_bytes = 0
+        self._writing: set[str] = set()
+
+    async def async_load(self) -> None:
+        """Index the files already on disk."""
+        if not self.disk_budget:
+            return
+        entries = await self._hass.async_add_executor_job(self._scan)
+        for key, size, mtime in entries:
+            self._disk[key] = (size, mtime)
+            self._disk_bytes += size
+        _LOGGER.debug(
+            "Loaded %d cached TTS files (%d bytes)", len(self._disk), self._disk_bytes
+        )
+        self._async_evict_disk()
+
+    async def async_get(self, key: str) -> bytes | None:
+        """Return cached audio for key, or None."""
+        if (entry := self._memory.get(key)) is not None:
+            data, stored = entry
+            if not self._expired(stored):
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return data
+            self._pop_memory(key)
+            self.stats.expired += 1
+
+        if (disk_entry := self._disk.get(key)) is not None:
+            size, stored = disk_entry
+            if self._expired(stored):
+                self.stats.expired += 1
+                self._async_remove_disk(key)
+            else:
+                self._disk.move_to_end(key)
+                data = await self._hass.async_add_executor_job(self._read, key)
+                if data is not None:
+                    self.stats.disk_hits += 1
+                    self._put_memory(key, data, stored)
+                    return data
+                # File vanished underneath us, unless it was just evicted
+                if self._disk.pop(key, None) is not None:
+                    self._disk_bytes -= size
+
+        self.stats.misses += 1
+        return None
+
+    @callback
+    def contains(self, key: str) -> bool:
+        """Return if unexpired audio for key is cached, without counting a hit."""
+        if (entry := self._memory.get(key)) is None:
+            entry = self._disk.get(key)
+        return entry is not None and not self._expired(entry[1])
+
+    @callback
+    def async_put(self, key: str, data: bytes) -> None:
+        """Store audio for key in memory and write it to disk in the background."""
+        now = time.time()
+        self._put_memory(key, data, now)
+        if (
+            not self.disk_budget
+            or len(data) > self.disk_budget
+            or key in self._disk
+            or key in self._writing
+        ):
+            return
+        self._writing.add(key)
+        self._hass.async_create_background_task(
+            self._async_write(key, data, now), f"{DOMAIN} TTS cache write"
+        )
+
+    async def _async_write(self, key: str, data: bytes, stored: float) -> None:
+        """Write audio for key to disk and add it to the disk index."""
+        try:
+            await self._hass.async_add_executor_job(self._write, key, data)
+        except OSError as err:
+            _LOGGER.warning("Could not write TTS cache file: %s", err)
+            return
+        finally:
+            self._writing.discard(key)
+        self._disk[key] = (len(data), stored)
+        self._disk_bytes += len(data)
+        self._async_evict_disk()
+
+    async def async_configure(
+        self, memory_budget: int, disk_budget: int, ttl: float | None
+    ) -> None:
+        """Change the budgets and lifetime, evicting what no longer fits."""
+        load = disk_budget and not self.disk_budget
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.ttl = ttl
+        self._evict_memory()
+        if load:
+            # Files of an earlier run were not indexed while disk was off
+            self._disk.clear()
+            self._disk_bytes = 0
+            await self.async_load()
+        else:
+            self._async_evict_disk()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return cache state for diagnostics."""
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_budget": self.memory_budget,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "disk_budget": self.disk_budget,
+            "ttl": self.ttl,
+            **asdict(self.stats),
+        }
+
+    def _expired(self, stored: float) -> bool:
+        """Return if an entry stored at the given time has expired."""
+        return self.ttl is not None and time.time() - stored > self.ttl
+
+    def _put_memory(self, key: str, data: bytes, stored: float) -> None:
+        """Insert into the in-memory LRU and evict down to budget."""
+        if len(data) > self.memory_budget:
+            return
+        self._pop_memory(key)
+        self._memory[key] = (data, stored)
+        self._memory_bytes += len(data)
+        self._evict_memory()
+
+    def _evict_memory(self) -> None:
+        """Evict least recently used audio until the memory budget is met."""
+        while self._memory_bytes > self.memory_budget:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats.memory_evictions += 1
+
+    def _pop_memory(self, key: str) -> None:
+        """Drop key from the in-memory LRU."""
+        if (entry := self._memory.pop(key, None)) is not None:
+            self._memory_bytes -= len(entry[0])
+
+    def _async_evict_disk(self) -> None:
+        """Evict least recently used files until the disk budget is met."""
+        while self._disk and self._disk_bytes > self.disk_budget:
+            key = next(iter(self._disk))
+            self._async_remove_disk(key)
+            self.stats.disk_evictions += 1
+
+    def _async_remove_disk(self, key: str) -> None:
+        """Drop key from the disk index and delete its file in the background."""
+        size, _ = self._disk.pop(key)
+        self._disk_bytes -= size
+        self._hass.async_add_executor_job(self._unlink, key)
+
+    def _path(self, key: str) -> Path:
+        """Return the file path for key."""
+        return self._directory / f"{key}{CACHE_SUFFIX}"
+
+    def _scan(self) -> list[tuple[str, int, float]]:
+        """Return (key, size, mtime) of all cache files, oldest first."""
+        self._directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self._directory.glob(f"*{CACHE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path.stem, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def _read(self, key: str) -> bytes | None:
+        """Read a cache file.
+
+        The file is memory mapped and copied once into the returned bytes,
+        without an intermediate read buffer.
+        """
+        try:
+            with open(self._path(key), "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, data: bytes) -> None:
+        """Atomically write a cache file."""
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def _unlink(self, key: str) -> None:
+        """Delete a cache file."""
+        self._path(key).unlink(missing_ok=True)
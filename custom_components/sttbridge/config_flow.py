@@ -1,39 +1,212 @@
 """Config flow for STT Bridge."""
+import asyncio
 import logging
 from typing import Any
 
+import aiohttp
 import voluptuous as vol
-from homeassistant.config_entries import ConfigFlow
-from homeassistant.data_entry_flow import FlowResult
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
+from homeassistant.core import callback
+from homeassistant.data_entry_flow import FlowResult, section
 from homeassistant.helpers import aiohttp_client
 
-from .const import DOMAIN
+from .const import (
+    CONF_BACKGROUND_CONCURRENCY,
+    CONF_CACHE_DISK_MB,
+    CONF_CACHE_MEMORY_MB,
+    CONF_CACHE_TTL_HOURS,
+    CONF_DEFAULT_LANGUAGE,
+    CONF_ENDPOINTS,
+    CONF_MAX_CONCURRENT,
+    CONF_PARTIAL_EVENTS,
+    CONF_PARTIAL_STABLE_MS,
+    CONF_PREWARM_RATE,
+    CONF_SEGMENT_LENGTH,
+    CONF_STREAM_CONCURRENCY,
+    CONF_STT_CAPTURE,
+    CONF_STT_CAPTURE_MB,
+    CONF_STT_CONCURRENCY,
+    CONF_STT_FRAME_MS,
+    CONF_STT_MULTIPLEX,
+    CONF_STT_REPLAY_SECONDS,
+    CONF_STT_TRANSPORT,
+    CONF_TIMEOUT_CONNECT,
+    CONF_TIMEOUT_FIRST_BYTE,
+    CONF_TIMEOUT_TOTAL,
+    CONF_TTS_CONCURRENCY,
+    CONF_TTS_MONO,
+    CONF_TTS_NORMALIZE,
+    CONF_TTS_SAMPLE_RATE,
+    CONF_TTS_TARGET_DB,
+    CONF_TTS_TRIM_SILENCE,
+    CONF_VAD_ENABLED,
+    CONF_VAD_THRESHOLD_DB,
+    CONF_VAD_TRAILING_SILENCE_MS,
+    CONF_WS_MAX_IDLE,
+    CONF_WS_PING_INTERVAL,
+    CONF_WS_POOL_SIZE,
+    DEFAULT_BACKGROUND_CONCURRENCY,
+    DEFAULT_CACHE_DISK_MB,
+    DEFAULT_CACHE_MEMORY_MB,
+    DEFAULT_CACHE_TTL_HOURS,
+    DEFAULT_LANGUAGE,
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_PARTIAL_EVENTS,
+    DEFAULT_PARTIAL_STABLE_MS,
+    DEFAULT_PREWARM_RATE,
+    DEFAULT_SEGMENT_LENGTH,
+    DEFAULT_STREAM_CONCURRENCY,
+    DEFAULT_STT_CAPTURE,
+    DEFAULT_STT_CAPTURE_MB,
+    DEFAULT_STT_CONCURRENCY,
+    DEFAULT_STT_FRAME_MS,
+    DEFAULT_STT_MULTIPLEX,
+    DEFAULT_STT_REPLAY_SECONDS,
+    DEFAULT_STT_TRANSPORT,
+    DEFAULT_TIMEOUT_CONNECT,
+    DEFAULT_TIMEOUT_FIRST_BYTE,
+    DEFAULT_TIMEOUT_TOTAL,
+    DEFAULT_TTS_CONCURRENCY,
+    DEFAULT_TTS_MONO,
+    DEFAULT_TTS_NORMALIZE,
+    DEFAULT_TTS_SAMPLE_RATE,
+    DEFAULT_TTS_TARGET_DB,
+    DEFAULT_TTS_TRIM_SILENCE,
+    DEFAULT_VAD_ENABLED,
+    DEFAULT_VAD_THRESHOLD_DB,
+    DEFAULT_VAD_TRAILING_SILENCE_MS,
+    DEFAULT_WS_MAX_IDLE,
+    DEFAULT_WS_PING_INTERVAL,
+    DEFAULT_WS_POOL_SIZE,
+    DOMAIN,
+    MAX_STT_FRAME_MS,
+    MIN_STT_FRAME_MS,
+    STT_TRANSPORTS,
+    TRANSPORT_AUTO,
+)
+from .pool import entry_endpoints, parse_endpoints
 
 _LOGGER = logging.getLogger(__name__)
 
+VALIDATE_TIMEOUT = 10
+# Rates TTS audio can be downsampled to, 0 keeps the bridge's rate
+TTS_SAMPLE_RATES = [0, 8000, 16000, 22050, 24000, 44100, 48000]
+
+
+def _int(minimum: int, maximum: int) -> vol.All:
+    """Return a validator for a whole number in a range."""
+    return vol.All(vol.Coerce(int), vol.Range(min=minimum, max=maximum))
+
+
+def _float(minimum: float, maximum: float) -> vol.All:
+    """Return a validator for a number in a range."""
+    return vol.All(vol.Coerce(float), vol.Range(min=minimum, max=maximum))
+
+
+# The options form, by section: (option, default, validator). Options not in
+# the form (the HTTP connection pool) keep their value.
+OPTIONS_SECTIONS: dict[str, list[tuple[str, Any, Any]]] = {
+    "stt": [
+        (
+            CONF_STT_TRANSPORT,
+            DEFAULT_STT_TRANSPORT,
+            vol.In([TRANSPORT_AUTO, *STT_TRANSPORTS]),
+        ),
+        (
+            CONF_STT_FRAME_MS,
+            DEFAULT_STT_FRAME_MS,
+            _int(MIN_STT_FRAME_MS, MAX_STT_FRAME_MS),
+        ),
+        (CONF_STT_MULTIPLEX, DEFAULT_STT_MULTIPLEX, bool),
+        (CONF_STT_REPLAY_SECONDS, DEFAULT_STT_REPLAY_SECONDS, _int(0, 60)),
+        (CONF_PARTIAL_EVENTS, DEFAULT_PARTIAL_EVENTS, bool),
+        (CONF_PARTIAL_STABLE_MS, DEFAULT_PARTIAL_STABLE_MS, _int(0, 5000)),
+        (CONF_STT_CAPTURE, DEFAULT_STT_CAPTURE, bool),
+        (CONF_STT_CAPTURE_MB, DEFAULT_STT_CAPTURE_MB, _int(1, 100000)),
+    ],
+    "vad": [
+        (CONF_VAD_ENABLED, DEFAULT_VAD_ENABLED, bool),
+        (CONF_VAD_THRESHOLD_DB, DEFAULT_VAD_THRESHOLD_DB, _float(-90, 0)),
+        (
+            CONF_VAD_TRAILING_SILENCE_MS,
+            DEFAULT_VAD_TRAILING_SILENCE_MS,
+            _int(100, 5000),
+        ),
+    ],
+    "timeouts": [
+        (CONF_TIMEOUT_CONNECT, DEFAULT_TIMEOUT_CONNECT, _float(0.5, 60)),
+        (CONF_TIMEOUT_FIRST_BYTE, DEFAULT_TIMEOUT_FIRST_BYTE, _float(1, 300)),
+        (CONF_TIMEOUT_TOTAL, DEFAULT_TIMEOUT_TOTAL, _float(1, 600)),
+    ],
+    "concurrency": [
+        (CONF_MAX_CONCURRENT, DEFAULT_MAX_CONCURRENT, _int(1, 64)),
+        (CONF_STT_CONCURRENCY, DEFAULT_STT_CONCURRENCY, _int(1, 64)),
+        (CONF_TTS_CONCURRENCY, DEFAULT_TTS_CONCURRENCY, _int(1, 64)),
+        (CONF_BACKGROUND_CONCURRENCY, DEFAULT_BACKGROUND_CONCURRENCY, _int(1, 64)),
+        (CONF_STREAM_CONCURRENCY, DEFAULT_STREAM_CONCURRENCY, _int(1, 16)),
+        (CONF_SEGMENT_LENGTH, DEFAULT_SEGMENT_LENGTH, _int(50, 5000)),
+    ],
+    "websocket": [
+        (CONF_WS_POOL_SIZE, DEFAULT_WS_POOL_SIZE, _int(0, 16)),
+        (CONF_WS_MAX_IDLE, DEFAULT_WS_MAX_IDLE, _int(5, 3600)),
+        (CONF_WS_PING_INTERVAL, DEFAULT_WS_PING_INTERVAL, _int(5, 300)),
+    ],
+    "cache": [
+        (CONF_CACHE_MEMORY_MB, DEFAULT_CACHE_MEMORY_MB, _int(0, 4096)),
+        (CONF_CACHE_DISK_MB, DEFAULT_CACHE_DISK_MB, _int(0, 100000)),
+        (CONF_CACHE_TTL_HOURS, DEFAULT_CACHE_TTL_HOURS, _int(0, 8760)),
+    ],
+    "tts": [
+        (CONF_DEFAULT_LANGUAGE, DEFAULT_LANGUAGE, str),
+        (CONF_PREWARM_RATE, DEFAULT_PREWARM_RATE, _int(0, 600)),
+        (CONF_TTS_TRIM_SILENCE, DEFAULT_TTS_TRIM_SILENCE, bool),
+        (CONF_TTS_NORMALIZE, DEFAULT_TTS_NORMALIZE, bool),
+        (CONF_TTS_TARGET_DB, DEFAULT_TTS_TARGET_DB, _float(-40, -3)),
+        (CONF_TTS_SAMPLE_RATE, DEFAULT_TTS_SAMPLE_RATE, vol.In(TTS_SAMPLE_RATES)),
+        (CONF_TTS_MONO, DEFAULT_TTS_MONO, bool),
+    ],
+}
+
 STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required("host", default="127.0.0.1"): str,
         vol.Required("port", default=8787): int,
         vol.Optional("token"): str,
+        vol.Optional(CONF_ENDPOINTS): str,
     }
 )
 
 
 async def validate_input(hass, data):
-    """Validate the user input allows us to connect."""
-    host = data["host"]
-    port = data["port"]
-    base_url = f"http://{host}:{port}"
+    """Validate the user input allows us to connect to every server.
+
+    The servers are checked at the same time, each with a timeout, so an
+    unreachable one fails the form quickly instead of hanging it.
+    """
     session = aiohttp_client.async_get_clientsession(hass)
-    try:
-        async with session.get(f"{base_url}/healthz") as resp:
-            if resp.status == 200:
-                return {"title": "STT Bridge"}
-            return {"base": "cannot_connect"}
-    except Exception:
-        _LOGGER.exception("Could not connect to STT Bridge")
+    headers = {}
+    if data.get("token"):
+        headers["Authorization"] = f"Bearer {data['token']}"
+
+    async def check(host, port):
+        base_url = f"http://{host}:{port}"
+        try:
+            async with session.get(
+                f"{base_url}/healthz",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=VALIDATE_TIMEOUT),
+            ) as resp:
+                return resp.status == 200
+        except Exception:
+            _LOGGER.exception("Could not connect to STT Bridge at %s", base_url)
+            return False
+
+    results = await asyncio.gather(
+        *(check(host, port) for host, port in entry_endpoints(data))
+    )
+    if not all(results):
         return {"base": "cannot_connect"}
+    return {"title": "STT Bridge"}
 
 
 class STTBridgeConfigFlow(ConfigFlow, domain=DOMAIN):
@@ -41,12 +214,26 @@ class STTBridgeConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Return the options flow."""
+        return STTBridgeOptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial step."""
         errors = {}
         if user_input is not None:
+            if CONF_ENDPOINTS in user_input:
+                try:
+                    user_input[CONF_ENDPOINTS] = parse_endpoints(
+                        user_input[CONF_ENDPOINTS], user_input["port"]
+                    )
+                except ValueError:
+                    errors[CONF_ENDPOINTS] = "invalid_endpoints"
+        if user_input is not None and not errors:
             info, errors = await self._validate_and_create(user_input)
             if not errors:
                 await self.async_set_unique_id(f'{user_input["host"]}:{user_input["port"]}')
@@ -65,3 +252,36 @@ class STTBridgeConfigFlow(ConfigFlow, domain=DOMAIN):
             errors["base"] = info["base"]
 
         return info, errors
+
+
+class STTBridgeOptionsFlow(OptionsFlow):
+    """Tune the transport and performance options of STT Bridge.
+
+    The entry's update listener applies saved options to the running entry,
+    without reloading it.
+    """
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            options = dict(self.config_entry.options)
+            for values in user_input.values():
+                options.update(values)
+            return self.async_create_entry(data=options)
+
+        options = self.config_entry.options
+        schema = {
+            vol.Optional(name): section(
+                vol.Schema(
+                    {
+                        vol.Required(key, default=options.get(key, default)): validator
+                        for key, default, validator in fields
+                    }
+                ),
+                {"collapsed": True},
+            )
+            for name, fields in OPTIONS_SECTIONS.items()
+        }
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
@@ -1,3 +1,164 @@
 """Constants for the STT Bridge integration."""
+from datetime import timedelta
 
 DOMAIN = "sttbridge"
+
+# Additional bridge servers ("host:port") load balanced with the primary one
+CONF_ENDPOINTS = "endpoints"
+
+# Used until the voice catalog has been fetched from the bridge
+DEFAULT_LANGUAGES = ["de-DE", "en-US"]
+# Language of TTS requests that don't ask for one
+CONF_DEFAULT_LANGUAGE = "default_language"
+DEFAULT_LANGUAGE = "de-DE"
+VOICES_REFRESH_INTERVAL = timedelta(hours=1)
+VOICES_TIMEOUT = 10.0
+
+# Streaming TTS: number of sentences synthesized ahead of playback. Also
+# bounds the segments of a long message synthesized at the same time.
+CONF_STREAM_CONCURRENCY = "stream_concurrency"
+DEFAULT_STREAM_CONCURRENCY = 3
+
+# Messages longer than this many characters are split into segments of about
+# this length that are synthesized in parallel
+CONF_SEGMENT_LENGTH = "segment_length"
+DEFAULT_SEGMENT_LENGTH = 300
+
+# TTS audio cache budgets (MiB) and entry lifetime (hours, 0 = no expiry)
+CONF_CACHE_MEMORY_MB = "cache_memory_mb"
+CONF_CACHE_DISK_MB = "cache_disk_mb"
+CONF_CACHE_TTL_HOURS = "cache_ttl_hours"
+DEFAULT_CACHE_MEMORY_MB = 32
+DEFAULT_CACHE_DISK_MB = 256
+DEFAULT_CACHE_TTL_HOURS = 0
+CACHE_DIR = "tts_cache"
+
+# Pre-warmed STT WebSockets per bridge server (0 disables the pool). Off by
+# default: pooled sockets are opened before the language is known, so the
+# bridge must take it from the "start" message instead of the ?lang= query
+CONF_WS_POOL_SIZE = "ws_pool_size"
+CONF_WS_MAX_IDLE = "ws_max_idle"
+CONF_WS_PING_INTERVAL = "ws_ping_interval"
+DEFAULT_WS_POOL_SIZE = 0
+DEFAULT_WS_MAX_IDLE = 60
+DEFAULT_WS_PING_INTERVAL = 20
+
+# Client-side voice activity detection on the STT stream
+CONF_VAD_ENABLED = "vad_enabled"
+CONF_VAD_THRESHOLD_DB = "vad_threshold_db"
+CONF_VAD_TRAILING_SILENCE_MS = "vad_trailing_silence_ms"
+DEFAULT_VAD_ENABLED = False
+DEFAULT_VAD_THRESHOLD_DB = -45.0
+DEFAULT_VAD_TRAILING_SILENCE_MS = 800
+
+# STT transports: audio streamed over a WebSocket (WS /stt/stream) or as a
+# chunked upload (POST /stt). "auto" picks per utterance and falls back to
+# the other transport.
+CONF_STT_TRANSPORT = "stt_transport"
+TRANSPORT_AUTO = "auto"
+TRANSPORT_WEBSOCKET = "websocket"
+TRANSPORT_HTTP = "http"
+STT_TRANSPORTS = (TRANSPORT_WEBSOCKET, TRANSPORT_HTTP)
+DEFAULT_STT_TRANSPORT = TRANSPORT_AUTO
+
+# Carry all STT sessions to a bridge server over one shared WebSocket
+# (/stt/mux) when the bridge reports it supports that
+CONF_STT_MULTIPLEX = "stt_multiplex"
+DEFAULT_STT_MULTIPLEX = False
+
+# Seconds of an utterance kept to replay it after a dropped STT WebSocket
+# (0 disables reconnecting), and reconnects per utterance
+CONF_STT_REPLAY_SECONDS = "stt_replay_seconds"
+DEFAULT_STT_REPLAY_SECONDS = 15
+MAX_STT_RECONNECTS = 2
+
+# Record every utterance's audio and transcripts to a corpus for replay
+# benchmarks (.storage/sttbridge/stt_corpus/<entry>), up to a size in MB
+CONF_STT_CAPTURE = "stt_capture"
+CONF_STT_CAPTURE_MB = "stt_capture_mb"
+DEFAULT_STT_CAPTURE = False
+DEFAULT_STT_CAPTURE_MB = 200
+CORPUS_DIR = "stt_corpus"
+
+# Duration of the audio frames sent on the STT WebSocket (20-100 ms)
+CONF_STT_FRAME_MS = "stt_frame_ms"
+DEFAULT_STT_FRAME_MS = 40
+MIN_STT_FRAME_MS = 20
+MAX_STT_FRAME_MS = 100
+
+# Partial transcripts: HA event fired while an utterance is being transcribed,
+# and how long a partial must stay unchanged after speech ended to be
+# returned without waiting for the final (0 disables)
+EVENT_PARTIAL_TRANSCRIPT = "sttbridge_partial_transcript"
+SIGNAL_TRANSCRIPT = "sttbridge_transcript_{}"
+PARTIAL_EVENT_INTERVAL = 0.25
+CONF_PARTIAL_EVENTS = "partial_events"
+CONF_PARTIAL_STABLE_MS = "partial_stable_ms"
+DEFAULT_PARTIAL_EVENTS = True
+DEFAULT_PARTIAL_STABLE_MS = 0
+
+# Request timeouts in seconds. TTS: connecting, waiting for data, whole
+# request. STT: connecting, and waiting for the transcript after the audio
+# ended (the utterance itself is as long as the user speaks).
+CONF_TIMEOUT_CONNECT = "timeout_connect"
+CONF_TIMEOUT_FIRST_BYTE = "timeout_first_byte"
+CONF_TIMEOUT_TOTAL = "timeout_total"
+DEFAULT_TIMEOUT_CONNECT = 3.0
+DEFAULT_TIMEOUT_FIRST_BYTE = 10.0
+DEFAULT_TIMEOUT_TOTAL = 30.0
+
+# HTTP connections per bridge server, seconds an idle connection is kept open,
+# and connections opened to every server at setup (0 disables)
+CONF_HTTP_POOL_SIZE = "http_pool_size"
+CONF_HTTP_KEEPALIVE = "http_keepalive"
+CONF_HTTP_PRECONNECT = "http_preconnect"
+DEFAULT_HTTP_POOL_SIZE = 8
+DEFAULT_HTTP_KEEPALIVE = 120.0
+DEFAULT_HTTP_PRECONNECT = 2
+DNS_CACHE_TTL = 300
+
+# Post-processing of synthesized audio: trim leading and trailing silence,
+# normalize the speech level to tts_target_db dBFS, and downsample to
+# tts_sample_rate (0 keeps the bridge's rate) or downmix to mono
+CONF_TTS_TRIM_SILENCE = "tts_trim_silence"
+CONF_TTS_NORMALIZE = "tts_normalize"
+CONF_TTS_TARGET_DB = "tts_target_db"
+CONF_TTS_SAMPLE_RATE = "tts_sample_rate"
+CONF_TTS_MONO = "tts_mono"
+DEFAULT_TTS_TRIM_SILENCE = False
+DEFAULT_TTS_NORMALIZE = False
+DEFAULT_TTS_TARGET_DB = -20.0
+DEFAULT_TTS_SAMPLE_RATE = 0
+DEFAULT_TTS_MONO = False
+
+# Phrases the TTS pre-warm worker may synthesize per minute
+CONF_PREWARM_RATE = "prewarm_rate"
+DEFAULT_PREWARM_RATE = 30
+
+SERVICE_PREWARM = "prewarm"
+ATTR_PHRASES = "phrases"
+ATTR_VALUES = "values"
+ATTR_LANGUAGE = "language"
+ATTR_OPTIONS = "options"
+ATTR_PERSIST = "persist"
+
+# Event loop profiling: how long a session runs (0 ends it), callbacks
+# flagged as slow, and the optional stack sampling
+SERVICE_PROFILE = "profile"
+ATTR_DURATION = "duration"
+ATTR_SLOW_THRESHOLD_MS = "slow_threshold_ms"
+ATTR_SAMPLE = "sample"
+ATTR_SAMPLE_INTERVAL_MS = "sample_interval_ms"
+DATA_PROFILER = f"{DOMAIN}_profiler"
+
+# Requests run at once per bridge server, and the share of them STT, TTS and
+# background (pre-warming) requests may take; STT utterances only count while
+# they connect
+CONF_MAX_CONCURRENT = "max_concurrent"
+CONF_STT_CONCURRENCY = "stt_concurrency"
+CONF_TTS_CONCURRENCY = "tts_concurrency"
+CONF_BACKGROUND_CONCURRENCY = "background_concurrency"
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_STT_CONCURRENCY = 4
+DEFAULT_TTS_CONCURRENCY = 2
+DEFAULT_BACKGROUND_CONCURRENCY = 1
@@ -0,0 +1,289 @@
+"""Recorded STT utterances for replay benchmarks.
+
+A corpus is a directory with two append-only files: ``audio.pcm`` holds
+the raw PCM of every utterance back to back, and ``index.jsonl`` has one
+JSON line per utterance with its offset into the audio, its metadata, the
+partial transcripts with their times and the final transcript. The index
+line is written after the audio, so an interrupted write leaves at most
+unreferenced audio or a partial last line, both of which are ignored.
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import asdict, dataclass, field
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Any
+
+from homeassistant.components import stt
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+AUDIO_FILE = "audio.pcm"
+INDEX_FILE = "index.jsonl"
+# Longer utterances are not recorded
+MAX_CAPTURE_SECONDS = 60
+
+_WORD = re.compile(r"\w+(?:'\w+)*")
+
+
+@dataclass
+class CorpusEntry:
+    """One recorded utterance."""
+
+    offset: int
+    length: int
+    sample_rate: int
+    channels: int
+    language: str
+    # Seconds since the start of the audio, and the partial transcript
+    partials: list[tuple[float, str]] = field(default_factory=list)
+    final: str | None = None
+    # Seconds from the end of the audio to the final, as recorded
+    latency: float | None = None
+    recorded: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        """Return the length of the audio in seconds."""
+        return self.length / (2 * self.channels * self.sample_rate)
+
+    @property
+    def metadata(self) -> stt.SpeechMetadata:
+        """Return the metadata the audio was recorded with."""
+        return stt.SpeechMetadata(
+            language=self.language,
+            format=stt.AudioFormats.WAV,
+            codec=stt.AudioCodecs.PCM,
+            bit_rate=stt.AudioBitRates.BITRATE_16,
+            sample_rate=stt.AudioSampleRates(self.sample_rate),
+            channel=stt.AudioChannels(self.channels),
+        )
+
+
+class UtteranceRecorder:
+    """Record the audio and transcripts of one utterance as it is processed."""
+
+    def __init__(self, metadata: stt.SpeechMetadata, max_bytes: int) -> None:
+        """Initialize the recorder.
+
+        Utterances longer than max_bytes of audio are not recorded.
+        """
+        self._metadata = metadata
+        self._max_bytes = max_bytes
+        self._audio = bytearray()
+        self._start: float | None = None
+        # When the last audio was read; VAD may stop reading before the end
+        self._audio_end: float | None = None
+        self.partials: list[tuple[float, str]] = []
+        self.overflowed = False
+
+    async def tap(self, stream: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Pass the audio of stream through, recording it."""
+        async for chunk in stream:
+            self._audio_end = time.monotonic()
+            if self._start is None:
+                self._start = self._audio_end
+            if not self.overflowed:
+                if len(self._audio) + len(chunk) > self._max_bytes:
+                    self.overflowed = True
+                    self._audio = bytearray()
+                else:
+                    self._audio += chunk
+            yield chunk
+
+    @callback
+    def async_partial(self, text: str) -> None:
+        """Record a partial transcript."""
+        if self._start is not None:
+            self.partials.append((round(time.monotonic() - self._start, 3), text))
+
+    def finish(self, text: str | None) -> tuple[CorpusEntry, bytes] | None:
+        """Return the entry and audio of the utterance, None if it can't be kept."""
+        if self.overflowed or not self._audio:
+            return None
+        latency = None
+        if self._audio_end is not None:
+            latency = round(time.monotonic() - self._audio_end, 3)
+        entry = CorpusEntry(
+            offset=0,
+            length=len(self._audio),
+            sample_rate=self._metadata.sample_rate.value,
+            channels=self._metadata.channel.value,
+            language=self._metadata.language,
+            partials=self.partials,
+            final=text,
+            latency=latency,
+            recorded=time.time(),
+        )
+        return entry, bytes(self._audio)
+
+
+class CorpusWriter:
+    """Append recorded utterances to a corpus directory.
+
+    Appends run in the executor, one at a time. Recording stops once the
+    audio file reaches max_bytes; nothing is ever rewritten or evicted.
+    """
+
+    def __init__(self, hass: HomeAssistant, directory: Path, max_bytes: int) -> None:
+        """Initialize the writer."""
+        self._hass = hass
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.utterances = 0
+        self.bytes = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._full = False
+        self.enabled = True
+
+    def recorder(self, metadata: stt.SpeechMetadata) -> UtteranceRecorder | None:
+        """Return a recorder for an utterance, None if not recording."""
+        if self._full or not self.enabled:
+            return None
+        max_bytes = (
+            MAX_CAPTURE_SECONDS
+            * metadata.sample_rate.value
+            * metadata.channel.value
+            * 2
+        )
+        return UtteranceRecorder(metadata, min(max_bytes, self.max_bytes))
+
+    async def async_append(
+        self, recorder: UtteranceRecorder, text: str | None
+    ) -> None:
+        """Write a recorded utterance to the corpus."""
+        if (recorded := recorder.finish(text)) is None:
+            self.skipped += 1
+            return
+        entry, audio = recorded
+        try:
+            written = await self._hass.async_add_executor_job(
+                self._append, entry, audio
+            )
+        except OSError as err:
+            _LOGGER.warning("Could not record utterance to %s: %s", self.directory, err)
+            return
+        if not written:
+            self._full = True
+            _LOGGER.info(
+                "STT capture corpus %s is full, no longer recording", self.directory
+            )
+            return
+        self.utterances += 1
+        self.bytes += len(audio)
+
+    def configure(self, enabled: bool, max_bytes: int) -> None:
+        """Pause or resume recording, and change the size limit.
+
+        Utterances being recorded are still written.
+        """
+        self.enabled = enabled
+        if max_bytes > self.max_bytes:
+            # The next append finds out if it fits now
+            self._full = False
+        self.max_bytes = max_bytes
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the capture state for diagnostics."""
+        return {
+            "enabled": self.enabled,
+            "utterances": self.utterances,
+            "bytes": self.bytes,
+            "skipped": self.skipped,
+            "full": self._full,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _append(self, entry: CorpusEntry, audio: bytes) -> bool:
+        """Append the audio, then its index line; False if it doesn't fit."""
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with (self.directory / AUDIO_FILE).open("ab") as file:
+                entry.offset = file.tell()
+                if entry.offset + len(audio) > self.max_bytes:
+                    return False
+                file.write(audio)
+            line = json.dumps(asdict(entry), ensure_ascii=False) + "\n"
+            with (self.directory / INDEX_FILE).open("a+b") as file:
+                if file.tell():
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        # Keep a line cut off by an interrupted write on its own
+                        line = "\n" + line
+                file.write(line.encode())
+        return True
+
+
+class CorpusReader:
+    """Read a corpus, with the audio memory-mapped instead of loaded."""
+
+    def __init__(self, directory: Path) -> None:
+        """Open the corpus in directory."""
+        self.entries: list[CorpusEntry] = []
+        self._mmap: mmap.mmap | None = None
+        audio_path = directory / AUDIO_FILE
+        size = audio_path.stat().st_size if audio_path.exists() else 0
+        if size:
+            with audio_path.open("rb") as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        index_path = directory / INDEX_FILE
+        if not index_path.exists():
+            return
+        with index_path.open(encoding="utf-8") as file:
+            for line in file:
+                try:
+                    data = json.loads(line)
+                    data["partials"] = [tuple(p) for p in data.get("partials", [])]
+                    entry = CorpusEntry(**data)
+                except (ValueError, TypeError):
+                    # A line cut off by an interrupted write
+                    continue
+                if entry.offset + entry.length <= size:
+                    self.entries.append(entry)
+
+    def audio(self, entry: CorpusEntry) -> memoryview:
+        """Return the audio of an entry without copying it."""
+        assert self._mmap is not None
+        return memoryview(self._mmap)[entry.offset : entry.offset + entry.length]
+
+    def close(self) -> None:
+        """Unmap the audio; views returned by audio() must be released first."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> CorpusReader:
+        """Return the reader."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the reader."""
+        self.close()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> tuple[int, int]:
+    """Return the word edits from reference to hypothesis, and the reference words.
+
+    Words are compared case-insensitively and without punctuation. The WER
+    is edits / words; sums of both give the WER of a whole corpus.
+    """
+    ref = _WORD.findall(reference.casefold())
+    hyp = _WORD.findall(hypothesis.casefold())
+    # Levenshtein distance over words, one row at a time
+    row = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, other in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(
+                row[j] + 1, row[j - 1] + 1, previous + (word != other)
+            )
+    return row[-1], len(ref)
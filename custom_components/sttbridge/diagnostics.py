@@ -1,23 +1,26 @@
 """Diagnostics support for STT Bridge."""
 from __future__ import annotations
 
+import asyncio
+import time
 from typing import Any
 
+import aiohttp
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import DOMAIN
+from .const import DATA_PROFILER, DOMAIN
+from .models import STTBridgeData
+
+PROBE_TIMEOUT = 5.0
 
 
 async def async_get_config_entry_diagnostics(
     hass: HomeAssistant, entry: ConfigEntry
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
-    data = hass.data[DOMAIN][entry.entry_id]
-    host = data["host"]
-    port = data["port"]
-    base_url = f"http://{host}:{port}"
+    data: STTBridgeData = hass.data[DOMAIN][entry.entry_id]
+    base_url = data.base_url
 
     # Redact token
     config_data = {**entry.data}
@@ -27,26 +30,64 @@ async def async_get_config_entry_diagnostics(
     diagnostics_data = {
         "config": config_data,
         "options": {**entry.options},
+        "tts_cache": data.tts_cache.as_dict(),
+        "tts_single_flight": data.tts_flights.as_dict(),
+        "voice_catalog": data.voices.as_dict(),
+        "health_monitor": data.health.as_dict(),
+        "metrics": data.metrics.as_dict(),
+        "stt_transports": data.transports.as_dict(),
+        "tts_prewarm": data.prewarm.as_dict() if data.prewarm else None,
+        "stt_mux": data.mux.as_dict() if data.mux else None,
+        "stt_capture": data.corpus.as_dict() if data.corpus else None,
+        "loop_profiler": profiler.as_dict()
+        if (profiler := hass.data.get(DATA_PROFILER))
+        else None,
     }
 
-    # Try to get health and voices
-    session = async_get_clientsession(hass)
-    try:
-        async with session.get(f"{base_url}/healthz") as resp:
-            diagnostics_data["health"] = {
-                "status": resp.status,
-                "body": await resp.text(),
-            }
-    except Exception as e:
-        diagnostics_data["health"] = {"error": str(e)}
+    diagnostics_data["backends"] = data.pool.as_dict()
+    diagnostics_data["ws_pools"] = {
+        f"{backend.host}:{backend.port}": ws_pool.as_dict()
+        for backend, ws_pool in data.ws_pools.items()
+    }
 
-    try:
-        async with session.get(f"{base_url}/voices") as resp:
-            diagnostics_data["voices"] = {
-                "status": resp.status,
-                "body": await resp.json() if resp.content_type == 'application/json' else await resp.text(),
-            }
-    except Exception as e:
-        diagnostics_data["voices"] = {"error": str(e)}
+    # Probe every server and the voices at the same time, so a server that
+    # is down costs one timeout instead of one per request
+    headers = {}
+    if data.token:
+        headers["Authorization"] = f"Bearer {data.token}"
+    backends = data.pool.backends
+    *health, voices = await asyncio.gather(
+        *(
+            _async_probe(data.session, f"{backend.base_url}/healthz", headers)
+            for backend in backends
+        ),
+        _async_probe(data.session, f"{base_url}/voices", headers),
+    )
+    diagnostics_data["health"] = {
+        f"{backend.host}:{backend.port}": result
+        for backend, result in zip(backends, health, strict=True)
+    }
+    diagnostics_data["voices"] = voices
 
     return diagnostics_data
+
+
+async def _async_probe(
+    session: aiohttp.ClientSession, url: str, headers: dict[str, str]
+) -> dict[str, Any]:
+    """GET url and return the response with how long it took."""
+    start = time.monotonic()
+    try:
+        async with session.get(
+            url, headers=headers, timeout=aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+        ) as resp:
+            body = (
+                await resp.json()
+                if resp.content_type == "application/json"
+                else await resp.text()
+            )
+            result: dict[str, Any] = {"status": resp.status, "body": body}
+    except Exception as e:
+        result = {"error": str(e) or type(e).__name__}
+    result["duration_ms"] = round((time.monotonic() - start) * 1000, 1)
+    return result
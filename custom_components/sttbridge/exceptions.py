@@ -0,0 +1,28 @@
+"""Exceptions for the STT Bridge integration."""
+from __future__ import annotations
+
+from homeassistant.exceptions import HomeAssistantError
+
+
+class STTBridgeError(HomeAssistantError):
+    """Base class for STT Bridge errors."""
+
+
+class NoBackendAvailable(STTBridgeError):
+    """Raised when none of the bridge servers could be reached."""
+
+
+class TransportUnavailable(STTBridgeError):
+    """Raised when an STT transport is rejected or breaks down."""
+
+
+class StreamInterrupted(TransportUnavailable):
+    """Raised when an STT stream breaks down before the final transcript."""
+
+
+class QueueFull(STTBridgeError):
+    """Raised when too many requests of a class wait for a bridge server."""
+
+
+class RequestShed(STTBridgeError):
+    """Raised when a request waited for a bridge server past its deadline."""
@@ -0,0 +1,204 @@
+"""Health monitoring for STT Bridge."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+import logging
+import time
+from typing import Any
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, STT_TRANSPORTS
+from .pool import Backend, BackendPool
+
+_LOGGER = logging.getLogger(__name__)
+
+# /healthz polling: slow while everything is healthy, fast while a server is
+# down so it is picked up again quickly
+HEALTHY_INTERVAL = timedelta(seconds=30)
+DEGRADED_INTERVAL = timedelta(seconds=5)
+HEALTH_TIMEOUT = 2.0
+
+
+@dataclass
+class BridgeCapabilities:
+    """Capabilities a bridge server reports in its /healthz response."""
+
+    stt_sample_rate: int = 16000
+    stt_transports: tuple[str, ...] = STT_TRANSPORTS
+    stt_multiplex: bool = False
+
+    @classmethod
+    def from_health(cls, health: Any) -> BridgeCapabilities:
+        """Return the capabilities from a /healthz JSON body.
+
+        Servers that report nothing get the defaults, which match what the
+        bridge has always expected.
+        """
+        caps = cls()
+        if not isinstance(health, dict) or not isinstance(
+            stt_caps := health.get("stt"), dict
+        ):
+            return caps
+        if isinstance(rate := stt_caps.get("sampleRate"), int) and rate > 0:
+            caps.stt_sample_rate = rate
+        if isinstance(transports := stt_caps.get("transports"), list) and (
+            known := tuple(t for t in STT_TRANSPORTS if t in transports)
+        ):
+            caps.stt_transports = known
+        caps.stt_multiplex = stt_caps.get("multiplex") is True
+        return caps
+
+    @classmethod
+    def from_dict(cls, data: Any) -> BridgeCapabilities:
+        """Return capabilities stored with as_dict."""
+        caps = cls()
+        if not isinstance(data, dict):
+            return caps
+        if isinstance(rate := data.get("stt_sample_rate"), int) and rate > 0:
+            caps.stt_sample_rate = rate
+        if isinstance(transports := data.get("stt_transports"), list) and (
+            known := tuple(t for t in STT_TRANSPORTS if t in transports)
+        ):
+            caps.stt_transports = known
+        caps.stt_multiplex = data.get("stt_multiplex") is True
+        return caps
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the capabilities for diagnostics and storage."""
+        return {
+            "stt_sample_rate": self.stt_sample_rate,
+            "stt_transports": list(self.stt_transports),
+            "stt_multiplex": self.stt_multiplex,
+        }
+
+
+class HealthCoordinator:
+    """Poll /healthz on every bridge server of a config entry.
+
+    Results feed the circuit breakers of the backends, and the capabilities
+    reported by the first healthy server are kept for the STT provider. The
+    poll interval drops while any server is unhealthy.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: aiohttp.ClientSession,
+        pool: BackendPool,
+        token: str | None,
+        on_update: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the coordinator.
+
+        on_update is called when the capabilities change.
+        """
+        self._hass = hass
+        self._session = session
+        self._pool = pool
+        self._token = token
+        self._on_update = on_update
+        self.capabilities = BridgeCapabilities()
+        self.healthy: dict[Backend, bool] = {}
+        self.last_check: float | None = None
+        self.interval = HEALTHY_INTERVAL
+        self._unsub_timer: Callable[[], None] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Run the first check in the background and keep polling."""
+        self._task = self._hass.async_create_background_task(
+            self._async_poll(), f"{DOMAIN} health check"
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop polling."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def async_refresh(self) -> None:
+        """Check every backend concurrently."""
+        backends = self._pool.backends
+        results = await asyncio.gather(
+            *(self._async_check(backend) for backend in backends)
+        )
+        capabilities = None
+        for backend, health in zip(backends, results, strict=True):
+            self.healthy[backend] = health is not None
+            if health is None:
+                backend.record_failure()
+                continue
+            backend.breaker.record_healthy()
+            if capabilities is None:
+                capabilities = BridgeCapabilities.from_health(health)
+        if capabilities is not None and capabilities != self.capabilities:
+            self.capabilities = capabilities
+            if self._on_update is not None:
+                self._on_update()
+        self.last_check = time.monotonic()
+        self.interval = (
+            HEALTHY_INTERVAL if all(self.healthy.values()) else DEGRADED_INTERVAL
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return health state for diagnostics."""
+        return {
+            "interval_seconds": self.interval.total_seconds(),
+            "seconds_since_check": round(time.monotonic() - self.last_check, 1)
+            if self.last_check is not None
+            else None,
+            "healthy": {
+                f"{backend.host}:{backend.port}": healthy
+                for backend, healthy in self.healthy.items()
+            },
+            "capabilities": self.capabilities.as_dict(),
+        }
+
+    async def _async_poll(self) -> None:
+        """Check the backends and schedule the next check."""
+        await self.async_refresh()
+        self._unsub_timer = async_call_later(
+            self._hass, self.interval, self._async_schedule_poll
+        )
+
+    @callback
+    def _async_schedule_poll(self, _now: Any) -> None:
+        """Start the next check."""
+        self._unsub_timer = None
+        self._task = self._hass.async_create_background_task(
+            self._async_poll(), f"{DOMAIN} health check"
+        )
+
+    async def _async_check(self, backend: Backend) -> Any:
+        """Return the /healthz body of backend, or None if it is unhealthy."""
+        headers = {}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        try:
+            async with self._session.get(
+                f"{backend.base_url}/healthz",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=HEALTH_TIMEOUT),
+            ) as resp:
+                if resp.status != 200:
+                    _LOGGER.debug("%s unhealthy: HTTP %s", backend, resp.status)
+                    return None
+                try:
+                    return await resp.json(content_type=None)
+                except ValueError:
+                    # Older bridges answer with plain text
+                    return {}
+        except (aiohttp.ClientError, TimeoutError) as err:
+            _LOGGER.debug("%s unhealthy: %s", backend, err)
+            return None
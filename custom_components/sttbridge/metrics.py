@@ -0,0 +1,147 @@
+"""Request metrics for STT Bridge."""
+from __future__ import annotations
+
+from collections import Counter
+import time
+from typing import Any
+
+import numpy as np
+
+# Latency samples kept per metric; older samples are overwritten
+WINDOW_SIZE = 1024
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyWindow:
+    """The most recent latency samples of one metric in a ring buffer."""
+
+    def __init__(self, size: int = WINDOW_SIZE) -> None:
+        """Initialize the window."""
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        """Add a sample."""
+        self._samples[self._next] = seconds
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+
+    def percentile(self, percentile: float) -> float | None:
+        """Return a percentile of the window in milliseconds."""
+        if not self.count:
+            return None
+        filled = self._samples[: min(self.count, len(self._samples))]
+        return float(np.percentile(filled, percentile)) * 1000
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the sample count and percentiles for diagnostics."""
+        result: dict[str, Any] = {"count": self.count}
+        for percentile in PERCENTILES:
+            value = self.percentile(percentile)
+            result[f"p{percentile}_ms"] = None if value is None else round(value, 1)
+        return result
+
+
+class CallMetrics:
+    """Timings, byte counts and errors of one kind of call."""
+
+    def __init__(self, *phases: str) -> None:
+        """Initialize the metrics with a latency window per phase."""
+        self.phases = {phase: LatencyWindow() for phase in phases}
+        self.calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors: Counter[str] = Counter()
+
+    def start(self) -> CallTimer:
+        """Return a timer for a new call."""
+        self.calls += 1
+        return CallTimer(self)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "calls": self.calls,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "errors": dict(self.errors),
+            **{phase: window.as_dict() for phase, window in self.phases.items()},
+        }
+
+
+class CallTimer:
+    """Record the phases of a single call."""
+
+    def __init__(self, metrics: CallMetrics) -> None:
+        """Initialize the timer."""
+        self._metrics = metrics
+        self.started = time.monotonic()
+        self.durations: dict[str, float] = {}
+
+    def mark(self, phase: str, since: float | None = None) -> None:
+        """Record the time from the start (or since) to now, once per phase."""
+        if phase in self.durations:
+            return
+        start = self.started if since is None else since
+        self.durations[phase] = time.monotonic() - start
+        self._metrics.phases[phase].record(self.durations[phase])
+
+    def sent(self, size: int) -> None:
+        """Count bytes sent to the bridge."""
+        self._metrics.bytes_sent += size
+
+    def received(self, size: int) -> None:
+        """Count bytes received from the bridge."""
+        self._metrics.bytes_received += size
+
+    def error(self, error: BaseException | str) -> None:
+        """Count a failed call by error class."""
+        self._metrics.errors[
+            error if isinstance(error, str) else type(error).__name__
+        ] += 1
+
+
+class ConnectionMetrics:
+    """New and reused HTTP connections, and the time to open new ones."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.connect = LatencyWindow()
+        self.new = 0
+        self.reuse = 0
+
+    def created(self, seconds: float) -> None:
+        """Count a new connection."""
+        self.new += 1
+        self.connect.record(seconds)
+
+    def reused(self) -> None:
+        """Count a request sent on a kept-alive connection."""
+        self.reuse += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {"new": self.new, "reused": self.reuse, "connect": self.connect.as_dict()}
+
+
+class STTBridgeMetrics:
+    """Metrics of the TTS and STT calls of a config entry."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        # TTS: response headers, complete audio
+        self.tts = CallMetrics("first_byte", "total")
+        # STT: socket ready, first transcript message, final transcript after
+        # the end of the audio, whole utterance
+        self.stt = CallMetrics("connect", "first_byte", "final", "total")
+        # Connections of the HTTP session
+        self.http = ConnectionMetrics()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "tts": self.tts.as_dict(),
+            "stt": self.stt.as_dict(),
+            "http": self.http.as_dict(),
+        }
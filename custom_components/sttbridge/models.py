@@ -0,0 +1,52 @@
+"""Runtime data models for the STT Bridge integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from .cache import TTSAudioCache
+from .const import DOMAIN
+from .corpus import CorpusWriter
+from .health import BridgeCapabilities, HealthCoordinator
+from .metrics import STTBridgeMetrics
+from .mux import STTMultiplexer
+from .pool import Backend, BackendPool
+from .prewarm import PrewarmWorker
+from .singleflight import SingleFlight
+from .transport import TransportSelector
+from .voices import VoiceCatalog
+from .ws_pool import STTWebSocketPool
+
+
+@dataclass
+class STTBridgeData:
+    """Runtime data of an STT Bridge config entry."""
+
+    host: str
+    port: int
+    token: str | None
+    pool: BackendPool
+    tts_cache: TTSAudioCache
+    voices: VoiceCatalog
+    health: HealthCoordinator
+    session: aiohttp.ClientSession
+    ws_pools: dict[Backend, STTWebSocketPool] = field(default_factory=dict)
+    metrics: STTBridgeMetrics = field(default_factory=STTBridgeMetrics)
+    tts_flights: SingleFlight[bytes] = field(
+        default_factory=lambda: SingleFlight(f"{DOMAIN} TTS")
+    )
+    transports: TransportSelector = field(default_factory=TransportSelector)
+    prewarm: PrewarmWorker | None = None
+    mux: STTMultiplexer | None = None
+    corpus: CorpusWriter | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Return the HTTP base URL of the primary bridge server."""
+        return self.pool.primary.base_url
+
+    @property
+    def capabilities(self) -> BridgeCapabilities:
+        """Return the capabilities reported by the bridge."""
+        return self.health.capabilities
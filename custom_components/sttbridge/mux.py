@@ -0,0 +1,406 @@
+"""Multiplexed STT sessions over one WebSocket per bridge server.
+
+Protocol on ``/stt/mux``: every text message carries the ``session`` it
+belongs to (``start``, ``end`` and ``cancel`` from the client, ``partial``,
+``final`` and ``error`` from the bridge), and every binary message is the
+session ID as a 32-bit big-endian integer followed by PCM audio.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+import itertools
+import json
+import logging
+import struct
+import time
+from typing import Any
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .pool import Backend
+
+_LOGGER = logging.getLogger(__name__)
+
+SESSION_HEADER = struct.Struct(">I")
+# Messages a session may have waiting to be sent before its sender waits
+SESSION_QUEUE_SIZE = 8
+
+# Upgrade refusals meaning a server has no /stt/mux, and seconds that is
+# remembered; other refusals (e.g. a proxy while the bridge restarts) are
+# only fallen back from for the utterance at hand
+REFUSED_STATUSES = (404, 426)
+UNSUPPORTED_RETRY = 600.0
+
+# Bridge messages that end a session
+_FINAL_TYPES = ("final", "error")
+# Delivered to every session when the shared connection breaks down
+_CLOSED = aiohttp.WSMessage(aiohttp.WSMsgType.CLOSED, None, None)
+
+
+class MuxSession:
+    """One STT session on a shared connection.
+
+    The bridge's messages for the session arrive in ``events``, in the form
+    they'd have on a connection of its own, so the caller handles both the
+    same way. Outgoing messages wait in ``outbox`` for the connection to
+    send them; when it is full, the session's sender waits.
+    """
+
+    def __init__(self, connection: MuxConnection, session_id: int) -> None:
+        """Initialize the session."""
+        self.id = session_id
+        self.events: asyncio.Queue[aiohttp.WSMessage | None] = asyncio.Queue()
+        self.outbox: asyncio.Queue[str | bytes] = asyncio.Queue(SESSION_QUEUE_SIZE)
+        self.finished = False
+        self._connection = connection
+        self._header = SESSION_HEADER.pack(session_id)
+
+    async def async_start(self, sample_rate: int, language: str) -> None:
+        """Start the session."""
+        await self._async_send(
+            json.dumps(
+                {
+                    "type": "start",
+                    "session": self.id,
+                    "sampleRate": sample_rate,
+                    "channels": 1,
+                    "language": language,
+                }
+            )
+        )
+
+    async def async_send_audio(self, frame: memoryview) -> None:
+        """Send a frame of audio."""
+        await self._async_send(self._header + frame)
+
+    async def async_end(self) -> None:
+        """Mark the end of the audio."""
+        await self._async_send(json.dumps({"type": "end", "session": self.id}))
+
+    async def _async_send(self, message: str | bytes) -> None:
+        """Queue a message, waiting while the session has too many queued."""
+        if self._connection.closed:
+            raise aiohttp.ClientConnectionResetError(
+                "Multiplexed STT connection closed"
+            )
+        await self.outbox.put(message)
+        self._connection.async_schedule(self)
+
+    @callback
+    def async_close(self) -> None:
+        """Leave the connection, cancelling the session if it is still running."""
+        self._connection.async_release(self)
+
+
+class MuxConnection:
+    """A WebSocket to one bridge server carrying many STT sessions.
+
+    A reader task hands the bridge's messages to their sessions. A writer
+    task sends the sessions' queued messages one at a time, taking turns
+    between the sessions, so a session replaying audio at full speed gets
+    no more of the connection than the others. Each session queues a few
+    messages at most, so a slow connection makes the senders wait instead
+    of buffering their audio.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        ws: aiohttp.ClientWebSocketResponse,
+        backend: Backend,
+        on_close: Callable[[MuxConnection], None],
+    ) -> None:
+        """Initialize the connection and start reading from it."""
+        self._hass = hass
+        self._ws = ws
+        self._backend = backend
+        self._on_close = on_close
+        self._ids = itertools.count(1)
+        self._send_lock = asyncio.Lock()
+        self._closing = False
+        self._retiring = False
+        self.sessions: dict[int, MuxSession] = {}
+        self.opened = 0
+        # Sessions with queued messages, in the order they get to send
+        self._ready: deque[MuxSession] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer = hass.async_create_background_task(
+            self._async_write(), f"{DOMAIN} write multiplexed STT"
+        )
+        self._reader = hass.async_create_background_task(
+            self._async_read(), f"{DOMAIN} read multiplexed STT"
+        )
+
+    @property
+    def closed(self) -> bool:
+        """Return if the connection can't take new sessions."""
+        return self._ws.closed or self._reader.done() or self._writer.done()
+
+    @callback
+    def async_open(self) -> MuxSession:
+        """Return a new session."""
+        session = MuxSession(self, next(self._ids))
+        self.sessions[session.id] = session
+        self.opened += 1
+        return session
+
+    @callback
+    def async_release(self, session: MuxSession) -> None:
+        """Forget a session, telling the bridge to drop it if it isn't done."""
+        if self.sessions.pop(session.id, None) is None:
+            return
+        if session in self._ready:
+            # Audio the bridge would drop with the session anyway
+            self._ready.remove(session)
+        if not session.finished and not self.closed:
+            self._hass.async_create_background_task(
+                self._async_cancel(session.id), f"{DOMAIN} cancel STT session"
+            )
+        if self._retiring and not self.sessions:
+            self._async_schedule_close()
+
+    @callback
+    def async_retire(self) -> None:
+        """Close the connection once its running sessions are done."""
+        self._retiring = True
+        if not self.sessions:
+            self._async_schedule_close()
+
+    @callback
+    def async_schedule(self, session: MuxSession) -> None:
+        """Give a session with queued messages a turn to send."""
+        if session not in self._ready and session.id in self.sessions:
+            self._ready.append(session)
+            self._wakeup.set()
+
+    async def async_close(self) -> None:
+        """Close the connection."""
+        self._closing = True
+        self._reader.cancel()
+        self._writer.cancel()
+        await self._ws.close()
+
+    @callback
+    def _async_schedule_close(self) -> None:
+        """Close the connection in the background."""
+        self._hass.async_create_background_task(
+            self.async_close(), f"{DOMAIN} close multiplexed STT"
+        )
+
+    async def _async_cancel(self, session_id: int) -> None:
+        """Tell the bridge a session is abandoned."""
+        try:
+            async with self._send_lock:
+                await self._ws.send_json({"type": "cancel", "session": session_id})
+        except (aiohttp.ClientError, ConnectionResetError) as err:
+            _LOGGER.debug("Could not cancel STT session %d: %s", session_id, err)
+
+    async def _async_write(self) -> None:
+        """Send the sessions' messages, one per session in turn."""
+        try:
+            while True:
+                if not self._ready:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                session = self._ready.popleft()
+                message = session.outbox.get_nowait()
+                async with self._send_lock:
+                    if isinstance(message, str):
+                        await self._ws.send_str(message)
+                    else:
+                        await self._ws.send_bytes(message)
+                if not session.outbox.empty():
+                    self.async_schedule(session)
+        except (aiohttp.ClientError, ConnectionResetError) as err:
+            _LOGGER.debug(
+                "Could not send multiplexed STT to %s: %s", self._backend, err
+            )
+            # The reader tells the sessions the connection is gone
+            self._reader.cancel()
+
+    async def _async_read(self) -> None:
+        """Hand messages to their sessions until the connection ends."""
+        msg = _CLOSED
+        try:
+            while True:
+                msg = await self._ws.receive()
+                if msg.type == aiohttp.WSMsgType.BINARY:
+                    # The bridge sends no audio, so this is a protocol slip
+                    # that doesn't concern the sessions
+                    _LOGGER.warning(
+                        "Unexpected binary message on multiplexed STT to %s",
+                        self._backend,
+                    )
+                    continue
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                try:
+                    data = msg.json()
+                    session = self.sessions.get(data.get("session"))
+                except (ValueError, AttributeError):
+                    _LOGGER.warning("Unexpected multiplexed STT message: %s", msg.data)
+                    continue
+                if session is None:
+                    # Late messages of an abandoned session
+                    continue
+                if data.get("type") in _FINAL_TYPES:
+                    session.finished = True
+                session.events.put_nowait(msg)
+        finally:
+            _LOGGER.debug(
+                "Multiplexed STT connection to %s ended: %s", self._backend, msg.type
+            )
+            interrupted = [s for s in self.sessions.values() if not s.finished]
+            for session in interrupted:
+                # Never msg itself: after a failed send that is the last
+                # message read, which may be another session's
+                session.events.put_nowait(_CLOSED)
+            for session in self.sessions.values():
+                # Wake senders waiting for room, their next send fails
+                while not session.outbox.empty():
+                    session.outbox.get_nowait()
+            if interrupted and not self._closing:
+                # One failure for the connection, not one per session on it
+                self._backend.record_failure()
+            self._writer.cancel()
+            if not self._ws.closed:
+                self._hass.async_create_background_task(
+                    self._ws.close(), f"{DOMAIN} close multiplexed STT"
+                )
+            self._on_close(self)
+
+
+class STTMultiplexer:
+    """Share one WebSocket per bridge server between all STT sessions.
+
+    Connections are opened on first use, and concurrent sessions to a server
+    wait for the same connection attempt, so a burst of utterances costs a
+    single connection setup. Servers that refuse the upgrade are remembered
+    and get one connection per utterance instead.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: aiohttp.ClientSession,
+        token: str | None,
+        ping_interval: float,
+    ) -> None:
+        """Initialize the multiplexer."""
+        self._hass = hass
+        self._session = session
+        self._token = token
+        self.ping_interval = ping_interval
+        self._connections: dict[Backend, MuxConnection] = {}
+        self._locks: dict[Backend, asyncio.Lock] = {}
+        # Servers refusing to multiplex, and when to try them again
+        self.unsupported: dict[Backend, float] = {}
+        self.connects = 0
+        self.sessions = 0
+
+    async def async_open_session(
+        self, backend: Backend, connect_timeout: float
+    ) -> MuxSession | None:
+        """Return a new session to backend, or None if it can't multiplex."""
+        async with self._locks.setdefault(backend, asyncio.Lock()):
+            if (retry := self.unsupported.get(backend)) is not None:
+                if time.monotonic() < retry:
+                    return None
+                del self.unsupported[backend]
+            connection = self._connections.get(backend)
+            if connection is None or connection.closed:
+                connection = await self._async_connect(backend, connect_timeout)
+                if connection is None:
+                    return None
+        self.sessions += 1
+        return connection.async_open()
+
+    async def async_stop(self) -> None:
+        """Close all connections."""
+        for connection in list(self._connections.values()):
+            await connection.async_close()
+        self._connections.clear()
+
+    @callback
+    def async_retire(self) -> None:
+        """Stop taking sessions, without interrupting the running ones.
+
+        Each connection is closed when its last session is done.
+        """
+        for connection in self._connections.values():
+            connection.async_retire()
+        self._connections.clear()
+
+    @callback
+    def async_clear_unsupported(self) -> None:
+        """Try multiplexing with every server again, e.g. after an upgrade."""
+        self.unsupported.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the multiplexer state for diagnostics."""
+        return {
+            "connects": self.connects,
+            "sessions": self.sessions,
+            "connections": {
+                f"{backend.host}:{backend.port}": {
+                    "active_sessions": len(connection.sessions),
+                    "sessions": connection.opened,
+                }
+                for backend, connection in self._connections.items()
+            },
+            "unsupported": [f"{b.host}:{b.port}" for b in self.unsupported],
+        }
+
+    async def _async_connect(
+        self, backend: Backend, connect_timeout: float
+    ) -> MuxConnection | None:
+        """Open the shared connection to backend."""
+        headers = {}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(connect_timeout):
+                ws = await self._session.ws_connect(
+                    f"{backend.ws_url}/stt/mux",
+                    headers=headers,
+                    heartbeat=self.ping_interval,
+                )
+        except aiohttp.WSServerHandshakeError as err:
+            if err.status not in REFUSED_STATUSES:
+                _LOGGER.debug(
+                    "Multiplexed STT to %s refused (%s), using a connection "
+                    "for this utterance",
+                    backend,
+                    err.status,
+                )
+                return None
+            _LOGGER.info(
+                "%s does not multiplex STT (%s), using a connection per utterance",
+                backend,
+                err.status,
+            )
+            self.unsupported[backend] = time.monotonic() + UNSUPPORTED_RETRY
+            return None
+        except TimeoutError as err:
+            # Nothing was sent yet, so the pool may try another server
+            raise aiohttp.ConnectionTimeoutError(
+                f"Timeout connecting to {backend}"
+            ) from err
+        backend.record_latency(time.monotonic() - start)
+        self.connects += 1
+        connection = MuxConnection(self._hass, ws, backend, self._async_forget)
+        self._connections[backend] = connection
+        return connection
+
+    @callback
+    def _async_forget(self, connection: MuxConnection) -> None:
+        """Drop a connection that ended."""
+        for backend, current in list(self._connections.items()):
+            if current is connection:
+                del self._connections[backend]
@@ -0,0 +1,115 @@
+"""Partial transcript publishing for STT Bridge."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util.ulid import ulid_now
+
+from .const import EVENT_PARTIAL_TRANSCRIPT, PARTIAL_EVENT_INTERVAL, SIGNAL_TRANSCRIPT
+
+
+@callback
+def async_send_final(hass: HomeAssistant, entry_id: str, text: str) -> None:
+    """Update the transcript sensor of the config entry with a final result."""
+    async_dispatcher_send(hass, SIGNAL_TRANSCRIPT.format(entry_id), text, True)
+
+
+class PartialTranscripts:
+    """Track the partial transcripts of one utterance and publish them.
+
+    Repeated partials are dropped and partials are published at most once per
+    interval; a partial arriving within the interval is published when it
+    ends, or right away when the utterance ends, so the last partial is never
+    lost. Publishing fires an HA event, carrying an id shared by the partials
+    of the utterance, and updates the transcript sensor of the config entry.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        language: str,
+        fire_events: bool = True,
+        interval: float = PARTIAL_EVENT_INTERVAL,
+        on_update: Callable[[str], None] | None = None,
+    ) -> None:
+        """Initialize the tracker.
+
+        on_update is called with every new partial, before any throttling.
+        """
+        self._hass = hass
+        self._entry_id = entry_id
+        self._language = language
+        self._fire_events = fire_events
+        self._interval = interval
+        self._on_update = on_update
+        self.utterance_id = ulid_now()
+        self.text: str | None = None
+        self._changed = time.monotonic()
+        self._published: str | None = None
+        self._last_publish = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def stable_for(self) -> float:
+        """Return the seconds since the partial last changed."""
+        return time.monotonic() - self._changed
+
+    @callback
+    def async_update(self, text: str) -> None:
+        """Record a partial transcript."""
+        if not text or text == self.text:
+            return
+        self.text = text
+        self._changed = time.monotonic()
+        if self._on_update is not None:
+            self._on_update(text)
+        if self._timer is not None:
+            # A pending publish will pick up the latest text
+            return
+        delay = self._last_publish + self._interval - time.monotonic()
+        if delay > 0:
+            self._timer = self._hass.loop.call_later(delay, self._async_publish)
+        else:
+            self._async_publish()
+
+    @callback
+    def async_finish(self, text: str | None) -> None:
+        """Publish the last partial and send the result of the utterance."""
+        self.async_flush()
+        if text is not None:
+            async_send_final(self._hass, self._entry_id, text)
+
+    @callback
+    def async_flush(self) -> None:
+        """Publish a pending partial right away."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._async_publish()
+
+    @callback
+    def _async_publish(self) -> None:
+        """Fire an event for the latest partial."""
+        self._timer = None
+        if self.text == self._published:
+            return
+        self._published = self.text
+        self._last_publish = time.monotonic()
+        async_dispatcher_send(
+            self._hass, SIGNAL_TRANSCRIPT.format(self._entry_id), self.text, False
+        )
+        if not self._fire_events:
+            return
+        self._hass.bus.async_fire(
+            EVENT_PARTIAL_TRANSCRIPT,
+            {
+                "entry_id": self._entry_id,
+                "utterance_id": self.utterance_id,
+                "language": self._language,
+                "text": self.text,
+            },
+        )
@@ -0,0 +1,319 @@
+"""Pool of bridge servers for STT Bridge."""
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Collection, Iterator, Mapping
+from contextlib import contextmanager, nullcontext
+import logging
+import time
+from typing import Any, TypeVar
+
+import aiohttp
+
+from .const import CONF_ENDPOINTS
+from .exceptions import NoBackendAvailable, QueueFull
+from .scheduler import RequestScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Weight of a new latency sample in the moving average
+EWMA_ALPHA = 0.3
+# Latency assumed for a backend that hasn't answered yet, in seconds
+DEFAULT_LATENCY = 0.05
+# Backends that failed within this many seconds are only used as a last resort
+FAILURE_COOLDOWN = 30.0
+
+# Consecutive failures that open a circuit, and how long it stays open before
+# a single trial request is let through
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 15.0
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Errors raised before any request data reached the server, safe to retry
+RETRYABLE_ERRORS = (
+    aiohttp.ClientConnectorError,
+    aiohttp.ConnectionTimeoutError,
+    aiohttp.WSServerHandshakeError,
+)
+
+
+def parse_endpoint(value: str, default_port: int) -> tuple[str, int]:
+    """Parse "host" or "host:port" into a (host, port) tuple."""
+    host, sep, port = value.strip().rpartition(":")
+    if not sep:
+        return port, default_port
+    return host, int(port)
+
+
+def parse_endpoints(value: str, default_port: int) -> list[str]:
+    """Parse a comma separated list of endpoints into "host:port" strings."""
+    endpoints = []
+    for item in value.split(","):
+        if item.strip():
+            host, port = parse_endpoint(item, default_port)
+            endpoints.append(f"{host}:{port}")
+    return endpoints
+
+
+def entry_endpoints(data: Mapping[str, Any]) -> list[tuple[str, int]]:
+    """Return all (host, port) endpoints of a config entry, primary first."""
+    endpoints = [(data["host"], data["port"])]
+    for endpoint in data.get(CONF_ENDPOINTS, []):
+        host, port = parse_endpoint(endpoint, data["port"])
+        if (host, port) not in endpoints:
+            endpoints.append((host, port))
+    return endpoints
+
+
+class CircuitBreaker:
+    """Stop sending requests to a backend that keeps failing.
+
+    Closed: requests flow. After ``failure_threshold`` consecutive failures
+    the circuit opens and the backend is skipped without any network I/O.
+    Once ``reset_timeout`` has passed, or a health check succeeds, it is
+    half-open: one trial request is let through, and its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the breaker."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = STATE_CLOSED
+        self._opened = 0.0
+        self._trial = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        """Return the circuit state."""
+        if (
+            self._state == STATE_OPEN
+            and time.monotonic() - self._opened >= self.reset_timeout
+        ):
+            self._state = STATE_HALF_OPEN
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """Return if a request may be sent now."""
+        state = self.state
+        return state == STATE_CLOSED or (state == STATE_HALF_OPEN and not self._trial)
+
+    def begin(self) -> None:
+        """Note that a request is being sent."""
+        if self.state == STATE_HALF_OPEN:
+            self._trial = True
+
+    def end(self) -> None:
+        """Note that a request finished, whatever its outcome."""
+        self._trial = False
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self._state = STATE_CLOSED
+        self._trial = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != STATE_OPEN:
+                self.trips += 1
+            self._state = STATE_OPEN
+            self._opened = time.monotonic()
+            self._trial = False
+
+    def record_healthy(self) -> None:
+        """Allow a trial request right away after a successful health check."""
+        if self.state == STATE_OPEN:
+            self._state = STATE_HALF_OPEN
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return breaker state for diagnostics."""
+        return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+class Backend:
+    """A single bridge server and its live load statistics."""
+
+    def __init__(
+        self, host: str, port: int, scheduler: RequestScheduler | None = None
+    ) -> None:
+        """Initialize the backend."""
+        self.host = host
+        self.port = port
+        self.base_url = f"http://{host}:{port}"
+        self.ws_url = f"ws://{host}:{port}"
+        self.in_flight = 0
+        self.latency: float | None = None
+        self.failures = 0
+        self.last_failure: float | None = None
+        self.breaker = CircuitBreaker()
+        self.scheduler = scheduler or RequestScheduler()
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Backend {self.host}:{self.port}>"
+
+    @property
+    def recently_failed(self) -> bool:
+        """Return if the backend failed within the failure cooldown."""
+        return (
+            self.last_failure is not None
+            and time.monotonic() - self.last_failure < FAILURE_COOLDOWN
+        )
+
+    def record_latency(self, seconds: float) -> None:
+        """Record the response latency of a successful request."""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += EWMA_ALPHA * (seconds - self.latency)
+        self.failures = 0
+        self.last_failure = None
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        """Record a failed connection attempt or health check."""
+        self.failures += 1
+        self.last_failure = time.monotonic()
+        self.breaker.record_failure()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return backend state for diagnostics."""
+        return {
+            "endpoint": f"{self.host}:{self.port}",
+            "in_flight": self.in_flight,
+            "latency_ewma_ms": round(self.latency * 1000, 1)
+            if self.latency is not None
+            else None,
+            "failures": self.failures,
+            "circuit": self.breaker.as_dict(),
+            "scheduler": self.scheduler.as_dict(),
+        }
+
+
+class BackendPool:
+    """Spread requests over the bridge servers of a config entry.
+
+    Backends are ranked by (in-flight requests + 1) * latency EWMA, so idle
+    and fast servers are preferred. Requests that fail to connect are retried
+    on the next best backend. Backends whose circuit is open are skipped, so
+    when all of them are down requests fail immediately.
+    """
+
+    def __init__(self, backends: list[Backend]) -> None:
+        """Initialize the pool."""
+        self.backends = backends
+
+    @property
+    def primary(self) -> Backend:
+        """Return the first configured backend."""
+        return self.backends[0]
+
+    @property
+    def busy(self) -> bool:
+        """Return if any backend is serving STT or TTS requests."""
+        return any(backend.scheduler.interactive for backend in self.backends)
+
+    def ranked(self, exclude: Collection[Backend] = ()) -> list[Backend]:
+        """Return the usable backends, best first."""
+        known = [b.latency for b in self.backends if b.latency is not None]
+        # Unmeasured backends are assumed to be as fast as the fastest one,
+        # so they get probed early.
+        default = min(known) if known else DEFAULT_LATENCY
+
+        def score(backend: Backend) -> tuple[bool, float]:
+            latency = backend.latency if backend.latency is not None else default
+            return (backend.recently_failed, (backend.in_flight + 1) * latency)
+
+        return sorted(
+            (b for b in self.backends if b not in exclude and b.breaker.available),
+            key=score,
+        )
+
+    def select(self, exclude: Collection[Backend] = ()) -> Backend | None:
+        """Return the best backend, or None if none is usable."""
+        ranked = self.ranked(exclude)
+        return ranked[0] if ranked else None
+
+    @contextmanager
+    def track(self, backend: Backend) -> Iterator[Backend]:
+        """Count a request against a backend while it runs."""
+        backend.in_flight += 1
+        try:
+            yield backend
+        finally:
+            backend.in_flight -= 1
+
+    async def async_run(
+        self,
+        func: Callable[[Backend], Awaitable[_T]],
+        request_class: str | None = None,
+        timeout: float | None = None,
+    ) -> _T:
+        """Run func against the best backend, failing over on connect errors.
+
+        With a request_class, func waits at most timeout seconds for a slot
+        in the backend's scheduler; a backend whose queue is full is skipped.
+        """
+        tried: set[Backend] = set()
+        last_error: Exception | None = None
+        while (backend := self.select(tried)) is not None:
+            tried.add(backend)
+            slot = (
+                backend.scheduler.slot(request_class, timeout)
+                if request_class is not None
+                else nullcontext()
+            )
+            try:
+                with self.track(backend):
+                    async with slot:
+                        return await self._async_call(backend, func)
+            except RETRYABLE_ERRORS as err:
+                backend.record_failure()
+                last_error = err
+                _LOGGER.warning("STT Bridge server %s unavailable: %s", backend, err)
+            except QueueFull as err:
+                last_error = err
+                _LOGGER.debug("STT Bridge server %s busy: %s", backend, err)
+        if isinstance(last_error, QueueFull):
+            raise last_error
+        if last_error is None:
+            raise NoBackendAvailable(
+                "All STT Bridge servers are unavailable (circuit open)"
+            )
+        raise NoBackendAvailable(
+            f"No STT Bridge server reachable: {last_error}"
+        ) from last_error
+
+    async def _async_call(
+        self, backend: Backend, func: Callable[[Backend], Awaitable[_T]]
+    ) -> _T:
+        """Run func against a backend, recording failures after the request was sent."""
+        backend.breaker.begin()
+        try:
+            return await func(backend)
+        except RETRYABLE_ERRORS:
+            raise
+        except (aiohttp.ClientError, TimeoutError):
+            # Failed after the request was sent; not safe to retry
+            backend.record_failure()
+            raise
+        finally:
+            backend.breaker.end()
+
+    def as_dict(self) -> list[dict[str, Any]]:
+        """Return pool state for diagnostics."""
+        return [backend.as_dict() for backend in self.backends]
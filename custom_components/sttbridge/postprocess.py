@@ -0,0 +1,157 @@
+"""Post-processing of synthesized audio for STT Bridge."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from .audio import StreamingResampler
+from .const import (
+    CONF_TTS_MONO,
+    CONF_TTS_NORMALIZE,
+    CONF_TTS_SAMPLE_RATE,
+    CONF_TTS_TARGET_DB,
+    CONF_TTS_TRIM_SILENCE,
+    DEFAULT_TTS_MONO,
+    DEFAULT_TTS_NORMALIZE,
+    DEFAULT_TTS_SAMPLE_RATE,
+    DEFAULT_TTS_TARGET_DB,
+    DEFAULT_TTS_TRIM_SILENCE,
+)
+from .wav import WAVE_FORMAT_PCM, WavFormat, build_wav_header, parse_wav
+
+FRAME_MS = 10
+# Frames quieter than this are silence, both for trimming and for measuring
+# the speech level
+SILENCE_DB = -50.0
+# Audio kept around the speech so onsets and decays aren't cut off; the tail
+# also keeps a pause between sentences that are played back to back
+LEAD_PAD_MS = 20
+TRAIL_PAD_MS = 150
+# Normalization never raises peaks above this level or the gain above this
+PEAK_CEILING_DB = -1.0
+MAX_GAIN_DB = 20.0
+
+
+@dataclass(frozen=True)
+class PostProcessing:
+    """What to do to synthesized audio before it is cached and played."""
+
+    trim_silence: bool = False
+    target_db: float | None = None
+    sample_rate: int = 0
+    mono: bool = False
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, Any]) -> PostProcessing:
+        """Return the post-processing configured for a config entry."""
+        return cls(
+            trim_silence=options.get(CONF_TTS_TRIM_SILENCE, DEFAULT_TTS_TRIM_SILENCE),
+            target_db=options.get(CONF_TTS_TARGET_DB, DEFAULT_TTS_TARGET_DB)
+            if options.get(CONF_TTS_NORMALIZE, DEFAULT_TTS_NORMALIZE)
+            else None,
+            sample_rate=options.get(CONF_TTS_SAMPLE_RATE, DEFAULT_TTS_SAMPLE_RATE),
+            mono=options.get(CONF_TTS_MONO, DEFAULT_TTS_MONO),
+        )
+
+    @property
+    def variant(self) -> str | None:
+        """Return a name for the processed audio, None if nothing is done."""
+        if not (
+            self.trim_silence
+            or self.target_db is not None
+            or self.sample_rate
+            or self.mono
+        ):
+            return None
+        return (
+            f"trim={int(self.trim_silence)};db={self.target_db};"
+            f"rate={self.sample_rate};mono={int(self.mono)}"
+        )
+
+
+def frame_levels(samples: np.ndarray, frame: int) -> np.ndarray:
+    """Return the level in dBFS of each frame of an (n, channels) array.
+
+    A partial last frame is measured on its own.
+    """
+    if not len(samples):
+        return np.zeros(0, dtype=np.float32)
+    power = np.mean(np.square(samples, dtype=np.float32), axis=1)
+    count = -(-len(power) // frame)
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[: len(power)] = power
+    sums = padded.reshape(count, frame).sum(axis=1)
+    sizes = np.full(count, frame, dtype=np.float32)
+    sizes[-1] = len(power) - (count - 1) * frame
+    return 10.0 * np.log10(sums / sizes / 32768.0**2 + 1e-12)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Cut the silence before and after the speech, keeping a short pad."""
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    loud = np.flatnonzero(frame_levels(samples, frame) > SILENCE_DB)
+    if not len(loud):
+        return samples[:0]
+    start = max(0, loud[0] * frame - sample_rate * LEAD_PAD_MS // 1000)
+    end = min(len(samples), (loud[-1] + 1) * frame + sample_rate * TRAIL_PAD_MS // 1000)
+    return samples[start:end]
+
+
+def normalize_loudness(
+    samples: np.ndarray, sample_rate: int, target_db: float
+) -> np.ndarray:
+    """Scale the audio so its speech level is target_db dBFS.
+
+    The speech level is the RMS of the frames above the silence threshold,
+    so pauses don't pull it down. The gain is limited so peaks stay below
+    PEAK_CEILING_DB and quiet recordings aren't turned into noise.
+    """
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    levels = frame_levels(samples, frame)
+    speech = levels[levels > SILENCE_DB]
+    if not len(speech):
+        return samples
+    level = 10.0 * np.log10(np.mean(10.0 ** (speech / 10.0)))
+    peak = float(np.max(np.abs(samples.astype(np.float32))))
+    gain_db = min(
+        target_db - level,
+        PEAK_CEILING_DB - 20.0 * np.log10(peak / 32768.0),
+        MAX_GAIN_DB,
+    )
+    gain = np.float32(10.0 ** (gain_db / 20.0))
+    return np.clip(np.rint(samples * gain), -32768, 32767).astype("<i2")
+
+
+def process_wav(data: bytes, settings: PostProcessing) -> bytes:
+    """Apply post-processing to a WAV file and return the new file.
+
+    Anything but 16-bit PCM is returned unchanged.
+    """
+    fmt, pcm = parse_wav(data)
+    if fmt.audio_format != WAVE_FORMAT_PCM or fmt.bits_per_sample != 16:
+        return data
+    frames = len(pcm) // fmt.block_align
+    samples = np.frombuffer(pcm, dtype="<i2", count=frames * fmt.channels).reshape(
+        frames, fmt.channels
+    )
+    if settings.trim_silence:
+        samples = trim_silence(samples, fmt.sample_rate)
+    if settings.target_db is not None:
+        samples = normalize_loudness(samples, fmt.sample_rate, settings.target_db)
+
+    # Audio is only ever downsampled and downmixed, to cut the bytes sent to
+    # speakers; upsampling would add bytes without adding anything audible
+    rate = fmt.sample_rate
+    if settings.sample_rate and settings.sample_rate < rate:
+        rate = settings.sample_rate
+    if rate != fmt.sample_rate or (settings.mono and fmt.channels > 1):
+        # The resampler always downmixes; the bridge's voices are mono anyway
+        resampler = StreamingResampler(fmt.sample_rate, rate, fmt.channels)
+        out = resampler.process(np.ascontiguousarray(samples, dtype="<i2").tobytes())
+        fmt = WavFormat(WAVE_FORMAT_PCM, 1, rate, 16)
+    else:
+        out = np.ascontiguousarray(samples, dtype="<i2").tobytes()
+    return build_wav_header(fmt, len(out)) + out
@@ -0,0 +1,225 @@
+"""Background pre-synthesis of known announcements for STT Bridge."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from datetime import datetime, timedelta
+import itertools
+import json
+import logging
+import math
+import string
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .pool import BackendPool
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Phrases a single registration may expand to
+MAX_EXPANSIONS = 1000
+# Registered phrases are checked against the cache this often, so audio that
+# expired or was evicted is synthesized again
+REFRESH_INTERVAL = timedelta(hours=1)
+# Seconds between checks whether live requests have finished
+IDLE_POLL_INTERVAL = 1.0
+
+# Synthesizes a phrase into the cache, returns False if it was cached already
+Synthesizer = Callable[[str, str, dict[str, Any] | None], Awaitable[bool]]
+
+
+def _store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the registrations of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.prewarm.{entry_id}")
+
+
+async def async_remove_registrations(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the stored registrations of a deleted config entry."""
+    await _store(hass, entry_id).async_remove()
+
+
+def expand_phrases(
+    phrases: Iterable[str], values: Mapping[str, Sequence[str]]
+) -> list[str]:
+    """Return every phrase with its {placeholders} filled in from values.
+
+    A phrase with several placeholders expands to all combinations of their
+    values. Duplicates are dropped, the order is kept.
+    """
+    formatter = string.Formatter()
+    expanded: dict[str, None] = {}
+    for phrase in phrases:
+        try:
+            fields = list(
+                dict.fromkeys(
+                    name
+                    for _, name, _, _ in formatter.parse(phrase)
+                    if name is not None
+                )
+            )
+        except ValueError as err:
+            raise ValueError(f"Invalid phrase {phrase!r}: {err}") from err
+        for name in fields:
+            if not name.isidentifier():
+                raise ValueError(f"Invalid placeholder {{{name}}} in {phrase!r}")
+            if not values.get(name):
+                raise ValueError(f"No values for {{{name}}} in {phrase!r}")
+        count = math.prod(len(values[name]) for name in fields)
+        if len(expanded) + count > MAX_EXPANSIONS:
+            raise ValueError(f"Phrases expand to more than {MAX_EXPANSIONS} messages")
+        for combination in itertools.product(*(values[name] for name in fields)):
+            expanded[phrase.format(**dict(zip(fields, combination)))] = None
+    return list(expanded)
+
+
+class PrewarmWorker:
+    """Synthesize registered announcements into the TTS cache ahead of time.
+
+    Phrases are synthesized one at a time as background requests, only while
+    no STT or TTS request is running or waiting for a bridge server, and at
+    most ``rate`` per minute. Persistent registrations are stored and checked
+    against the cache again at startup and every REFRESH_INTERVAL.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        pool: BackendPool,
+        synthesize: Synthesizer,
+        rate: float,
+    ) -> None:
+        """Initialize the worker."""
+        self._hass = hass
+        self._pool = pool
+        self._synthesize = synthesize
+        self._interval = 0.0
+        self.async_set_rate(rate)
+        self._store = _store(hass, entry_id)
+        self._groups: list[dict[str, Any]] = []
+        self._queue: deque[tuple[str, str, dict[str, Any] | None]] = deque()
+        self._queued: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._unsub_refresh: Callable[[], None] | None = None
+        self.synthesized = 0
+        self.cached = 0
+        self.failed = 0
+
+    async def async_start(self) -> None:
+        """Load the stored registrations and start working through them."""
+        if (stored := await self._store.async_load()) is not None:
+            self._groups = stored["groups"]
+        self._async_refresh()
+        self._task = self._hass.async_create_background_task(
+            self._async_run(), f"{DOMAIN} TTS pre-warm"
+        )
+        self._unsub_refresh = async_track_time_interval(
+            self._hass, self._async_scheduled_refresh, REFRESH_INTERVAL
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the worker."""
+        if self._unsub_refresh is not None:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def async_register(
+        self,
+        phrases: list[str],
+        values: dict[str, list[str]],
+        language: str,
+        options: dict[str, Any] | None,
+        persist: bool,
+    ) -> int:
+        """Queue the expansions of phrases and return how many there are.
+
+        Raises ValueError if the phrases can't be expanded.
+        """
+        group = {
+            "phrases": phrases,
+            "values": values,
+            "language": language,
+            "options": options or None,
+        }
+        count = self._async_enqueue(group)
+        if persist and group not in self._groups:
+            self._groups.append(group)
+            await self._store.async_save({"groups": self._groups})
+        return count
+
+    @callback
+    def async_set_rate(self, rate: float) -> None:
+        """Set the phrases synthesized per minute (0 for no limit)."""
+        self._interval = 60.0 / rate if rate > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the worker state for diagnostics."""
+        return {
+            "registrations": len(self._groups),
+            "queued": len(self._queue),
+            "synthesized": self.synthesized,
+            "cached": self.cached,
+            "failed": self.failed,
+        }
+
+    @callback
+    def _async_scheduled_refresh(self, _now: datetime) -> None:
+        """Queue the stored registrations again on the refresh interval."""
+        self._async_refresh()
+
+    @callback
+    def _async_refresh(self) -> None:
+        """Queue every stored registration."""
+        for group in self._groups:
+            try:
+                self._async_enqueue(group)
+            except ValueError as err:
+                _LOGGER.warning("Skipping stored TTS pre-warm phrases: %s", err)
+
+    @callback
+    def _async_enqueue(self, group: dict[str, Any]) -> int:
+        """Queue the expansions of a registration that aren't queued yet."""
+        messages = expand_phrases(group["phrases"], group["values"])
+        for message in messages:
+            job = (message, group["language"], group["options"])
+            key = json.dumps(job, sort_keys=True)
+            if key not in self._queued:
+                self._queued.add(key)
+                self._queue.append(job)
+        self._wakeup.set()
+        return len(messages)
+
+    async def _async_run(self) -> None:
+        """Synthesize queued phrases while the bridge is idle."""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # Live traffic always goes first
+            while self._pool.busy:
+                await asyncio.sleep(IDLE_POLL_INTERVAL)
+            job = self._queue.popleft()
+            self._queued.discard(json.dumps(job, sort_keys=True))
+            try:
+                if not await self._synthesize(*job):
+                    self.cached += 1
+                    continue
+                self.synthesized += 1
+            except HomeAssistantError as err:
+                self.failed += 1
+                _LOGGER.debug("Could not pre-warm %r: %s", job[0], err)
+            # Only requests to the bridge count against the rate
+            await asyncio.sleep(self._interval)
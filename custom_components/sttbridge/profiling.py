@@ -0,0 +1,312 @@
+"""Event loop profiling for STT Bridge.
+
+While a profiling session runs, every callback of the event loop is timed.
+A callback that resumes a task runs one await-free stretch of its
+coroutine; stretches of tasks running integration code are attributed to
+the innermost integration function on the task's chain of awaits when the
+stretch ends. Any callback holding the loop longer than a threshold is
+flagged, whether it is ours or not, so the results show if the integration
+is the source of loop stalls. Optionally a thread samples the loop's stack
+and writes the samples that pass through the integration to a file, in the
+collapsed format flame graph tools read.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from pathlib import Path
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Code of the integration, recognized by the directory of its files
+PACKAGE_DIR = str(Path(__file__).parent)
+# Slow callbacks kept, and listed in diagnostics
+MAX_SLOW_CALLBACKS = 50
+SLOWEST_CALLBACKS = 10
+# Functions listed in the sampling summary
+TOP_FUNCTIONS = 15
+
+
+def _is_ours(code: CodeType) -> bool:
+    """Return if code belongs to the integration, other than the profiler."""
+    return code.co_filename.startswith(PACKAGE_DIR) and code.co_filename != __file__
+
+
+def _label(code: CodeType) -> str:
+    """Return module.function for a code object."""
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{Path(code.co_filename).stem}.{name}"
+
+
+def _innermost_ours(coro: Any) -> str | None:
+    """Return the innermost integration function in a chain of awaits."""
+    found = None
+    while coro is not None:
+        code = (
+            getattr(coro, "cr_code", None)
+            or getattr(coro, "ag_code", None)
+            or getattr(coro, "gi_code", None)
+        )
+        if code is not None and _is_ours(code):
+            found = _label(code)
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "ag_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+        )
+    return found
+
+
+@dataclass
+class StretchStats:
+    """Timings of the await-free stretches of one function."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    slow: int = 0
+
+    def add(self, duration: float, slow: bool) -> None:
+        """Account for one stretch."""
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.slow += slow
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the timings in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "max_ms": round(self.max * 1000, 1),
+            "total_ms": round(self.total * 1000, 1),
+            "slow": self.slow,
+        }
+
+
+class _StackSampler(threading.Thread):
+    """Sample the stack of the event loop thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        """Initialize the sampler."""
+        super().__init__(name=f"{DOMAIN} stack sampler", daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stopped = threading.Event()
+        self.samples = 0
+        # Collapsed stacks through integration code, and integration
+        # functions, by the samples they were seen in
+        self.stacks: Counter[str] = Counter()
+        self.functions: Counter[str] = Counter()
+
+    def run(self) -> None:
+        """Sample until stopped."""
+        while not self._stopped.wait(self._interval):
+            frame: FrameType | None = sys._current_frames().get(self._thread_id)
+            self.samples += 1
+            stack: list[str] = []
+            ours: set[str] = set()
+            while frame is not None:
+                # Leave out the timing wrapper of the profiler
+                if frame.f_code.co_filename != __file__:
+                    stack.append(label := _label(frame.f_code))
+                    if _is_ours(frame.f_code):
+                        ours.add(label)
+                frame = frame.f_back
+            if ours:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.functions.update(ours)
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the thread to end."""
+        self._stopped.set()
+        self.join()
+
+
+class LoopProfiler:
+    """Time the callbacks of the event loop for a limited time.
+
+    Timing replaces asyncio's Handle._run, so it sees every callback on the
+    loop, and costs a little on each of them; it is put back when the
+    session ends. The results of the last session are kept.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the profiler."""
+        self._hass = hass
+        self._original_run: Callable[[asyncio.Handle], None] | None = None
+        self._unsub_stop: Callable[[], None] | None = None
+        self._sampler: _StackSampler | None = None
+        self._reset(0.0)
+        self.started: datetime | None = None
+
+    @property
+    def running(self) -> bool:
+        """Return if a session is running."""
+        return self._original_run is not None
+
+    async def async_start(
+        self,
+        duration: float,
+        threshold: float,
+        sample_interval: float | None = None,
+        profile_path: Path | None = None,
+    ) -> None:
+        """Start a session of duration seconds, ending a running one.
+
+        Callbacks longer than threshold seconds are flagged. With a sample
+        interval, the stack is also sampled and written to profile_path.
+        """
+        await self.async_stop()
+        self._reset(threshold)
+        self.started = dt_util.utcnow()
+        if sample_interval and profile_path is not None:
+            self.profile_path = profile_path
+            self._sampler = _StackSampler(threading.get_ident(), sample_interval)
+            self._sampler.start()
+
+        original = self._original_run = asyncio.Handle._run
+        record = self._record
+
+        def _run(handle: asyncio.Handle) -> None:
+            start = time.perf_counter()
+            original(handle)
+            record(handle, time.perf_counter() - start)
+
+        asyncio.Handle._run = _run  # type: ignore[method-assign]
+        self._unsub_stop = async_call_later(
+            self._hass, duration, self._async_scheduled_stop
+        )
+        _LOGGER.info(
+            "Profiling the event loop for %s s, flagging callbacks over %s ms",
+            duration,
+            threshold * 1000,
+        )
+
+    async def async_stop(self) -> None:
+        """End the session and write the stack samples."""
+        if self._original_run is None:
+            return
+        asyncio.Handle._run = self._original_run  # type: ignore[method-assign]
+        self._original_run = None
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        self.ended = dt_util.utcnow()
+        _LOGGER.info(
+            "Event loop profiling ended: %d of %d callbacks over %s ms, "
+            "%d of them in the integration",
+            self.slow_total,
+            self.callbacks,
+            self.threshold * 1000,
+            self.slow_ours,
+        )
+        if (sampler := self._sampler) is None:
+            return
+        self._sampler = None
+        await self._hass.async_add_executor_job(sampler.stop)
+        self.samples = sampler.samples
+        self.top_functions = sampler.functions.most_common(TOP_FUNCTIONS)
+        assert self.profile_path is not None
+        try:
+            await self._hass.async_add_executor_job(
+                self._write, self.profile_path, sampler.stacks
+            )
+        except OSError as err:
+            _LOGGER.error("Could not write %s: %s", self.profile_path, err)
+            return
+        _LOGGER.info("Wrote integration stack samples to %s", self.profile_path)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the results of the last session for diagnostics."""
+        stretches = sorted(
+            self.stretches.items(), key=lambda item: item[1].max, reverse=True
+        )
+        return {
+            "running": self.running,
+            "started": self.started.isoformat() if self.started else None,
+            "ended": self.ended.isoformat() if self.ended else None,
+            "threshold_ms": self.threshold * 1000,
+            "callbacks": self.callbacks,
+            "loop_busy_ms": round(self.busy * 1000, 1),
+            "slow_callbacks": self.slow_total,
+            "slow_callbacks_ours": self.slow_ours,
+            "stretches": {name: stats.as_dict() for name, stats in stretches},
+            "slowest": sorted(self.slow, key=lambda slow: slow["ms"], reverse=True)[
+                :SLOWEST_CALLBACKS
+            ],
+            "sampling": {
+                "file": str(self.profile_path) if self.profile_path else None,
+                "samples": self.samples,
+                "top_functions": dict(self.top_functions),
+            },
+        }
+
+    def _reset(self, threshold: float) -> None:
+        """Clear the results for a new session."""
+        self.threshold = threshold
+        self.ended: datetime | None = None
+        self.callbacks = 0
+        self.busy = 0.0
+        self.stretches: dict[str, StretchStats] = {}
+        self.slow: deque[dict[str, Any]] = deque(maxlen=MAX_SLOW_CALLBACKS)
+        self.slow_total = 0
+        self.slow_ours = 0
+        self.profile_path: Path | None = None
+        self.samples = 0
+        self.top_functions: list[tuple[str, int]] = []
+
+    def _record(self, handle: asyncio.Handle, duration: float) -> None:
+        """Account for one callback."""
+        self.callbacks += 1
+        self.busy += duration
+        slow = duration >= self.threshold
+        name = None
+        # Callbacks that step a task are bound to it
+        task = getattr(handle._callback, "__self__", None)
+        if isinstance(task, asyncio.Task) and (
+            name := _innermost_ours(task.get_coro())
+        ):
+            self.stretches.setdefault(name, StretchStats()).add(duration, slow)
+        if not slow:
+            return
+        self.slow_total += 1
+        self.slow_ours += name is not None
+        self.slow.append(
+            {
+                "ms": round(duration * 1000, 1),
+                "at": dt_util.utcnow().isoformat(),
+                "ours": name is not None,
+                "callback": name or repr(handle)[:200],
+            }
+        )
+
+    @callback
+    def _async_scheduled_stop(self, _now: Any) -> None:
+        """End the session when its time is up."""
+        self._unsub_stop = None
+        self._hass.async_create_background_task(
+            self.async_stop(), f"{DOMAIN} stop profiling"
+        )
+
+    @staticmethod
+    def _write(path: Path, stacks: Counter[str]) -> None:
+        """Write the samples in the collapsed stack format."""
+        with path.open("w", encoding="utf-8") as file:
+            for stack, samples in stacks.most_common():
+                file.write(f"{stack} {samples}\n")
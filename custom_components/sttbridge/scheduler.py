@@ -0,0 +1,201 @@
+"""Request scheduling for STT Bridge servers."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from collections.abc import AsyncIterator, Iterator, Mapping
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+from .const import (
+    CONF_BACKGROUND_CONCURRENCY,
+    CONF_MAX_CONCURRENT,
+    CONF_STT_CONCURRENCY,
+    CONF_TTS_CONCURRENCY,
+    DEFAULT_BACKGROUND_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_STT_CONCURRENCY,
+    DEFAULT_TTS_CONCURRENCY,
+)
+from .exceptions import QueueFull, RequestShed
+
+# Request classes, highest priority first
+REQUEST_STT = "stt"
+REQUEST_TTS = "tts"
+REQUEST_BACKGROUND = "background"
+REQUEST_CLASSES = (REQUEST_STT, REQUEST_TTS, REQUEST_BACKGROUND)
+
+# Requests of a class waiting for one server before new ones are rejected
+QUEUE_SIZES = {REQUEST_STT: 8, REQUEST_TTS: 16, REQUEST_BACKGROUND: 64}
+
+
+def limits_from_options(options: Mapping[str, Any]) -> tuple[int, dict[str, int]]:
+    """Return the capacity and class limits set in config entry options."""
+    return (
+        options.get(CONF_MAX_CONCURRENT, DEFAULT_MAX_CONCURRENT),
+        {
+            REQUEST_STT: options.get(CONF_STT_CONCURRENCY, DEFAULT_STT_CONCURRENCY),
+            REQUEST_TTS: options.get(CONF_TTS_CONCURRENCY, DEFAULT_TTS_CONCURRENCY),
+            REQUEST_BACKGROUND: options.get(
+                CONF_BACKGROUND_CONCURRENCY, DEFAULT_BACKGROUND_CONCURRENCY
+            ),
+        },
+    )
+
+
+class RequestScheduler:
+    """Admit the requests to one bridge server by priority.
+
+    At most capacity requests run at once, and every class has its own limit
+    below that, so TTS and background jobs can't take the slots voice
+    commands need. When a slot frees up, the highest priority request that
+    may start goes next. A request that finds its queue full is rejected
+    right away, and a queued request is shed when its deadline passes instead
+    of being served late. STT utterances only hold a slot while they connect
+    and are counted in ``streams`` while the user speaks.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_MAX_CONCURRENT,
+        limits: Mapping[str, int] | None = None,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.capacity = capacity
+        self.limits = {
+            REQUEST_STT: DEFAULT_STT_CONCURRENCY,
+            REQUEST_TTS: DEFAULT_TTS_CONCURRENCY,
+            REQUEST_BACKGROUND: DEFAULT_BACKGROUND_CONCURRENCY,
+            **(limits or {}),
+        }
+        self.running: Counter[str] = Counter()
+        self.admitted: Counter[str] = Counter()
+        self.shed: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+        self.streams = 0
+        self._queues: dict[str, deque[asyncio.Future[None]]] = {
+            request_class: deque() for request_class in REQUEST_CLASSES
+        }
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, Any]) -> RequestScheduler:
+        """Return a scheduler with the limits of a config entry."""
+        return cls(*limits_from_options(options))
+
+    @asynccontextmanager
+    async def slot(
+        self, request_class: str, timeout: float | None = None
+    ) -> AsyncIterator[None]:
+        """Hold a slot for a request, waiting at most timeout seconds for it."""
+        await self._async_acquire(request_class, timeout)
+        try:
+            yield
+        finally:
+            self._release(request_class)
+
+    @contextmanager
+    def stream(self) -> Iterator[None]:
+        """Count an STT utterance streaming to the server without a slot."""
+        self.streams += 1
+        try:
+            yield
+        finally:
+            self.streams -= 1
+
+    @property
+    def interactive(self) -> bool:
+        """Return if STT or TTS requests are running or waiting."""
+        return bool(self.streams) or any(
+            self.running[request_class] or self._queues[request_class]
+            for request_class in (REQUEST_STT, REQUEST_TTS)
+        )
+
+    def queued(self, request_class: str) -> int:
+        """Return the number of waiting requests of a class."""
+        return len(self._queues[request_class])
+
+    def configure(self, capacity: int, limits: Mapping[str, int]) -> None:
+        """Change the limits, starting waiting requests that now fit.
+
+        Running requests are never interrupted; when the limits shrink, new
+        requests wait until enough of them have finished.
+        """
+        self.capacity = capacity
+        self.limits.update(limits)
+        self._start_waiting()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the scheduler state for diagnostics."""
+        return {
+            "capacity": self.capacity,
+            "streams": self.streams,
+            **{
+                request_class: {
+                    "limit": self.limits[request_class],
+                    "running": self.running[request_class],
+                    "queued": self.queued(request_class),
+                    "admitted": self.admitted[request_class],
+                    "shed": self.shed[request_class],
+                    "rejected": self.rejected[request_class],
+                }
+                for request_class in REQUEST_CLASSES
+            },
+        }
+
+    def _can_start(self, request_class: str) -> bool:
+        """Return if a request of a class may start now."""
+        return (
+            sum(self.running.values()) < self.capacity
+            and self.running[request_class] < self.limits[request_class]
+        )
+
+    def _start(self, request_class: str) -> None:
+        """Count a request as running."""
+        self.running[request_class] += 1
+        self.admitted[request_class] += 1
+
+    def _release(self, request_class: str) -> None:
+        """Free the slot of a request and start the next ones."""
+        self.running[request_class] -= 1
+        self._start_waiting()
+
+    def _start_waiting(self) -> None:
+        """Start the waiting requests that may start, by priority."""
+        for next_class in REQUEST_CLASSES:
+            queue = self._queues[next_class]
+            while queue and self._can_start(next_class):
+                waiter = queue.popleft()
+                if waiter.done():
+                    # Cancelled, its request hasn't resumed to leave the queue
+                    continue
+                self._start(next_class)
+                waiter.set_result(None)
+
+    async def _async_acquire(self, request_class: str, timeout: float | None) -> None:
+        """Wait for a slot."""
+        queue = self._queues[request_class]
+        # Requests of a class start in order of arrival
+        if not queue and self._can_start(request_class):
+            self._start(request_class)
+            return
+        if len(queue) >= QUEUE_SIZES[request_class]:
+            self.rejected[request_class] += 1
+            raise QueueFull(f"Too many {request_class} requests waiting")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter
+        except (TimeoutError, asyncio.CancelledError) as err:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the wait ended, pass the slot on
+                self._release(request_class)
+            elif waiter in queue:
+                queue.remove(waiter)
+            if isinstance(err, TimeoutError):
+                self.shed[request_class] += 1
+                raise RequestShed(
+                    f"No slot for a {request_class} request within {timeout} s"
+                ) from err
+            raise
@@ -0,0 +1,139 @@
+"""Sensor platform for STT Bridge."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, SIGNAL_TRANSCRIPT
+from .metrics import PERCENTILES, STTBridgeMetrics
+from .models import STTBridgeData
+
+# Longest state Home Assistant accepts
+MAX_STATE_LENGTH = 255
+
+# Latency sensors read the in-memory metrics
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+@dataclass(frozen=True, kw_only=True)
+class STTBridgeLatencySensorDescription(SensorEntityDescription):
+    """Describes a latency percentile sensor."""
+
+    kind: str
+    phase: str
+    percentile: int
+
+
+LATENCY_PHASES = [
+    ("tts", "first_byte", "TTS First Byte"),
+    ("tts", "total", "TTS Total"),
+    ("stt", "connect", "STT Connect"),
+    ("stt", "first_byte", "STT First Byte"),
+    ("stt", "final", "STT Final After Speech"),
+]
+
+LATENCY_SENSORS = [
+    STTBridgeLatencySensorDescription(
+        key=f"{kind}_{phase}_p{percentile}",
+        name=f"STT/TTS Bridge {name} p{percentile}",
+        kind=kind,
+        phase=phase,
+        percentile=percentile,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        # p95 is the one to watch; the others are there when needed
+        entity_registry_enabled_default=percentile == 95,
+    )
+    for kind, phase, name in LATENCY_PHASES
+    for percentile in PERCENTILES
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up STT Bridge sensor platform."""
+    data: STTBridgeData = hass.data[DOMAIN][config_entry.entry_id]
+
+    async_add_entities(
+        [
+            STTBridgeTranscriptSensor(config_entry),
+            *(
+                STTBridgeLatencySensor(data.metrics, config_entry, description)
+                for description in LATENCY_SENSORS
+            ),
+        ]
+    )
+
+
+class STTBridgeTranscriptSensor(SensorEntity):
+    """The latest transcript of an utterance, updated while it is spoken."""
+
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:text-recognition"
+    _attr_should_poll = False
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._config_entry = config_entry
+        self._attr_name = "STT/TTS Bridge Transcript"
+        self._attr_unique_id = f"{config_entry.entry_id}_transcript"
+        self._attr_extra_state_attributes = {"final": False}
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to transcript updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_TRANSCRIPT.format(self._config_entry.entry_id),
+                self._async_update_transcript,
+            )
+        )
+
+    @callback
+    def _async_update_transcript(self, text: str, final: bool) -> None:
+        """Show a new partial or final transcript."""
+        self._attr_native_value = text[:MAX_STATE_LENGTH]
+        self._attr_extra_state_attributes = {"final": final}
+        self.async_write_ha_state()
+
+
+class STTBridgeLatencySensor(SensorEntity):
+    """A latency percentile over the most recent calls."""
+
+    entity_description: STTBridgeLatencySensorDescription
+
+    def __init__(
+        self,
+        metrics: STTBridgeMetrics,
+        config_entry: ConfigEntry,
+        description: STTBridgeLatencySensorDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._metrics = metrics
+        self._attr_unique_id = f"{config_entry.entry_id}_{description.key}"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the percentile in milliseconds."""
+        description = self.entity_description
+        calls = getattr(self._metrics, description.kind)
+        return calls.phases[description.phase].percentile(description.percentile)
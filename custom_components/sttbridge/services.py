@@ -0,0 +1,126 @@
+"""Services for the STT Bridge integration."""
+from __future__ import annotations
+
+from pathlib import Path
+import time
+
+from homeassistant.const import ATTR_CONFIG_ENTRY_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+
+from .const import (
+    ATTR_DURATION,
+    ATTR_LANGUAGE,
+    ATTR_OPTIONS,
+    ATTR_PERSIST,
+    ATTR_PHRASES,
+    ATTR_SAMPLE,
+    ATTR_SAMPLE_INTERVAL_MS,
+    ATTR_SLOW_THRESHOLD_MS,
+    ATTR_VALUES,
+    DATA_PROFILER,
+    DOMAIN,
+    SERVICE_PREWARM,
+    SERVICE_PROFILE,
+)
+from .models import STTBridgeData
+from .profiling import LoopProfiler
+
+PREWARM_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_PHRASES): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_VALUES, default={}): {
+            cv.string: vol.All(cv.ensure_list, [cv.string])
+        },
+        vol.Required(ATTR_LANGUAGE): cv.string,
+        vol.Optional(ATTR_OPTIONS, default={}): dict,
+        vol.Optional(ATTR_PERSIST, default=True): cv.boolean,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=3600)
+        ),
+        vol.Optional(ATTR_SLOW_THRESHOLD_MS, default=50): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+        vol.Optional(ATTR_SAMPLE, default=False): cv.boolean,
+        vol.Optional(ATTR_SAMPLE_INTERVAL_MS, default=5): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the STT Bridge services."""
+
+    async def async_prewarm(call: ServiceCall) -> ServiceResponse:
+        """Queue phrases for synthesis into the TTS cache."""
+        entries: dict[str, STTBridgeData] = hass.data.get(DOMAIN, {})
+        if (entry_id := call.data.get(ATTR_CONFIG_ENTRY_ID)) is not None:
+            entries = {entry_id: entries[entry_id]} if entry_id in entries else {}
+        workers = [data.prewarm for data in entries.values() if data.prewarm]
+        if not workers:
+            raise ServiceValidationError("No loaded STT Bridge to pre-warm")
+
+        queued = 0
+        for worker in workers:
+            try:
+                queued += await worker.async_register(
+                    call.data[ATTR_PHRASES],
+                    call.data[ATTR_VALUES],
+                    call.data[ATTR_LANGUAGE],
+                    call.data[ATTR_OPTIONS],
+                    call.data[ATTR_PERSIST],
+                )
+            except ValueError as err:
+                raise ServiceValidationError(str(err)) from err
+        return {"queued": queued}
+
+    async def async_profile(call: ServiceCall) -> ServiceResponse:
+        """Start or end profiling the event loop."""
+        if (profiler := hass.data.get(DATA_PROFILER)) is None:
+            profiler = hass.data[DATA_PROFILER] = LoopProfiler(hass)
+        if not (duration := call.data[ATTR_DURATION]):
+            await profiler.async_stop()
+            return profiler.as_dict()
+        profile_path = None
+        if call.data[ATTR_SAMPLE]:
+            profile_path = Path(
+                hass.config.path(f"{DOMAIN}_profile.{int(time.time())}.folded")
+            )
+        await profiler.async_start(
+            duration,
+            call.data[ATTR_SLOW_THRESHOLD_MS] / 1000,
+            call.data[ATTR_SAMPLE_INTERVAL_MS] / 1000,
+            profile_path,
+        )
+        return {"file": str(profile_path) if profile_path else None}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PREWARM,
+        async_prewarm,
+        schema=PREWARM_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
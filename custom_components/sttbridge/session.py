@@ -0,0 +1,119 @@
+"""HTTP client session of an STT Bridge config entry."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+import logging
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+from aiohttp.hdrs import USER_AGENT
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+
+from .const import (
+    CONF_HTTP_KEEPALIVE,
+    CONF_HTTP_POOL_SIZE,
+    CONF_HTTP_PRECONNECT,
+    DEFAULT_HTTP_KEEPALIVE,
+    DEFAULT_HTTP_POOL_SIZE,
+    DEFAULT_HTTP_PRECONNECT,
+    DNS_CACHE_TTL,
+)
+from .metrics import ConnectionMetrics
+from .pool import BackendPool
+
+_LOGGER = logging.getLogger(__name__)
+
+PRECONNECT_TIMEOUT = 2.0
+
+
+def _trace_config(metrics: ConnectionMetrics) -> aiohttp.TraceConfig:
+    """Return a trace config that records new and reused connections."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_create_start(
+        _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+    ) -> None:
+        context.connect_start = asyncio.get_running_loop().time()
+
+    async def on_create_end(
+        _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+    ) -> None:
+        metrics.created(asyncio.get_running_loop().time() - context.connect_start)
+
+    async def on_reuse(
+        _session: aiohttp.ClientSession, _context: SimpleNamespace, _params: Any
+    ) -> None:
+        metrics.reused()
+
+    trace.on_connection_create_start.append(on_create_start)
+    trace.on_connection_create_end.append(on_create_end)
+    trace.on_connection_reuseconn.append(on_reuse)
+    return trace
+
+
+def create_bridge_session(
+    options: Mapping[str, Any], metrics: ConnectionMetrics
+) -> aiohttp.ClientSession:
+    """Return a client session with a connector tuned for the bridge.
+
+    The bridge is a chatty LAN service, so idle connections are kept open
+    much longer than the shared Home Assistant session does, host names are
+    resolved once per DNS_CACHE_TTL, and the connection limit is per bridge
+    server so other integrations can't use up our connections. aiohttp
+    already sets TCP_NODELAY on every connection.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=options.get(CONF_HTTP_POOL_SIZE, DEFAULT_HTTP_POOL_SIZE),
+        keepalive_timeout=options.get(CONF_HTTP_KEEPALIVE, DEFAULT_HTTP_KEEPALIVE),
+        ttl_dns_cache=DNS_CACHE_TTL,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={USER_AGENT: SERVER_SOFTWARE},
+        trace_configs=[_trace_config(metrics)],
+    )
+
+
+async def async_preconnect(
+    session: aiohttp.ClientSession,
+    pool: BackendPool,
+    token: str | None,
+    options: Mapping[str, Any],
+) -> None:
+    """Open keep-alive connections to every bridge server.
+
+    Concurrent /healthz requests each need their own connection, which is
+    returned to the connector afterwards, so the first TTS requests skip the
+    TCP handshake.
+    """
+    count = min(
+        options.get(CONF_HTTP_PRECONNECT, DEFAULT_HTTP_PRECONNECT),
+        options.get(CONF_HTTP_POOL_SIZE, DEFAULT_HTTP_POOL_SIZE),
+    )
+    if count <= 0:
+        return
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    async def connect(url: str) -> None:
+        try:
+            async with session.get(
+                url,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=PRECONNECT_TIMEOUT),
+            ) as resp:
+                await resp.read()
+        except (aiohttp.ClientError, TimeoutError) as err:
+            _LOGGER.debug("Pre-connecting to %s failed: %s", url, err)
+
+    await asyncio.gather(
+        *(
+            connect(f"{backend.base_url}/healthz")
+            for backend in pool.backends
+            for _ in range(count)
+        )
+    )
@@ -0,0 +1,66 @@
+"""Deduplication of concurrent identical calls for STT Bridge."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class _Call(Generic[_T]):
+    """A running call and the number of callers waiting for it."""
+
+    task: asyncio.Task[_T]
+    waiters: int = 0
+
+
+class SingleFlight(Generic[_T]):
+    """Run one call per key and share its result with concurrent callers.
+
+    Every caller gets the very same result object, or the same exception.
+    A caller that is cancelled only stops waiting; the call itself is
+    cancelled once no caller is waiting for it anymore.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize the group."""
+        self._name = name
+        self._calls: dict[str, _Call[_T]] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def async_run(self, key: str, func: Callable[[], Awaitable[_T]]) -> _T:
+        """Return the result of func, joining a running call for key."""
+        if (call := self._calls.get(key)) is None:
+            call = _Call(asyncio.create_task(func(), name=f"{self._name} {key[:8]}"))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return counters for diagnostics."""
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "shared": self.shared,
+        }
+
+    def _forget(self, key: str, call: _Call[_T]) -> None:
+        """Drop a finished call so the next caller starts a new one."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
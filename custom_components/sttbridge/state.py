@@ -0,0 +1,80 @@
+"""Last known bridge state for STT Bridge, kept across restarts."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .health import BridgeCapabilities, HealthCoordinator
+from .voices import VoiceCatalog
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Seconds changes are collected before they are written
+SAVE_DELAY = 10
+
+
+def _store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the bridge state of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.state.{entry_id}")
+
+
+async def async_remove_state(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the stored state of a deleted config entry."""
+    await _store(hass, entry_id).async_remove()
+
+
+class BridgeStateStore:
+    """Persist the capabilities and voice catalog last seen from the bridge.
+
+    Setup restores them before anything goes over the network, so the
+    platforms come up with the state of the last run while the bridge is
+    probed in the background, even if it is asleep.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store = _store(hass, entry_id)
+        self._stored: dict[str, Any] = {}
+        self._health: HealthCoordinator | None = None
+        self._voices: VoiceCatalog | None = None
+        self.restored = False
+
+    async def async_load(self) -> None:
+        """Load the state saved by the last run."""
+        self._stored = await self._store.async_load() or {}
+
+    @callback
+    def async_restore(self, health: HealthCoordinator, voices: VoiceCatalog) -> None:
+        """Apply the loaded state, and save it again whenever it changes."""
+        self._health = health
+        self._voices = voices
+        if "capabilities" in self._stored:
+            health.capabilities = BridgeCapabilities.from_dict(
+                self._stored["capabilities"]
+            )
+            self.restored = True
+        if isinstance(stored_voices := self._stored.get("voices"), dict):
+            voices.async_restore(stored_voices)
+            self.restored = True
+        if self.restored:
+            _LOGGER.debug("Restored bridge state of the last run")
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the state after the next changes have settled."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the state to save."""
+        data = dict(self._stored)
+        if self._health is not None:
+            data["capabilities"] = self._health.capabilities.as_dict()
+        if self._voices is not None and (voices := self._voices.as_stored()):
+            data["voices"] = voices
+        return data
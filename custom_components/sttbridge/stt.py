@@ -2,19 +2,65 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from contextlib import AsyncExitStack
+from functools import partial
 import logging
+import time
 
 import aiohttp
 from homeassistant.components import stt
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util.json import json_loads
 
-from .const import DOMAIN
+from .audio import FrameCoalescer, ReplayBuffer, StreamingResampler
+from .const import (
+    CONF_PARTIAL_EVENTS,
+    CONF_PARTIAL_STABLE_MS,
+    CONF_STT_FRAME_MS,
+    CONF_STT_REPLAY_SECONDS,
+    CONF_STT_TRANSPORT,
+    CONF_TIMEOUT_CONNECT,
+    CONF_TIMEOUT_FIRST_BYTE,
+    CONF_VAD_ENABLED,
+    CONF_VAD_THRESHOLD_DB,
+    CONF_VAD_TRAILING_SILENCE_MS,
+    DEFAULT_PARTIAL_EVENTS,
+    DEFAULT_PARTIAL_STABLE_MS,
+    DEFAULT_STT_FRAME_MS,
+    DEFAULT_STT_REPLAY_SECONDS,
+    DEFAULT_STT_TRANSPORT,
+    DEFAULT_TIMEOUT_CONNECT,
+    DEFAULT_TIMEOUT_FIRST_BYTE,
+    DEFAULT_VAD_ENABLED,
+    DEFAULT_VAD_THRESHOLD_DB,
+    DEFAULT_VAD_TRAILING_SILENCE_MS,
+    DOMAIN,
+    MAX_STT_FRAME_MS,
+    MAX_STT_RECONNECTS,
+    MIN_STT_FRAME_MS,
+    TRANSPORT_WEBSOCKET,
+)
+from .corpus import UtteranceRecorder
+from .exceptions import STTBridgeError, StreamInterrupted, TransportUnavailable
+from .metrics import CallTimer
+from .models import STTBridgeData
+from .mux import MuxSession
+from .partials import PartialTranscripts, async_send_final
+from .pool import Backend
+from .scheduler import REQUEST_STT
+from .vad import VoiceActivityDetector
 
 _LOGGER = logging.getLogger(__name__)
 
+# Log progress once per this many frames sent
+LOG_EVERY_FRAMES = 50
+
+# POST /stt answers that mean the server doesn't offer the HTTP transport
+HTTP_UNSUPPORTED = (404, 405, 501)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -22,13 +68,77 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up STT Bridge STT platform."""
-    data = hass.data[DOMAIN][config_entry.entry_id]
-    host = data["host"]
-    port = data["port"]
-    token = data.get("token")
-    base_url = f"http://{host}:{port}"
+    data: STTBridgeData = hass.data[DOMAIN][config_entry.entry_id]
+
+    async_add_entities([STTBridgeSTTProvider(hass, data, config_entry)])
+
+
+class _AudioSource:
+    """An audio stream that remembers whether any audio was read from it.
+
+    Once audio was read it can't be sent over another transport anymore.
+    """
+
+    def __init__(self, stream: AsyncIterable[bytes]) -> None:
+        """Initialize the source."""
+        self._stream = aiter(stream)
+        self.started = False
 
-    async_add_entities([STTBridgeSTTProvider(hass, base_url, token, config_entry)])
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        """Return the iterator."""
+        return self
+
+    async def __anext__(self) -> bytes:
+        """Return the next chunk of audio."""
+        chunk = await anext(self._stream)
+        self.started = True
+        return chunk
+
+
+class _UtteranceAudio:
+    """The frames of an utterance, recorded so they can be sent again.
+
+    The next live frame is awaited in a task of its own, so a connection
+    that breaks down while waiting for the microphone doesn't take the audio
+    that is still being recorded with it.
+    """
+
+    def __init__(
+        self, frames: AsyncIterator[memoryview], frame_bytes: int, capacity: int
+    ) -> None:
+        """Initialize the recording."""
+        self._live = frames
+        self._frame_bytes = frame_bytes
+        self._next: asyncio.Future[memoryview | None] | None = None
+        self._ended = False
+        self.buffer = ReplayBuffer(capacity)
+
+    @property
+    def replayable(self) -> bool:
+        """Return if all audio read so far can be sent again."""
+        return not self.buffer.overflowed
+
+    async def frames(self) -> AsyncIterator[memoryview]:
+        """Yield the recorded frames at full speed, then the live ones."""
+        for frame in self.buffer.frames(self._frame_bytes):
+            yield frame
+        while not self._ended:
+            if self._next is None:
+                self._next = asyncio.ensure_future(anext(self._live, None))
+            frame = await asyncio.shield(self._next)
+            self._next = None
+            if frame is None:
+                self._ended = True
+                return
+            # Recorded before it is sent, so a frame lost in flight is replayed
+            self.buffer.append(frame)
+            yield frame
+
+    def close(self) -> None:
+        """Stop waiting for live audio."""
+        if self._next is not None:
+            self._next.cancel()
+            self._next = None
 
 
 class STTBridgeSTTProvider(stt.SpeechToTextEntity):
@@ -37,14 +147,13 @@ class STTBridgeSTTProvider(stt.SpeechToTextEntity):
     def __init__(
         self,
         hass: HomeAssistant,
-        base_url: str,
-        token: str | None,
+        data: STTBridgeData,
         config_entry: ConfigEntry,
     ) -> None:
         """Initialize the provider."""
         self.hass = hass
-        self._base_url = base_url
-        self._token = token
+        self._data = data
+        self._token = data.token
         self._config_entry = config_entry
         self._attr_name = "STT/TTS Bridge STT"
         self._attr_unique_id = config_entry.entry_id
@@ -52,8 +161,7 @@ class STTBridgeSTTProvider(stt.SpeechToTextEntity):
     @property
     def supported_languages(self) -> list[str]:
         """Return a list of supported languages."""
-        # TODO: Get from /voices endpoint
-        return ["de-DE", "en-US"]
+        return self._data.voices.languages
 
     @property
     def supported_formats(self) -> list[stt.AudioFormats]:
@@ -67,8 +175,11 @@ class STTBridgeSTTProvider(stt.SpeechToTextEntity):
 
     @property
     def supported_sample_rates(self) -> list[stt.AudioSampleRates]:
-        """Return a list of supported audio sample rates."""
-        return [stt.AudioSampleRates.SAMPLERATE_16000]
+        """Return a list of supported audio sample rates.
+
+        Audio is resampled to the rate the bridge prefers before it is sent.
+        """
+        return list(stt.AudioSampleRates)
 
     @property
     def supported_bit_rates(self) -> list[stt.AudioBitRates]:
@@ -77,83 +188,648 @@ class STTBridgeSTTProvider(stt.SpeechToTextEntity):
 
     @property
     def supported_channels(self) -> list[stt.AudioChannels]:
-        """Return a list of supported audio channels."""
-        return [stt.AudioChannels.CHANNEL_MONO]
+        """Return a list of supported audio channels.
+
+        Multi-channel audio is downmixed to mono before it is sent.
+        """
+        return list(stt.AudioChannels)
 
     async def async_process_audio_stream(
         self, metadata: stt.SpeechMetadata, stream: stt.AudioStream
     ) -> stt.SpeechResult:
-        """Process an audio stream using WebSocket for real-time streaming."""
+        """Process an audio stream over the best STT transport."""
+        corpus = self._data.corpus
+        recorder = corpus.recorder(metadata) if corpus is not None else None
+        if recorder is not None:
+            stream = recorder.tap(stream)
+        result = await self._async_process(metadata, stream, recorder)
+        if corpus is not None and recorder is not None:
+            # The caller doesn't wait for the recording to be written
+            self.hass.async_create_background_task(
+                corpus.async_append(recorder, result.text), f"{DOMAIN} record STT"
+            )
+        return result
+
+    async def _async_process(
+        self,
+        metadata: stt.SpeechMetadata,
+        stream: stt.AudioStream,
+        recorder: UtteranceRecorder | None,
+    ) -> stt.SpeechResult:
+        """Process an audio stream, turning errors into an error result."""
+        timer = self._data.metrics.stt.start()
+        try:
+            return await self._async_process_with_fallback(
+                metadata, stream, timer, recorder
+            )
+        except TransportUnavailable as e:
+            timer.error(e)
+            _LOGGER.error("STT transport error: %s", e)
+            return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+        except STTBridgeError as e:
+            timer.error(e)
+            _LOGGER.error("STT connection error: %s", e)
+            return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+        except aiohttp.ClientError as e:
+            timer.error(e)
+            _LOGGER.error("STT connection error: %s", e)
+            return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+        except Exception as e:
+            timer.error(e)
+            _LOGGER.error("Unexpected STT error: %s", e, exc_info=True)
+            return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+
+    async def _async_process_with_fallback(
+        self,
+        metadata: stt.SpeechMetadata,
+        stream: stt.AudioStream,
+        timer: CallTimer,
+        recorder: UtteranceRecorder | None = None,
+    ) -> stt.SpeechResult:
+        """Try the transports in the order of the selector.
+
+        A transport that fails before any audio was read falls back to the
+        next one; after that the audio is gone and the error is raised.
+        """
+        selector = self._data.transports
+        transports = selector.order(
+            self._data.capabilities.stt_transports,
+            self._config_entry.options.get(CONF_STT_TRANSPORT, DEFAULT_STT_TRANSPORT),
+        )
+        audio = _AudioSource(stream)
+        for index, transport in enumerate(transports):
+            try:
+                if transport == TRANSPORT_WEBSOCKET:
+                    result = await self._async_stream_with_reconnect(
+                        metadata, audio, timer, recorder
+                    )
+                else:
+                    result = await self._data.pool.async_run(
+                        partial(self._async_post_to_backend, metadata, audio, timer)
+                    )
+            except (TransportUnavailable, aiohttp.ClientError) as err:
+                selector.record_failure(transport)
+                if audio.started or index == len(transports) - 1:
+                    raise
+                selector.fallbacks += 1
+                _LOGGER.warning(
+                    "STT over %s failed, falling back to %s: %s",
+                    transport,
+                    transports[index + 1],
+                    err,
+                )
+                continue
+            if result.result == stt.SpeechResultState.SUCCESS:
+                selector.record_success(transport, timer.durations.get("final"))
+            return result
+        raise TransportUnavailable("The bridge offers no known STT transport")
+
+    async def _async_convert_audio(
+        self, metadata: stt.SpeechMetadata, stream: stt.AudioStream, sample_rate: int
+    ) -> AsyncIterator[bytes]:
+        """Yield the audio as mono PCM at sample_rate."""
+        resampler = StreamingResampler(
+            metadata.sample_rate.value, sample_rate, metadata.channel.value
+        )
+        if resampler.passthrough:
+            async for chunk in stream:
+                yield chunk
+            return
+
+        _LOGGER.debug(
+            "Converting %d Hz/%d ch audio to %d Hz mono",
+            metadata.sample_rate.value,
+            metadata.channel.value,
+            sample_rate,
+        )
+        async for chunk in stream:
+            if audio := resampler.process(chunk):
+                yield audio
+
+    async def _async_prepare_audio(
+        self, metadata: stt.SpeechMetadata, stream: stt.AudioStream, sample_rate: int
+    ) -> AsyncIterator[bytes]:
+        """Yield the audio to send to the bridge.
+
+        The audio is converted to mono at sample_rate. With VAD enabled,
+        leading silence is dropped and the stream ends as soon as enough
+        trailing silence follows the speech.
+        """
+        audio_stream = self._async_convert_audio(metadata, stream, sample_rate)
+        options = self._config_entry.options
+        if not options.get(CONF_VAD_ENABLED, DEFAULT_VAD_ENABLED):
+            async for chunk in audio_stream:
+                yield chunk
+            return
+
+        vad = VoiceActivityDetector(
+            sample_rate=sample_rate,
+            threshold_db=options.get(CONF_VAD_THRESHOLD_DB, DEFAULT_VAD_THRESHOLD_DB),
+            trailing_silence_ms=options.get(
+                CONF_VAD_TRAILING_SILENCE_MS, DEFAULT_VAD_TRAILING_SILENCE_MS
+            ),
+        )
+        async for chunk in audio_stream:
+            if audio := vad.process(chunk):
+                yield audio
+            if vad.ended:
+                _LOGGER.debug("End of speech detected, ending stream early")
+                return
+
+    async def _async_connect(
+        self, metadata: stt.SpeechMetadata, backend: Backend
+    ) -> aiohttp.ClientWebSocketResponse:
+        """Return a pre-warmed WebSocket to backend, or open a new one."""
+        if (ws_pool := self._data.ws_pools.get(backend)) is not None and (
+            ws := await ws_pool.async_checkout()
+        ) is not None:
+            _LOGGER.debug("Using pre-warmed WebSocket to %s", backend)
+            return ws
+
         # Use WebSocket URL for streaming
-        ws_url = self._base_url.replace("http://", "ws://") + "/stt/stream"
-        
+        ws_url = f"{backend.ws_url}/stt/stream"
+
         # Add language parameter
         ws_url += f"?lang={metadata.language}"
-        
+
         headers = {}
         if self._token:
             headers["Authorization"] = f"Bearer {self._token}"
 
-        session = async_get_clientsession(self.hass)
-        
+        session = self._data.session
+
+        _LOGGER.debug("Connecting to WebSocket: %s", ws_url)
+        start = time.monotonic()
+        connect_timeout = self._config_entry.options.get(
+            CONF_TIMEOUT_CONNECT, DEFAULT_TIMEOUT_CONNECT
+        )
         try:
-            _LOGGER.debug("Connecting to WebSocket: %s", ws_url)
-            async with session.ws_connect(ws_url, headers=headers) as ws:
-                # Start metadata message
-                await ws.send_json({
-                    "type": "start",
-                    "sampleRate": metadata.sample_rate.value,
-                    "channels": metadata.channel.value,
-                    "language": metadata.language
-                })
-                
-                # Stream audio chunks in real-time
-                chunk_count = 0
-                total_bytes = 0
-                
-                async for chunk in stream:
-                    if chunk:
-                        await ws.send_bytes(chunk)
-                        chunk_count += 1
-                        total_bytes += len(chunk)
-                        _LOGGER.debug("Sent chunk %d (%d bytes)", chunk_count, len(chunk))
-                
-                # End stream
-                await ws.send_json({"type": "end"})
-                _LOGGER.info("Sent %d chunks (%d bytes total)", chunk_count, total_bytes)
-                
-                # Wait for final result
-                async for msg in ws:
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        data = msg.json()
-                        _LOGGER.debug("Received WebSocket message: %s", data)
-                        
-                        msg_type = data.get("type")
-                        if msg_type == "partial":
-                            # Log partial results but don't return yet
-                            _LOGGER.debug("Partial: %s", data.get("text", ""))
-                        elif msg_type == "final":
-                            text = data.get("text", "")
-                            _LOGGER.info("Final STT result: '%s'", text)
-                            return stt.SpeechResult(text, stt.SpeechResultState.SUCCESS)
-                        elif msg_type == "error":
-                            error = data.get("error", "Unknown error")
-                            _LOGGER.error("STT error: %s", error)
-                            return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
-                    elif msg.type == aiohttp.WSMsgType.ERROR:
-                        _LOGGER.error("WebSocket error: %s", ws.exception())
-                        return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
-                    elif msg.type == aiohttp.WSMsgType.CLOSED:
-                        _LOGGER.warning("WebSocket closed unexpectedly")
-                        break
-                
-                # If we reach here without a final result, it's an error
-                _LOGGER.error("WebSocket closed without final result")
-                return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
-                
-        except aiohttp.ClientError as e:
-            _LOGGER.error("WebSocket connection error: %s", e)
+            async with asyncio.timeout(connect_timeout):
+                ws = await session.ws_connect(ws_url, headers=headers)
+        except aiohttp.WSServerHandshakeError as err:
+            # The server answered, but WebSockets don't get through to it
+            raise TransportUnavailable(
+                f"WebSocket to {backend} rejected: {err.status} {err.message}"
+            ) from err
+        except TimeoutError as err:
+            # Nothing was sent yet, so the pool may try another server
+            raise aiohttp.ConnectionTimeoutError(
+                f"Timeout connecting to {backend}"
+            ) from err
+        backend.record_latency(time.monotonic() - start)
+        return ws
+
+    def _frame_ms(self) -> int:
+        """Return the duration of the audio frames sent to the bridge."""
+        return min(
+            max(
+                self._config_entry.options.get(CONF_STT_FRAME_MS, DEFAULT_STT_FRAME_MS),
+                MIN_STT_FRAME_MS,
+            ),
+            MAX_STT_FRAME_MS,
+        )
+
+    def _slot_timeout(self) -> float:
+        """Return how long an utterance may wait for a bridge server.
+
+        The user is waiting, so the wait is bounded like connecting is.
+        """
+        return self._config_entry.options.get(
+            CONF_TIMEOUT_CONNECT, DEFAULT_TIMEOUT_CONNECT
+        )
+
+    async def _async_frame_audio(
+        self, audio: AsyncIterator[bytes], sample_rate: int, timer: CallTimer
+    ) -> AsyncIterator[memoryview]:
+        """Yield the audio as fixed-duration frames.
+
+        A frame is only valid until the next one is requested, so it must be
+        sent (or copied) before that.
+        """
+        frame_ms = self._frame_ms()
+        coalescer = FrameCoalescer(sample_rate * frame_ms // 1000 * 2)
+        frame_count = 0
+        total_bytes = 0
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+
+        async for chunk in audio:
+            for frame in coalescer.feed(chunk):
+                yield frame
+                frame_count += 1
+                total_bytes += len(frame)
+                if debug and frame_count % LOG_EVERY_FRAMES == 0:
+                    _LOGGER.debug("Sent %d frames (%d bytes)", frame_count, total_bytes)
+        if frame := coalescer.flush():
+            yield frame
+            frame_count += 1
+            total_bytes += len(frame)
+        timer.sent(total_bytes)
+
+        _LOGGER.info(
+            "Sent %d frames of %d ms (%d bytes total)",
+            frame_count,
+            frame_ms,
+            total_bytes,
+        )
+
+    async def _async_send_audio(
+        self, ws: aiohttp.ClientWebSocketResponse, frames: AsyncIterator[memoryview]
+    ) -> None:
+        """Send the audio frames.
+
+        Frames are sent one at a time, so a slow connection makes send_bytes
+        wait for the transport to drain instead of queueing audio in memory.
+        """
+        async for frame in frames:
+            await ws.send_bytes(frame)
+
+    async def _async_post_to_backend(
+        self,
+        metadata: stt.SpeechMetadata,
+        stream: stt.AudioStream,
+        timer: CallTimer,
+        backend: Backend,
+    ) -> stt.SpeechResult:
+        """Upload the audio to one bridge server and read the transcript.
+
+        The audio is sent as a chunked POST /stt while it is being recorded.
+        The upload lasts as long as the user speaks, so only the wait for the
+        transcript after the end of the audio is bounded.
+        """
+        options = self._config_entry.options
+        sample_rate = self._data.capabilities.stt_sample_rate
+        result_timeout = options.get(CONF_TIMEOUT_FIRST_BYTE, DEFAULT_TIMEOUT_FIRST_BYTE)
+        headers = {
+            "Content-Type": "audio/l16",
+            "X-Sample-Rate": str(sample_rate),
+            "X-Channel-Count": "1",
+        }
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        audio_end: float | None = None
+
+        # Like on WebSockets, only connecting takes a slot: aiohttp starts
+        # reading the body once the connection is open
+        connecting = AsyncExitStack()
+        await connecting.enter_async_context(
+            backend.scheduler.slot(REQUEST_STT, self._slot_timeout())
+        )
+        try:
+            with backend.scheduler.stream():
+                async with asyncio.timeout(None) as deadline:
+
+                    async def body() -> AsyncIterator[memoryview]:
+                        nonlocal audio_end
+                        # Connected, the upload holds no slot
+                        await connecting.aclose()
+                        async for frame in self._async_frame_audio(
+                            self._async_prepare_audio(metadata, stream, sample_rate),
+                            sample_rate,
+                            timer,
+                        ):
+                            yield frame
+                        audio_end = time.monotonic()
+                        deadline.reschedule(
+                            asyncio.get_running_loop().time() + result_timeout
+                        )
+
+                    _LOGGER.debug("Uploading audio to %s/stt", backend.base_url)
+                    start = time.monotonic()
+                    async with self._data.session.post(
+                        f"{backend.base_url}/stt",
+                        params={"lang": metadata.language},
+                        data=body(),
+                        headers=headers,
+                        timeout=aiohttp.ClientTimeout(
+                            total=None,
+                            sock_connect=options.get(
+                                CONF_TIMEOUT_CONNECT, DEFAULT_TIMEOUT_CONNECT
+                            ),
+                        ),
+                    ) as resp:
+                        timer.mark("first_byte")
+                        if resp.status in HTTP_UNSUPPORTED:
+                            raise TransportUnavailable(
+                                f"{backend} does not accept POST /stt: "
+                                f"HTTP {resp.status}"
+                            )
+                        if resp.status == 200:
+                            # The response only starts once the audio is sent
+                            backend.record_latency(
+                                time.monotonic() - (audio_end or start)
+                            )
+                        raw = await resp.read()
+        except TimeoutError:
+            _LOGGER.error("Timeout waiting for the STT result")
+            timer.error("timeout")
             return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
-        except Exception as e:
-            _LOGGER.error("Unexpected STT error: %s", e, exc_info=True)
+        finally:
+            await connecting.aclose()
+        timer.received(len(raw))
+
+        if resp.status != 200:
+            _LOGGER.error("STT error: HTTP %s", resp.status)
+            timer.error(f"http_{resp.status}")
+            return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+        try:
+            data = json_loads(raw)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or not isinstance(data.get("text"), str):
+            _LOGGER.error("Unexpected STT response: %s", raw[:200])
+            timer.error("bridge_error")
             return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+
+        text = data["text"]
+        _LOGGER.info("Final STT result: '%s'", text)
+        if audio_end is not None:
+            timer.mark("final", since=audio_end)
+        timer.mark("total")
+        async_send_final(self.hass, self._config_entry.entry_id, text)
+        return stt.SpeechResult(text, stt.SpeechResultState.SUCCESS)
+
+    async def _async_stream_with_reconnect(
+        self,
+        metadata: stt.SpeechMetadata,
+        stream: stt.AudioStream,
+        timer: CallTimer,
+        recorder: UtteranceRecorder | None = None,
+    ) -> stt.SpeechResult:
+        """Stream the audio over WebSockets, reconnecting if the stream breaks.
+
+        The audio of the utterance is recorded, so after a dropped connection
+        it is replayed at full speed to the best remaining bridge server
+        before streaming continues live. Utterances longer than the replay
+        buffer fail like before.
+        """
+        options = self._config_entry.options
+        sample_rate = self._data.capabilities.stt_sample_rate
+        frame_bytes = sample_rate * self._frame_ms() // 1000 * 2
+        audio = _UtteranceAudio(
+            self._async_frame_audio(
+                self._async_prepare_audio(metadata, stream, sample_rate),
+                sample_rate,
+                timer,
+            ),
+            frame_bytes,
+            int(
+                options.get(CONF_STT_REPLAY_SECONDS, DEFAULT_STT_REPLAY_SECONDS)
+                * sample_rate
+            )
+            * 2,
+        )
+        transcripts = PartialTranscripts(
+            self.hass,
+            self._config_entry.entry_id,
+            metadata.language,
+            fire_events=options.get(CONF_PARTIAL_EVENTS, DEFAULT_PARTIAL_EVENTS),
+            on_update=recorder.async_partial if recorder is not None else None,
+        )
+        reconnects = 0
+        try:
+            while True:
+                try:
+                    result = await self._data.pool.async_run(
+                        partial(
+                            self._async_stream_to_backend,
+                            metadata,
+                            audio,
+                            sample_rate,
+                            transcripts,
+                            timer,
+                        )
+                    )
+                except (StreamInterrupted, aiohttp.ClientError) as err:
+                    if reconnects >= MAX_STT_RECONNECTS or not audio.replayable:
+                        raise
+                    reconnects += 1
+                    self._data.transports.reconnects += 1
+                    _LOGGER.warning(
+                        "STT stream interrupted (%s), reconnecting and replaying "
+                        "%d bytes of audio",
+                        err,
+                        len(audio.buffer),
+                    )
+                    continue
+                break
+        finally:
+            audio.close()
+            transcripts.async_flush()
+        transcripts.async_finish(result.text)
+        return result
+
+    async def _async_stream_to_backend(
+        self,
+        metadata: stt.SpeechMetadata,
+        audio: _UtteranceAudio,
+        sample_rate: int,
+        transcripts: PartialTranscripts,
+        timer: CallTimer,
+        backend: Backend,
+    ) -> stt.SpeechResult:
+        """Stream the audio to one bridge server and wait for the transcript.
+
+        Only connecting takes a slot of the server's scheduler: an utterance
+        lasts as long as the user speaks, and holding a slot for it would keep
+        TTS and the next satellites waiting.
+        """
+        session: MuxSession | None = None
+        async with backend.scheduler.slot(REQUEST_STT, self._slot_timeout()):
+            if self._data.mux is not None and self._data.capabilities.stt_multiplex:
+                session = await self._data.mux.async_open_session(
+                    backend, self._slot_timeout()
+                )
+            if session is None:
+                ws = await self._async_connect(metadata, backend)
+        timer.mark("connect")
+        with backend.scheduler.stream():
+            if session is not None:
+                return await self._async_stream_multiplexed(
+                    session, metadata, audio, sample_rate, transcripts, timer
+                )
+            return await self._async_stream_websocket(
+                ws, metadata, audio, sample_rate, transcripts, timer, backend
+            )
+
+    async def _async_stream_multiplexed(
+        self,
+        session: MuxSession,
+        metadata: stt.SpeechMetadata,
+        audio: _UtteranceAudio,
+        sample_rate: int,
+        transcripts: PartialTranscripts,
+        timer: CallTimer,
+    ) -> stt.SpeechResult:
+        """Stream the audio on a session of a shared connection."""
+        try:
+            await session.async_start(sample_rate, metadata.language)
+
+            async def send() -> None:
+                async for frame in audio.frames():
+                    await session.async_send_audio(frame)
+                await session.async_end()
+
+            # The connection reports its own failure, once for all sessions
+            return await self._async_exchange(
+                session.events, send, transcripts, timer, None
+            )
+        finally:
+            session.async_close()
+
+    async def _async_stream_websocket(
+        self,
+        ws: aiohttp.ClientWebSocketResponse,
+        metadata: stt.SpeechMetadata,
+        audio: _UtteranceAudio,
+        sample_rate: int,
+        transcripts: PartialTranscripts,
+        timer: CallTimer,
+        backend: Backend,
+    ) -> stt.SpeechResult:
+        """Stream the audio on a WebSocket of its own."""
+        async with ws:
+            # Start metadata message
+            await ws.send_json({
+                "type": "start",
+                "sampleRate": sample_rate,
+                "channels": 1,
+                "language": metadata.language
+            })
+
+            events: asyncio.Queue[aiohttp.WSMessage | None] = asyncio.Queue()
+
+            async def send() -> None:
+                await self._async_send_audio(ws, audio.frames())
+                await ws.send_json({"type": "end"})
+
+            async def receive() -> None:
+                while True:
+                    msg = await ws.receive()
+                    events.put_nowait(msg)
+                    if msg.type not in (
+                        aiohttp.WSMsgType.TEXT,
+                        aiohttp.WSMsgType.BINARY,
+                    ):
+                        return
+
+            receiver = self.hass.async_create_task(
+                receive(), f"{DOMAIN} receive STT results"
+            )
+            try:
+                return await self._async_exchange(
+                    events, send, transcripts, timer, backend
+                )
+            finally:
+                receiver.cancel()
+                await asyncio.wait([receiver])
+
+    async def _async_exchange(
+        self,
+        events: asyncio.Queue[aiohttp.WSMessage | None],
+        send: Callable[[], Awaitable[None]],
+        transcripts: PartialTranscripts,
+        timer: CallTimer,
+        backend: Backend | None,
+    ) -> stt.SpeechResult:
+        """Send the audio while handling the bridge messages in events.
+
+        Sending and reading run at the same time, so partials arrive during
+        the utterance and a final can end the stream early.
+        """
+        options = self._config_entry.options
+        sender = self.hass.async_create_task(send(), f"{DOMAIN} send STT audio")
+        # None in the queue marks the end of the audio
+        sender.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            return await self._async_wait_for_result(
+                events,
+                sender,
+                transcripts,
+                timer,
+                options.get(CONF_PARTIAL_STABLE_MS, DEFAULT_PARTIAL_STABLE_MS) / 1000,
+                options.get(CONF_TIMEOUT_FIRST_BYTE, DEFAULT_TIMEOUT_FIRST_BYTE),
+            )
+        except StreamInterrupted:
+            # Let the next attempt prefer another server
+            if backend is not None:
+                backend.record_failure()
+            raise
+        finally:
+            sender.cancel()
+            await asyncio.wait([sender])
+
+    async def _async_wait_for_result(
+        self,
+        events: asyncio.Queue[aiohttp.WSMessage | None],
+        sender: asyncio.Task[None],
+        transcripts: PartialTranscripts,
+        timer: CallTimer,
+        stable_after: float,
+        result_timeout: float,
+    ) -> stt.SpeechResult:
+        """Handle bridge messages until the transcript is known.
+
+        A partial that stays unchanged for stable_after seconds after the
+        audio has been sent is returned without waiting for the final, and
+        the result must arrive within result_timeout seconds.
+        """
+        audio_end: float | None = None
+        while True:
+            timeout = None
+            stable = False
+            if audio_end is not None:
+                since_end = time.monotonic() - audio_end
+                timeout = result_timeout - since_end
+                if stable_after and transcripts.text:
+                    # A partial from before a pause in speech may still
+                    # miss the words the bridge hasn't decoded yet
+                    stable_for = min(transcripts.stable_for, since_end)
+                    wait = stable_after - stable_for
+                    if wait < timeout:
+                        timeout, stable = wait, True
+                timeout = max(0.0, timeout)
+            try:
+                msg = await asyncio.wait_for(events.get(), timeout)
+            except TimeoutError:
+                if not stable:
+                    _LOGGER.error("Timeout waiting for the STT result")
+                    timer.error("timeout")
+                    return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+                _LOGGER.info("Using stable partial as result: '%s'", transcripts.text)
+                timer.mark("final", since=audio_end)
+                timer.mark("total")
+                return stt.SpeechResult(transcripts.text, stt.SpeechResultState.SUCCESS)
+
+            if msg is None:
+                audio_end = time.monotonic()
+                if not sender.cancelled() and (err := sender.exception()):
+                    raise err
+            elif msg.type == aiohttp.WSMsgType.TEXT:
+                timer.mark("first_byte")
+                timer.received(len(msg.data))
+                data = msg.json()
+                _LOGGER.debug("Received WebSocket message: %s", data)
+
+                msg_type = data.get("type")
+                if msg_type == "partial":
+                    transcripts.async_update(data.get("text", ""))
+                elif msg_type == "final":
+                    text = data.get("text", "")
+                    _LOGGER.info("Final STT result: '%s'", text)
+                    if audio_end is not None:
+                        timer.mark("final", since=audio_end)
+                    timer.mark("total")
+                    return stt.SpeechResult(text, stt.SpeechResultState.SUCCESS)
+                elif msg_type == "error":
+                    error = data.get("error", "Unknown error")
+                    _LOGGER.error("STT error: %s", error)
+                    timer.error("bridge_error")
+                    return stt.SpeechResult(None, stt.SpeechResultState.ERROR)
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                raise StreamInterrupted(f"WebSocket error: {msg.data}")
+            elif msg.type in (
+                aiohttp.WSMsgType.CLOSE,
+                aiohttp.WSMsgType.CLOSING,
+                aiohttp.WSMsgType.CLOSED,
+            ):
+                raise StreamInterrupted("WebSocket closed without final result")
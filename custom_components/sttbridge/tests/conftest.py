@@ -1,13 +1,16 @@
 """Common fixtures for the STT Bridge tests."""
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from unittest.mock import patch
 
 import pytest
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.sttbridge.const import DOMAIN
 
+from .fake_bridge import FakeBridge
+
 MOCK_CONFIG = {
     "host": "1.2.3.4",
     "port": 8787,
@@ -32,3 +35,26 @@ def mock_setup_entry() -> Generator[None, None, None]:
         "custom_components.sttbridge.async_setup_entry", return_value=True
     ) as mock_setup:
         yield mock_setup
+
+@pytest.fixture
+async def fake_bridge() -> AsyncGenerator[FakeBridge, None]:
+    """Run a local fake bridge server."""
+    bridge = FakeBridge()
+    await bridge.start()
+    yield bridge
+    await bridge.stop()
+
+@pytest.fixture
+async def fake_bridge_entry(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> MockConfigEntry:
+    """Set up a config entry connected to the fake bridge."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="STT Bridge",
+        data={"host": fake_bridge.host, "port": fake_bridge.port, "token": "test-token"},
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
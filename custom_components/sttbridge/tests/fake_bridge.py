@@ -0,0 +1,349 @@
+"""A local stand-in for the macOS STT/TTS bridge server.
+
+Implements /tts, /stt/stream, /stt/mux, POST /stt, /voices and /healthz
+with configurable latency, jitter, failure injection and dropped STT
+connections.
+Used by the tests and by the benchmarks in ``benchmarks/``.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import json
+import random
+import struct
+from typing import Any
+
+from aiohttp import WSMsgType, web
+
+from custom_components.sttbridge.wav import WavFormat, build_wav_header
+
+DEFAULT_VOICES = [
+    {"identifier": "com.apple.voice.Anna", "name": "Anna", "language": "de-DE"},
+    {"identifier": "com.apple.voice.Samantha", "name": "Samantha", "language": "en-US"},
+]
+
+
+@dataclass
+class FakeBridgeConfig:
+    """Behaviour of the fake bridge."""
+
+    # Seconds before a TTS response starts, plus up to jitter seconds
+    tts_latency: float = 0.0
+    # Seconds from the end of the audio to the final transcript, plus jitter
+    stt_latency: float = 0.0
+    jitter: float = 0.0
+    # Probability that a request fails (HTTP 500, or an STT error message)
+    failure_rate: float = 0.0
+    # Probability per received STT audio frame that the connection is cut
+    # without a close handshake, and how many connections may be cut in total
+    drop_rate: float = 0.0
+    max_drops: int | None = None
+    # Seconds of received audio between partial transcripts
+    partial_interval: float = 0.3
+    transcript: str = "turn on the living room light"
+    # Milliseconds of synthesized audio per character of TTS text
+    tts_ms_per_char: int = 60
+    tts_format: WavFormat = field(default_factory=lambda: WavFormat(1, 1, 22050, 16))
+    stt_sample_rate: int = 16000
+    # STT transports reported in /healthz and accepted by the server; without
+    # "websocket" the upgrade is refused like a proxy dropping WebSockets
+    stt_transports: list[str] = field(default_factory=lambda: ["websocket", "http"])
+    # Whether /stt/mux is offered and reported in /healthz, and the status
+    # the upgrade is refused with otherwise
+    stt_multiplex: bool = False
+    stt_mux_refusal: int = 404
+    voices: list[dict[str, str]] = field(default_factory=lambda: list(DEFAULT_VOICES))
+
+
+class FakeBridge:
+    """An aiohttp server behaving like the bridge."""
+
+    def __init__(self, config: FakeBridgeConfig | None = None, seed: int = 0) -> None:
+        """Initialize the server."""
+        self.config = config or FakeBridgeConfig()
+        self.requests: dict[str, int] = {}
+        self.stt_audio_bytes = 0
+        self.stt_frames: list[int] = []
+        # Connections cut, and the audio bytes of each stream that got a final
+        self.drops = 0
+        self.completed_streams: list[int] = []
+        # Multiplexed sessions running at once, at most
+        self.peak_sessions = 0
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self._streams: set[asyncio.Task[Any]] = set()
+        self.host = "127.0.0.1"
+        self.port = 0
+
+        self.app = web.Application()
+        self.app.router.add_get("/healthz", self._handle_healthz)
+        self.app.router.add_get("/voices", self._handle_voices)
+        self.app.router.add_post("/tts", self._handle_tts)
+        self.app.router.add_get("/stt/stream", self._handle_stt_stream)
+        self.app.router.add_get("/stt/mux", self._handle_stt_mux)
+        self.app.router.add_post("/stt", self._handle_stt_post)
+
+    async def start(self) -> None:
+        """Start listening on a free local port."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        # Don't wait for streams sleeping on injected latency
+        for task in self._streams:
+            task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _count(self, name: str) -> None:
+        """Count a request."""
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _fails(self) -> bool:
+        """Return if this request should fail."""
+        return self._random.random() < self.config.failure_rate
+
+    async def _delay(self, latency: float) -> None:
+        """Sleep for latency plus random jitter."""
+        if delay := latency + self._random.uniform(0, self.config.jitter):
+            await asyncio.sleep(delay)
+
+    async def _handle_healthz(self, request: web.Request) -> web.Response:
+        """Report the server status and capabilities."""
+        self._count("healthz")
+        return web.json_response(
+            {
+                "status": "ok",
+                "stt": {
+                    "sampleRate": self.config.stt_sample_rate,
+                    "transports": self.config.stt_transports,
+                    "multiplex": self.config.stt_multiplex,
+                },
+            }
+        )
+
+    async def _handle_voices(self, request: web.Request) -> web.Response:
+        """Return the voice list with an ETag."""
+        self._count("voices")
+        etag = f'"{len(self.config.voices)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.json_response(self.config.voices, headers={"ETag": etag})
+
+    async def _handle_tts(self, request: web.Request) -> web.Response:
+        """Return silence as long as the text would take to speak."""
+        self._count("tts")
+        payload = await request.json()
+        await self._delay(self.config.tts_latency)
+        if self._fails():
+            return web.Response(status=500, text="injected failure")
+
+        fmt = self.config.tts_format
+        frames = (
+            len(payload.get("text", ""))
+            * self.config.tts_ms_per_char
+            * fmt.sample_rate
+            // 1000
+        )
+        pcm = bytes(frames * fmt.block_align)
+        return web.Response(
+            body=build_wav_header(fmt, len(pcm)) + pcm, content_type="audio/wav"
+        )
+
+    async def _handle_stt_stream(self, request: web.Request) -> web.WebSocketResponse:
+        """Send partials while audio arrives and a final after "end"."""
+        self._count("stt")
+        if "websocket" not in self.config.stt_transports:
+            return web.Response(status=403, text="WebSockets not allowed")
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        task = asyncio.current_task()
+        assert task is not None
+        self._streams.add(task)
+        try:
+            await self._async_stream(ws, request)
+        except ConnectionResetError:
+            # The client went away, e.g. after using a stable partial
+            pass
+        finally:
+            self._streams.discard(task)
+        await ws.close()
+        return ws
+
+    async def _handle_stt_mux(self, request: web.Request) -> web.WebSocketResponse:
+        """Run many STT sessions over one WebSocket."""
+        self._count("stt_mux")
+        if not self.config.stt_multiplex:
+            return web.Response(status=self.config.stt_mux_refusal)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        task = asyncio.current_task()
+        assert task is not None
+        self._streams.add(task)
+        try:
+            await self._async_mux(ws, request)
+        except ConnectionResetError:
+            pass
+        finally:
+            self._streams.discard(task)
+        await ws.close()
+        return ws
+
+    async def _handle_stt_post(self, request: web.Request) -> web.Response:
+        """Read a chunked audio upload and return the transcript."""
+        self._count("stt_post")
+        if "http" not in self.config.stt_transports:
+            return web.Response(status=404)
+        fail = self._fails()
+        async for chunk in request.content.iter_any():
+            self.stt_audio_bytes += len(chunk)
+            self.stt_frames.append(len(chunk))
+        await self._delay(self.config.stt_latency)
+        if fail:
+            return web.json_response({"error": "injected failure"}, status=500)
+        return web.json_response({"text": self.config.transcript})
+
+    def _drops(self) -> bool:
+        """Return if the connection should be cut now."""
+        if not self.config.drop_rate or (
+            self.config.max_drops is not None and self.drops >= self.config.max_drops
+        ):
+            return False
+        return self._random.random() < self.config.drop_rate
+
+    async def _async_stream(
+        self, ws: web.WebSocketResponse, request: web.Request
+    ) -> None:
+        """Handle one STT stream."""
+        words = self.config.transcript.split()
+        bytes_per_partial = 2 * int(
+            self.config.stt_sample_rate * self.config.partial_interval
+        )
+        received = 0
+        fail = False
+        async for msg in ws:
+            if msg.type == WSMsgType.BINARY:
+                if self._drops():
+                    self.drops += 1
+                    assert request.transport is not None
+                    request.transport.abort()
+                    return
+                received += len(msg.data)
+                self.stt_audio_bytes += len(msg.data)
+                self.stt_frames.append(len(msg.data))
+                if bytes_per_partial and (
+                    received // bytes_per_partial
+                    > (received - len(msg.data)) // bytes_per_partial
+                ):
+                    spoken = min(len(words), received // bytes_per_partial)
+                    await ws.send_json(
+                        {"type": "partial", "text": " ".join(words[:spoken])}
+                    )
+                continue
+            if msg.type != WSMsgType.TEXT:
+                break
+            data: dict[str, Any] = json.loads(msg.data)
+            if data.get("type") == "start":
+                fail = self._fails()
+                received = 0
+                bytes_per_partial = 2 * int(
+                    data.get("sampleRate", self.config.stt_sample_rate)
+                    * self.config.partial_interval
+                )
+            elif data.get("type") == "end":
+                await self._delay(self.config.stt_latency)
+                if fail:
+                    await ws.send_json({"type": "error", "error": "injected failure"})
+                else:
+                    self.completed_streams.append(received)
+                    await ws.send_json({"type": "final", "text": self.config.transcript})
+                break
+
+    async def _async_mux(
+        self, ws: web.WebSocketResponse, request: web.Request
+    ) -> None:
+        """Handle the sessions of one multiplexed connection."""
+        words = self.config.transcript.split()
+        # session -> [bytes received, bytes per partial, injected failure]
+        sessions: dict[int, list[Any]] = {}
+        send_lock = asyncio.Lock()
+        finishing: set[asyncio.Task[None]] = set()
+
+        async def send(data: dict[str, Any]) -> None:
+            async with send_lock:
+                await ws.send_json(data)
+
+        async def finish(session: int, received: int, fail: bool) -> None:
+            # Finals are sent from tasks, so slow ones don't hold up the others
+            await self._delay(self.config.stt_latency)
+            if fail:
+                await send(
+                    {"type": "error", "session": session, "error": "injected failure"}
+                )
+            else:
+                self.completed_streams.append(received)
+                await send(
+                    {
+                        "type": "final",
+                        "session": session,
+                        "text": self.config.transcript,
+                    }
+                )
+
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.BINARY:
+                    if self._drops():
+                        self.drops += 1
+                        assert request.transport is not None
+                        request.transport.abort()
+                        return
+                    (session,) = struct.unpack_from(">I", msg.data)
+                    if (state := sessions.get(session)) is None:
+                        continue
+                    size = len(msg.data) - 4
+                    before = state[0]
+                    state[0] += size
+                    self.stt_audio_bytes += size
+                    self.stt_frames.append(size)
+                    if state[1] and state[0] // state[1] > before // state[1]:
+                        spoken = min(len(words), state[0] // state[1])
+                        await send(
+                            {
+                                "type": "partial",
+                                "session": session,
+                                "text": " ".join(words[:spoken]),
+                            }
+                        )
+                    continue
+                if msg.type != WSMsgType.TEXT:
+                    break
+                data: dict[str, Any] = json.loads(msg.data)
+                session = data.get("session")
+                if data.get("type") == "start":
+                    sessions[session] = [
+                        0,
+                        2
+                        * int(
+                            data.get("sampleRate", self.config.stt_sample_rate)
+                            * self.config.partial_interval
+                        ),
+                        self._fails(),
+                    ]
+                    self.peak_sessions = max(self.peak_sessions, len(sessions))
+                elif data.get("type") == "end" and session in sessions:
+                    received, _, fail = sessions.pop(session)
+                    task = asyncio.create_task(finish(session, received, fail))
+                    finishing.add(task)
+                    task.add_done_callback(finishing.discard)
+                elif data.get("type") == "cancel":
+                    sessions.pop(session, None)
+        finally:
+            for task in finishing:
+                task.cancel()
@@ -0,0 +1,133 @@
+"""Test the STT Bridge audio conversion."""
+import numpy as np
+import pytest
+
+from custom_components.sttbridge.audio import (
+    FrameCoalescer,
+    ReplayBuffer,
+    StreamingResampler,
+)
+from custom_components.sttbridge.health import BridgeCapabilities
+
+
+def _tone(freq: float, rate: int, seconds: float, amplitude: int = 8000) -> np.ndarray:
+    """Return a sine tone."""
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype("<i2")
+
+
+def _feed(resampler: StreamingResampler, audio: bytes, chunk_size: int) -> np.ndarray:
+    """Feed audio in chunks and return the output samples."""
+    out = b"".join(
+        resampler.process(audio[offset : offset + chunk_size])
+        for offset in range(0, len(audio), chunk_size)
+    )
+    return np.frombuffer(out, dtype="<i2")
+
+
+def _level(samples: np.ndarray) -> float:
+    """Return the RMS level of samples."""
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+def test_passthrough() -> None:
+    """Test audio already in the target format is returned unchanged."""
+    resampler = StreamingResampler(16000, 16000, 1)
+    assert resampler.passthrough
+    assert resampler.process(b"\x01\x02\x03") == b"\x01\x02\x03"
+
+
+@pytest.mark.parametrize(("in_rate", "out_rate"), [(48000, 16000), (44100, 16000), (8000, 16000)])
+def test_resample_keeps_tone(in_rate: int, out_rate: int) -> None:
+    """Test a tone keeps its frequency, level and duration."""
+    audio = _tone(440, in_rate, 1.0)
+
+    out = _feed(StreamingResampler(in_rate, out_rate), audio.tobytes(), 1001)
+
+    assert abs(len(out) - out_rate) <= 2
+    expected = _tone(440, out_rate, len(out) / out_rate)
+    # Skip the filter warm-up before comparing
+    steady = slice(100, len(out) - 100)
+    assert abs(_level(out[steady]) - _level(expected[steady])) < 200
+    spectrum = np.abs(np.fft.rfft(out))
+    peak = np.argmax(spectrum) * out_rate / len(out)
+    assert abs(peak - 440) < 5
+
+
+def test_chunking_does_not_change_output() -> None:
+    """Test the output does not depend on how the input is chunked."""
+    audio = _tone(300, 44100, 0.5).tobytes()
+
+    whole = _feed(StreamingResampler(44100, 16000), audio, len(audio))
+    chunked = _feed(StreamingResampler(44100, 16000), audio, 777)
+
+    assert np.array_equal(whole, chunked)
+
+
+def test_downsampling_removes_aliases() -> None:
+    """Test content above the new Nyquist frequency is filtered out."""
+    audio = _tone(12000, 48000, 1.0)
+
+    out = _feed(StreamingResampler(48000, 16000), audio.tobytes(), 4800)
+
+    # A 12 kHz tone would alias to 4 kHz without the anti-aliasing filter
+    assert _level(out[100:]) < 0.05 * _level(audio)
+
+
+def test_downmix_stereo() -> None:
+    """Test stereo audio is averaged into mono."""
+    left = _tone(440, 16000, 0.1)
+    stereo = np.column_stack([left, np.zeros_like(left)]).reshape(-1)
+
+    out = _feed(StreamingResampler(16000, 16000, 2), stereo.tobytes(), 333)
+
+    assert len(out) == len(left)
+    assert np.abs(out - left / 2).max() <= 1
+
+
+def test_frame_coalescer() -> None:
+    """Test chunks of any size are cut into fixed-size frames."""
+    audio = bytes(range(256)) * 10
+    coalescer = FrameCoalescer(640)
+
+    frames = []
+    for offset, size in ((0, 100), (100, 1500), (1600, 7), (1607, 953)):
+        frames.extend(bytes(f) for f in coalescer.feed(audio[offset : offset + size]))
+    frames.append(bytes(coalescer.flush()))
+
+    assert [len(frame) for frame in frames] == [640, 640, 640, 640, 0]
+    assert b"".join(frames) == audio
+    assert not coalescer.flush()
+
+
+def test_replay_buffer() -> None:
+    """Test recorded frames are replayed in frames and overflow is reported."""
+    buffer = ReplayBuffer(1000)
+    for value in range(3):
+        buffer.append(bytes([value]) * 300)
+    buffer.append(memoryview(b"\x09" * 50))
+
+    assert len(buffer) == 950
+    assert [bytes(f) for f in buffer.frames(300)] == [
+        b"\x00" * 300,
+        b"\x01" * 300,
+        b"\x02" * 300,
+        b"\x09" * 50,
+    ]
+    assert not buffer.overflowed
+
+    buffer.append(b"\x00" * 300)
+    assert buffer.overflowed
+    assert len(buffer) == 950
+    assert ReplayBuffer(0).overflowed
+
+
+def test_capabilities_from_health() -> None:
+    """Test parsing the preferred STT format from /healthz."""
+    assert BridgeCapabilities.from_health({"status": "ok"}).stt_sample_rate == 16000
+    assert BridgeCapabilities.from_health("ok").stt_sample_rate == 16000
+    caps = BridgeCapabilities.from_health({"stt": {"sampleRate": 24000}})
+    assert caps.stt_sample_rate == 24000
+    assert caps.stt_transports == ("websocket", "http")
+    caps = BridgeCapabilities.from_health({"stt": {"transports": ["http", "grpc"]}})
+    assert caps.stt_transports == ("http",)
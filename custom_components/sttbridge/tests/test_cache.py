@@ -0,0 +1,79 @@
+"""Test the STT Bridge TTS audio cache."""
+import asyncio
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sttbridge.cache import TTSAudioCache, make_cache_key
+
+
+def test_cache_key() -> None:
+    """Test only audio relevant options end up in the key."""
+    key = make_cache_key("Good morning", "en-US", {"voice": "Ava"}, "v1")
+    assert key == make_cache_key(
+        "Good morning", "en-US", {"voice": "Ava", "unrelated": 1}, "v1"
+    )
+    assert key != make_cache_key("Good morning", "en-US", {"voice": "Zoe"}, "v1")
+    assert key != make_cache_key("Good morning", "en-US", {"voice": "Ava"}, "v2")
+    assert key != make_cache_key(
+        "Good morning", "en-US", {"voice": "Ava"}, "v1", "trim=1"
+    )
+
+
+async def test_memory_lru_eviction(hass: HomeAssistant, tmp_path) -> None:
+    """Test the in-memory level evicts least recently used entries by size."""
+    cache = TTSAudioCache(hass, tmp_path, memory_budget=10, disk_budget=0)
+
+    cache.async_put("a", b"aaaa")
+    cache.async_put("b", b"bbbb")
+    assert await cache.async_get("a") == b"aaaa"
+    cache.async_put("c", b"cccc")
+
+    assert await cache.async_get("b") is None
+    assert await cache.async_get("a") == b"aaaa"
+    assert await cache.async_get("c") == b"cccc"
+    assert cache.stats.memory_hits == 3
+    assert cache.stats.misses == 1
+    assert cache.stats.memory_evictions == 1
+
+
+async def test_disk_persistence(hass: HomeAssistant, tmp_path) -> None:
+    """Test audio survives a restart through the disk level."""
+    cache = TTSAudioCache(hass, tmp_path, memory_budget=1024, disk_budget=1024)
+    await cache.async_load()
+    cache.async_put("key", b"RIFF-audio")
+    await hass.async_block_till_done()
+
+    restarted = TTSAudioCache(hass, tmp_path, memory_budget=1024, disk_budget=1024)
+    await restarted.async_load()
+    assert await restarted.async_get("key") == b"RIFF-audio"
+    assert restarted.stats.disk_hits == 1
+    # Promoted to memory on the first hit
+    assert await restarted.async_get("key") == b"RIFF-audio"
+    assert restarted.stats.memory_hits == 1
+
+
+async def test_ttl(hass: HomeAssistant, tmp_path) -> None:
+    """Test expired entries are treated as misses."""
+    cache = TTSAudioCache(hass, tmp_path, memory_budget=1024, disk_budget=0, ttl=-1)
+    cache.async_put("key", b"audio")
+
+    assert await cache.async_get("key") is None
+    assert cache.stats.expired == 1
+
+
+async def test_evicted_while_reading(hass: HomeAssistant, tmp_path) -> None:
+    """Test a file evicted during a disk read is only accounted for once."""
+    cache = TTSAudioCache(hass, tmp_path, memory_budget=0, disk_budget=1024)
+    await cache.async_load()
+    cache.async_put("key", b"audio")
+    await hass.async_block_till_done()
+    # The eviction deletes the file before it is read
+    cache._read = lambda key: None
+
+    get = asyncio.create_task(cache.async_get("key"))
+    await asyncio.sleep(0)
+    await cache.async_configure(0, 0, None)
+
+    assert await get is None
+    assert cache.as_dict()["disk_bytes"] == 0
+    assert cache.as_dict()["disk_entries"] == 0
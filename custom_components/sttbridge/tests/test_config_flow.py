@@ -5,8 +5,21 @@ import pytest
 from homeassistant.config_entries import SOURCE_USER
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import voluptuous as vol
 
-from custom_components.sttbridge.const import DOMAIN
+from custom_components.sttbridge.const import (
+    CONF_CACHE_MEMORY_MB,
+    CONF_DEFAULT_LANGUAGE,
+    CONF_MAX_CONCURRENT,
+    CONF_STT_CONCURRENCY,
+    CONF_STT_FRAME_MS,
+    CONF_TTS_CONCURRENCY,
+    CONF_WS_POOL_SIZE,
+    DEFAULT_STT_CONCURRENCY,
+    DOMAIN,
+)
+from custom_components.sttbridge.tts import STTBridgeProvider
 
 MOCK_CONFIG = {
     "host": "1.2.3.4",
@@ -59,3 +72,49 @@ async def test_form_cannot_connect(hass: HomeAssistant) -> None:
 
     assert result2["type"] == FlowResultType.FORM
     assert result2["errors"] == {"base": "cannot_connect"}
+
+
+async def test_options_flow(
+    hass: HomeAssistant, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test options are saved and applied without reloading the entry."""
+    data = hass.data[DOMAIN][fake_bridge_entry.entry_id]
+    result = await hass.config_entries.options.async_init(fake_bridge_entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {
+            "concurrency": {CONF_MAX_CONCURRENT: 2, CONF_TTS_CONCURRENCY: 1},
+            "websocket": {CONF_WS_POOL_SIZE: 1},
+            "cache": {CONF_CACHE_MEMORY_MB: 1},
+            "tts": {CONF_DEFAULT_LANGUAGE: "en-US"},
+        },
+    )
+    await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert fake_bridge_entry.options[CONF_MAX_CONCURRENT] == 2
+    assert fake_bridge_entry.options[CONF_STT_CONCURRENCY] == DEFAULT_STT_CONCURRENCY
+    assert CONF_STT_FRAME_MS not in fake_bridge_entry.options
+    assert hass.data[DOMAIN][fake_bridge_entry.entry_id] is data
+    scheduler = data.pool.primary.scheduler
+    assert scheduler.capacity == 2
+    assert scheduler.limits["tts"] == 1
+    assert data.ws_pools[data.pool.primary].size == 1
+    assert data.tts_cache.memory_budget == 1024 * 1024
+    provider = STTBridgeProvider(hass, data, fake_bridge_entry)
+    assert provider.default_language == "en-US"
+
+
+async def test_options_flow_invalid(
+    hass: HomeAssistant, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test out of range options are rejected."""
+    result = await hass.config_entries.options.async_init(fake_bridge_entry.entry_id)
+
+    with pytest.raises(vol.Invalid):
+        await hass.config_entries.options.async_configure(
+            result["flow_id"], {"stt": {CONF_STT_FRAME_MS: 500}}
+        )
@@ -0,0 +1,112 @@
+"""Test the STT Bridge capture corpus."""
+from pathlib import Path
+
+from homeassistant.components import stt
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sttbridge.const import (
+    CONF_PARTIAL_STABLE_MS,
+    CONF_STT_CAPTURE,
+    CONF_STT_TRANSPORT,
+    CORPUS_DIR,
+    DOMAIN,
+    TRANSPORT_WEBSOCKET,
+)
+from custom_components.sttbridge.corpus import (
+    INDEX_FILE,
+    CorpusReader,
+    CorpusWriter,
+    word_error_rate,
+)
+from custom_components.sttbridge.stt import STTBridgeSTTProvider
+
+from .fake_bridge import FakeBridge
+from .test_stt import METADATA, _audio
+
+
+def test_word_error_rate() -> None:
+    """Test word edits are counted without case and punctuation."""
+    assert word_error_rate("Turn on the light.", "turn on the light") == (0, 4)
+    assert word_error_rate("turn on the light", "turn off the lights") == (2, 4)
+    assert word_error_rate("turn on the light", "turn the light on") == (2, 4)
+    assert word_error_rate("lights on", "") == (2, 2)
+    assert word_error_rate("", "hello") == (1, 0)
+
+
+async def test_append_and_read(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test utterances are appended and read back memory-mapped."""
+    writer = CorpusWriter(hass, tmp_path, 1024 * 1024)
+    for text in ("first", "second"):
+        recorder = writer.recorder(METADATA)
+        async for _chunk in recorder.tap(_audio(0.5)):
+            recorder.async_partial(text[:3])
+        await writer.async_append(recorder, text)
+    # An append cut off after the audio
+    with (tmp_path / INDEX_FILE).open("a") as file:
+        file.write('{"offset": 32000, "len')
+
+    with CorpusReader(tmp_path) as reader:
+        assert [entry.final for entry in reader.entries] == ["first", "second"]
+        entry = reader.entries[1]
+        assert entry.offset == 16000
+        assert entry.duration == 0.5
+        assert entry.metadata == METADATA
+        assert entry.partials[0][1] == "sec"
+        with reader.audio(entry) as audio:
+            assert audio == bytes(16000)
+
+    assert writer.utterances == 2
+    # The corpus is full once the next utterance doesn't fit
+    writer.max_bytes = 40000
+    recorder = writer.recorder(METADATA)
+    async for _chunk in recorder.tap(_audio(0.5)):
+        pass
+    await writer.async_append(recorder, "third")
+    assert writer.utterances == 2
+    assert writer.recorder(METADATA) is None
+
+    writer = CorpusWriter(hass, tmp_path, 1024 * 1024)
+    recorder = writer.recorder(METADATA)
+    async for _chunk in recorder.tap(_audio(0.1)):
+        pass
+    await writer.async_append(recorder, "fourth")
+    with CorpusReader(tmp_path) as reader:
+        assert [entry.final for entry in reader.entries] == [
+            "first",
+            "second",
+            "fourth",
+        ]
+
+
+async def test_capture(hass: HomeAssistant, fake_bridge: FakeBridge) -> None:
+    """Test processed utterances are recorded with their transcripts."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": fake_bridge.host, "port": fake_bridge.port},
+        options={
+            CONF_STT_CAPTURE: True,
+            CONF_STT_TRANSPORT: TRANSPORT_WEBSOCKET,
+            CONF_PARTIAL_STABLE_MS: 0,
+        },
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    provider = STTBridgeSTTProvider(hass, hass.data[DOMAIN][entry.entry_id], entry)
+
+    result = await provider.async_process_audio_stream(METADATA, _audio(1.0))
+    assert result.result == stt.SpeechResultState.SUCCESS
+    await hass.async_block_till_done()
+
+    directory = Path(hass.config.path(".storage", DOMAIN, CORPUS_DIR, entry.entry_id))
+    with CorpusReader(directory) as reader:
+        (recorded,) = reader.entries
+        assert recorded.final == fake_bridge.config.transcript
+        assert recorded.length == 32000
+        assert recorded.partials
+        assert all(
+            fake_bridge.config.transcript.startswith(text)
+            for _, text in recorded.partials
+        )
+        assert recorded.latency is not None
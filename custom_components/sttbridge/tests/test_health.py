@@ -0,0 +1,47 @@
+"""Test the STT Bridge health coordinator."""
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.sttbridge.health import (
+    DEGRADED_INTERVAL,
+    HEALTHY_INTERVAL,
+    HealthCoordinator,
+)
+from custom_components.sttbridge.pool import (
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    Backend,
+    BackendPool,
+)
+
+from .fake_bridge import FakeBridge
+
+
+async def test_health_drives_circuit_breaker(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> None:
+    """Test failed health checks open the circuit and recovery half-opens it."""
+    fake_bridge.config.stt_sample_rate = 24000
+    backend = Backend(fake_bridge.host, fake_bridge.port)
+    health = HealthCoordinator(
+        hass, async_get_clientsession(hass), BackendPool([backend]), None
+    )
+
+    await health.async_refresh()
+    assert health.healthy == {backend: True}
+    assert health.interval == HEALTHY_INTERVAL
+    assert health.capabilities.stt_sample_rate == 24000
+
+    await fake_bridge.stop()
+    for _ in range(backend.breaker.failure_threshold):
+        await health.async_refresh()
+    assert health.healthy == {backend: False}
+    assert health.interval == DEGRADED_INTERVAL
+    assert backend.breaker.state == STATE_OPEN
+
+    await fake_bridge.start()
+    backend.port = fake_bridge.port
+    backend.base_url = f"http://{fake_bridge.host}:{fake_bridge.port}"
+    await health.async_refresh()
+    assert backend.breaker.state == STATE_HALF_OPEN
+    assert health.interval == HEALTHY_INTERVAL
@@ -1,29 +1,107 @@
 """Test the STT Bridge integration."""
+from datetime import timedelta
+import socket
+from typing import Any
+
 from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
 
 from custom_components.sttbridge.const import DOMAIN
+from custom_components.sttbridge.state import SAVE_DELAY
+from custom_components.sttbridge.tts import STTBridgeProvider
 
+from .fake_bridge import FakeBridge
 
-async def test_setup_unload_entry(hass: HomeAssistant, mock_config_entry) -> None:
-    """Test setting up and unloading the integration."""
-    mock_config_entry.add_to_hass(hass)
 
-    # Setup the integration
-    await hass.config_entries.async_setup(mock_config_entry.entry_id)
-    await hass.async_block_till_done()
-
-    assert mock_config_entry.state is ConfigEntryState.LOADED
+async def test_setup_unload_entry(
+    hass: HomeAssistant, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test setting up and unloading the integration."""
+    assert fake_bridge_entry.state is ConfigEntryState.LOADED
     assert DOMAIN in hass.data
-    assert mock_config_entry.entry_id in hass.data[DOMAIN]
+    assert fake_bridge_entry.entry_id in hass.data[DOMAIN]
+    session = hass.data[DOMAIN][fake_bridge_entry.entry_id].session
 
     # Check that platforms were set up
     assert "stt" in hass.config.components
     assert "tts" in hass.config.components
+    assert "sensor" in hass.config.components
 
     # Unload the integration
-    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
+    assert await hass.config_entries.async_unload(fake_bridge_entry.entry_id)
     await hass.async_block_till_done()
 
-    assert mock_config_entry.state is ConfigEntryState.NOT_LOADED
-    assert mock_config_entry.entry_id not in hass.data[DOMAIN]
+    assert fake_bridge_entry.state is ConfigEntryState.NOT_LOADED
+    assert fake_bridge_entry.entry_id not in hass.data[DOMAIN]
+    assert session.closed
+
+
+async def test_connections_reused(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test sequential requests are sent on a kept-alive connection."""
+    data = hass.data[DOMAIN][fake_bridge_entry.entry_id]
+    provider = STTBridgeProvider(hass, data, fake_bridge_entry)
+    await provider.async_get_tts_audio("Good morning", "en-US", {})
+    new = data.metrics.http.new
+    reuse = data.metrics.http.reuse
+
+    for text in ("Good afternoon", "Good night"):
+        await provider.async_get_tts_audio(text, "en-US", {})
+
+    assert fake_bridge.requests["tts"] == 3
+    assert data.metrics.http.new == new
+    assert data.metrics.http.reuse == reuse + 2
+
+
+async def test_state_restored(
+    hass: HomeAssistant, fake_bridge: FakeBridge, hass_storage: dict[str, Any]
+) -> None:
+    """Test setup starts from the stored state and keeps it up to date."""
+    # A bridge that is asleep: nothing listens on the port
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        asleep = sock.getsockname()[1]
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "127.0.0.1", "port": asleep})
+    entry.add_to_hass(hass)
+    key = f"{DOMAIN}.state.{entry.entry_id}"
+    hass_storage[key] = {
+        "version": 1,
+        "key": key,
+        "data": {
+            "capabilities": {"stt_sample_rate": 24000, "stt_transports": ["http"]},
+            "voices": {
+                "voices": [["com.apple.voice.Thomas", "Thomas", "fr-FR"]],
+                "version": "old",
+                "etag": None,
+            },
+        },
+    }
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    data = hass.data[DOMAIN][entry.entry_id]
+    assert data.capabilities.stt_sample_rate == 24000
+    assert data.capabilities.stt_transports == ("http",)
+    assert data.voices.languages == ["fr-FR"]
+
+    # The bridge wakes up
+    hass.config_entries.async_update_entry(
+        entry, data={"host": fake_bridge.host, "port": fake_bridge.port}
+    )
+    await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    data = hass.data[DOMAIN][entry.entry_id]
+    assert data.capabilities.stt_sample_rate == 16000
+    assert data.voices.languages == ["de-DE", "en-US"]
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=SAVE_DELAY))
+    await hass.async_block_till_done()
+    stored = hass_storage[key]["data"]
+    assert stored["capabilities"]["stt_sample_rate"] == 16000
+    assert len(stored["voices"]["voices"]) == 2
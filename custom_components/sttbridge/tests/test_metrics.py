@@ -0,0 +1,47 @@
+"""Test the STT Bridge request metrics."""
+import pytest
+
+from custom_components.sttbridge.metrics import CallMetrics, LatencyWindow
+
+
+def test_latency_window_percentiles() -> None:
+    """Test percentiles cover only the most recent samples."""
+    window = LatencyWindow(size=100)
+    assert window.percentile(50) is None
+
+    for _ in range(100):
+        window.record(1.0)
+    for ms in range(1, 101):
+        window.record(ms / 1000)
+
+    assert window.count == 200
+    assert window.percentile(50) == pytest.approx(50.5)
+    assert window.percentile(99) == pytest.approx(99.01)
+    assert window.as_dict() == {
+        "count": 200,
+        "p50_ms": 50.5,
+        "p95_ms": 95.0,
+        "p99_ms": 99.0,
+    }
+
+
+def test_call_timer() -> None:
+    """Test phases are recorded once and errors counted by class."""
+    metrics = CallMetrics("first_byte", "total")
+
+    timer = metrics.start()
+    timer.mark("first_byte")
+    timer.mark("first_byte")
+    timer.sent(10)
+    timer.received(100)
+    timer.mark("total")
+    metrics.start().error(TimeoutError())
+    metrics.start().error("http_500")
+
+    result = metrics.as_dict()
+    assert result["calls"] == 3
+    assert result["bytes_sent"] == 10
+    assert result["bytes_received"] == 100
+    assert result["errors"] == {"TimeoutError": 1, "http_500": 1}
+    assert result["first_byte"]["count"] == 1
+    assert result["total"]["count"] == 1
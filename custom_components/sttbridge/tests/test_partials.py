@@ -0,0 +1,80 @@
+"""Test the STT Bridge partial transcript publishing."""
+import asyncio
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from pytest_homeassistant_custom_component.common import async_capture_events
+
+from custom_components.sttbridge.const import (
+    EVENT_PARTIAL_TRANSCRIPT,
+    SIGNAL_TRANSCRIPT,
+)
+from custom_components.sttbridge.partials import PartialTranscripts
+
+
+async def test_partials_throttled_and_deduplicated(hass: HomeAssistant) -> None:
+    """Test partials are de-duplicated and the last one is always published."""
+    events = async_capture_events(hass, EVENT_PARTIAL_TRANSCRIPT)
+    transcripts = PartialTranscripts(hass, "entry", "en-US", interval=0.05)
+
+    transcripts.async_update("turn")
+    transcripts.async_update("turn")
+    transcripts.async_update("turn on")
+    transcripts.async_update("turn on the light")
+    await hass.async_block_till_done()
+    assert [event.data["text"] for event in events] == ["turn"]
+    assert events[0].data == {
+        "entry_id": "entry",
+        "utterance_id": transcripts.utterance_id,
+        "language": "en-US",
+        "text": "turn",
+    }
+
+    await asyncio.sleep(0.1)
+    assert [event.data["text"] for event in events] == ["turn", "turn on the light"]
+    assert transcripts.text == "turn on the light"
+
+
+async def test_partials_update_sensor_signal(hass: HomeAssistant) -> None:
+    """Test the transcript signal gets partials and the final result."""
+    received = []
+
+    @callback
+    def _update(text: str, final: bool) -> None:
+        received.append((text, final))
+
+    async_dispatcher_connect(hass, SIGNAL_TRANSCRIPT.format("entry"), _update)
+    events = async_capture_events(hass, EVENT_PARTIAL_TRANSCRIPT)
+    transcripts = PartialTranscripts(hass, "entry", "en-US", fire_events=False)
+
+    transcripts.async_update("hello")
+    transcripts.async_finish("hello world")
+    await hass.async_block_till_done()
+
+    assert received == [("hello", False), ("hello world", True)]
+    assert not events
+
+
+async def test_last_partial_published_on_finish(hass: HomeAssistant) -> None:
+    """Test a throttled partial is published when the utterance ends."""
+    events = async_capture_events(hass, EVENT_PARTIAL_TRANSCRIPT)
+    transcripts = PartialTranscripts(hass, "entry", "en-US", interval=10)
+    other = PartialTranscripts(hass, "entry", "en-US", interval=10)
+
+    transcripts.async_update("turn")
+    transcripts.async_update("turn on the light")
+    transcripts.async_finish("turn on the light")
+    other.async_update("good night")
+    await hass.async_block_till_done()
+
+    assert [event.data["text"] for event in events] == [
+        "turn",
+        "turn on the light",
+        "good night",
+    ]
+    assert [event.data["utterance_id"] for event in events] == [
+        transcripts.utterance_id,
+        transcripts.utterance_id,
+        other.utterance_id,
+    ]
+    assert transcripts.utterance_id != other.utterance_id
@@ -0,0 +1,118 @@
+"""Test the STT Bridge backend pool."""
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+
+from custom_components.sttbridge.exceptions import NoBackendAvailable
+from custom_components.sttbridge.pool import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    Backend,
+    BackendPool,
+    CircuitBreaker,
+    entry_endpoints,
+    parse_endpoints,
+)
+
+
+def _connect_error() -> aiohttp.ClientConnectorError:
+    """Return the error aiohttp raises when a server refuses the connection."""
+    return aiohttp.ClientConnectorError(MagicMock(), OSError(111, "Connection refused"))
+
+
+def test_parse_endpoints() -> None:
+    """Test parsing the endpoint list from the config flow."""
+    assert parse_endpoints("10.0.0.2:8788, 10.0.0.3,", 8787) == [
+        "10.0.0.2:8788",
+        "10.0.0.3:8787",
+    ]
+    assert entry_endpoints(
+        {"host": "10.0.0.1", "port": 8787, "endpoints": ["10.0.0.1:8787", "10.0.0.2:8787"]}
+    ) == [("10.0.0.1", 8787), ("10.0.0.2", 8787)]
+
+
+def test_select_least_loaded() -> None:
+    """Test selection prefers idle and fast backends."""
+    fast, slow = Backend("fast", 1), Backend("slow", 1)
+    fast.record_latency(0.01)
+    slow.record_latency(0.05)
+    pool = BackendPool([slow, fast])
+
+    assert pool.select() is fast
+    fast.in_flight = 5
+    assert pool.select() is slow
+    assert pool.select(exclude={slow}) is fast
+
+
+async def test_failover() -> None:
+    """Test a connect error moves the request to the next backend."""
+    first, second = Backend("first", 1), Backend("second", 1)
+    pool = BackendPool([first, second])
+    calls = []
+
+    async def request(backend: Backend) -> str:
+        calls.append(backend)
+        if backend is first:
+            raise _connect_error()
+        return "ok"
+
+    assert await pool.async_run(request) == "ok"
+    assert calls == [first, second]
+    assert first.recently_failed
+    # The failed backend is tried last from now on
+    assert pool.select() is second
+
+
+async def test_all_backends_down() -> None:
+    """Test NoBackendAvailable is raised once every backend failed."""
+    pool = BackendPool([Backend("a", 1), Backend("b", 1)])
+
+    async def request(backend: Backend) -> None:
+        raise _connect_error()
+
+    with pytest.raises(NoBackendAvailable):
+        await pool.async_run(request)
+
+
+def test_circuit_breaker() -> None:
+    """Test the circuit opens, half-opens for one trial and closes again."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.available
+
+    # A successful health check allows a single trial request
+    breaker.record_healthy()
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.begin()
+    assert not breaker.available
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+
+    breaker.record_healthy()
+    breaker.begin()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.available
+    assert breaker.trips == 2
+
+
+async def test_open_circuit_fails_fast() -> None:
+    """Test requests fail without any I/O while every circuit is open."""
+    backend = Backend("down", 1)
+    for _ in range(backend.breaker.failure_threshold):
+        backend.record_failure()
+    pool = BackendPool([backend])
+    calls = []
+
+    async def request(backend: Backend) -> str:
+        calls.append(backend)
+        return "ok"
+
+    with pytest.raises(NoBackendAvailable, match="circuit open"):
+        await pool.async_run(request)
+    assert not calls
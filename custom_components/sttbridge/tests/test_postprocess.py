@@ -0,0 +1,108 @@
+"""Test the STT Bridge TTS post-processing."""
+import numpy as np
+
+from custom_components.sttbridge.postprocess import (
+    LEAD_PAD_MS,
+    PEAK_CEILING_DB,
+    TRAIL_PAD_MS,
+    PostProcessing,
+    frame_levels,
+    process_wav,
+)
+from custom_components.sttbridge.wav import (
+    WAVE_FORMAT_PCM,
+    WavFormat,
+    build_wav_header,
+    parse_wav,
+)
+
+RATE = 22050
+
+
+def _speech(amplitude: int) -> bytes:
+    """Return a WAV file with 500 ms of tone between stretches of silence."""
+    t = np.arange(RATE // 2) / RATE
+    tone = (amplitude * np.sin(2 * np.pi * 220 * t)).astype("<i2")
+    samples = np.concatenate(
+        (
+            np.zeros(RATE * 400 // 1000, dtype="<i2"),
+            tone,
+            np.zeros(RATE * 300 // 1000, dtype="<i2"),
+        )
+    )
+    fmt = WavFormat(WAVE_FORMAT_PCM, 1, RATE, 16)
+    return build_wav_header(fmt, samples.nbytes) + samples.tobytes()
+
+
+def _samples(data: bytes) -> tuple[WavFormat, np.ndarray]:
+    """Return the format and samples of a WAV file."""
+    fmt, pcm = parse_wav(data)
+    return fmt, np.frombuffer(pcm, dtype="<i2")
+
+
+def test_variant() -> None:
+    """Test the variant names exactly the processing that is applied."""
+    assert PostProcessing.from_options({}).variant is None
+    trimmed = PostProcessing.from_options({"tts_trim_silence": True})
+    normalized = PostProcessing.from_options({"tts_normalize": True})
+    assert trimmed.variant is not None
+    assert normalized.variant not in (None, trimmed.variant)
+    louder = PostProcessing.from_options({"tts_normalize": True, "tts_target_db": -16})
+    assert louder.variant != normalized.variant
+
+
+def test_trim_silence() -> None:
+    """Test silence is cut down to the pads around the speech."""
+    data = process_wav(_speech(8000), PostProcessing(trim_silence=True))
+
+    _, samples = _samples(data)
+    expected = RATE * (LEAD_PAD_MS + 500 + TRAIL_PAD_MS) // 1000
+    assert abs(len(samples) - expected) <= RATE // 100
+    assert np.all(samples[: RATE * LEAD_PAD_MS // 1000 - RATE // 100] == 0)
+
+
+def test_trim_only_silence() -> None:
+    """Test a file of silence is trimmed to an empty one."""
+    data = process_wav(_speech(0), PostProcessing(trim_silence=True))
+
+    fmt, samples = _samples(data)
+    assert fmt.sample_rate == RATE
+    assert len(samples) == 0
+
+
+def test_normalize_loudness() -> None:
+    """Test quiet and loud speech end up at the same level, below the ceiling."""
+    settings = PostProcessing(target_db=-20.0)
+    levels = []
+    for amplitude in (1000, 20000):
+        _, samples = _samples(process_wav(_speech(amplitude), settings))
+        speech = frame_levels(samples.reshape(-1, 1), RATE // 100)
+        levels.append(float(np.median(speech[speech > -50])))
+        peak = 20 * np.log10(np.max(np.abs(samples)) / 32768)
+        assert peak <= PEAK_CEILING_DB + 0.1
+
+    assert abs(levels[0] - levels[1]) < 0.5
+    assert abs(levels[0] + 20.0) < 0.5
+
+
+def test_downsample_and_downmix() -> None:
+    """Test audio is converted to a lower rate and mono, but never upsampled."""
+    fmt, samples = _samples(_speech(8000))
+    stereo = np.repeat(samples, 2)
+    data = (
+        build_wav_header(WavFormat(WAVE_FORMAT_PCM, 2, RATE, 16), stereo.nbytes)
+        + stereo.tobytes()
+    )
+
+    out_fmt, out = _samples(process_wav(data, PostProcessing(sample_rate=16000)))
+    assert out_fmt == WavFormat(WAVE_FORMAT_PCM, 1, 16000, 16)
+    assert abs(len(out) - len(samples) * 16000 / RATE) <= 2
+
+    out_fmt, _ = _samples(process_wav(data, PostProcessing(mono=True)))
+    assert out_fmt == WavFormat(WAVE_FORMAT_PCM, 1, RATE, 16)
+
+    out_fmt, out = _samples(
+        process_wav(_speech(8000), PostProcessing(sample_rate=48000))
+    )
+    assert out_fmt == fmt
+    assert len(out) == len(samples)
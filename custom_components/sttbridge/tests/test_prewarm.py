@@ -0,0 +1,140 @@
+"""Test the STT Bridge TTS pre-warming."""
+import asyncio
+from typing import Any
+
+import pytest
+from homeassistant.components.tts import TTSAudioRequest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sttbridge.const import CONF_PREWARM_RATE, DOMAIN, SERVICE_PREWARM
+from custom_components.sttbridge.prewarm import MAX_EXPANSIONS, expand_phrases
+from custom_components.sttbridge.tts import STTBridgeProvider
+
+from .fake_bridge import FakeBridge
+
+
+def test_expand_phrases() -> None:
+    """Test templates expand to every combination of their values."""
+    assert expand_phrases(
+        ["{room} window is open", "Laundry done in {minutes} minutes", "Good night"],
+        {"room": ["Kitchen", "Bedroom"], "minutes": ["5", "10"]},
+    ) == [
+        "Kitchen window is open",
+        "Bedroom window is open",
+        "Laundry done in 5 minutes",
+        "Laundry done in 10 minutes",
+        "Good night",
+    ]
+    assert expand_phrases(
+        ["{a}{b}{a}", "xx"], {"a": ["x"], "b": ["", "x"]}
+    ) == ["xx", "xxx"]
+
+
+@pytest.mark.parametrize(
+    ("phrases", "values"),
+    [
+        (["{room} window is open"], {}),
+        (["{} window is open"], {}),
+        (["{room.name} window is open"], {"room.name": ["Kitchen"]}),
+        (["Unclosed {room"], {"room": ["Kitchen"]}),
+        (["{a} {b}"], {"a": list("0123456789") * 10, "b": list("0123456789x")}),
+    ],
+)
+def test_expand_phrases_invalid(phrases: list[str], values: dict[str, Any]) -> None:
+    """Test phrases that can't be expanded are rejected."""
+    assert 100 * 11 > MAX_EXPANSIONS
+    with pytest.raises(ValueError):
+        expand_phrases(phrases, values)
+
+
+async def test_prewarm_service(
+    hass: HomeAssistant, fake_bridge: FakeBridge, hass_storage: dict[str, Any]
+) -> None:
+    """Test announcements are synthesized ahead of time and then served cached."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": fake_bridge.host, "port": fake_bridge.port},
+        options={CONF_PREWARM_RATE: 6000},
+    )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    data = hass.data[DOMAIN][entry.entry_id]
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PREWARM,
+        {
+            "phrases": ["{room} window is open", "Good night"],
+            "values": {"room": ["Kitchen", "Bedroom"]},
+            "language": "en-US",
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert response == {"queued": 3}
+    for _ in range(100):
+        if data.prewarm.synthesized == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert fake_bridge.requests["tts"] == 3
+    assert hass_storage[f"{DOMAIN}.prewarm.{entry.entry_id}"]["data"]["groups"]
+
+    provider = STTBridgeProvider(hass, data, entry)
+    _, audio = await provider.async_get_tts_audio(
+        "Bedroom window is open", "en-US", {}
+    )
+    assert audio
+    assert fake_bridge.requests["tts"] == 3
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_PREWARM,
+            {"phrases": ["{room} window is open"], "language": "en-US"},
+            blocking=True,
+        )
+
+
+async def test_announcement_not_joining_prewarm(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test an announcement doesn't wait for a pre-warm of the same phrase."""
+    fake_bridge.config.tts_latency = 0.05
+    data = hass.data[DOMAIN][fake_bridge_entry.entry_id]
+    provider = STTBridgeProvider(hass, data, fake_bridge_entry)
+
+    prewarm = asyncio.create_task(provider.async_prewarm("Good night", "en-US", {}))
+    await asyncio.sleep(0.01)
+    _, audio = await provider.async_get_tts_audio("Good night", "en-US", {})
+
+    assert audio
+    assert await prewarm
+    assert fake_bridge.requests["tts"] == 2
+    assert data.tts_flights.shared == 0
+
+
+async def test_prewarmed_phrase_streams_from_cache(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test a pre-warmed phrase of several sentences plays without synthesis."""
+    provider = STTBridgeProvider(
+        hass, hass.data[DOMAIN][fake_bridge_entry.entry_id], fake_bridge_entry
+    )
+    message = "The washing machine is done. Please empty it before you go to bed."
+    assert await provider.async_prewarm(message, "en-US", {})
+    assert fake_bridge.requests["tts"] == 2
+
+    async def message_gen():
+        yield message
+
+    response = await provider.async_stream_tts_audio(
+        TTSAudioRequest("en-US", {}, message_gen())
+    )
+    chunks = [chunk async for chunk in response.data_gen]
+
+    # A header and the audio of both sentences
+    assert len(chunks) == 3
+    assert fake_bridge.requests["tts"] == 2
@@ -0,0 +1,72 @@
+"""Test the STT Bridge event loop profiling."""
+import asyncio
+from pathlib import Path
+import time
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sttbridge.const import DOMAIN, SERVICE_PROFILE
+from custom_components.sttbridge.profiling import LoopProfiler
+
+from .fake_bridge import FakeBridge
+
+
+def _hold_loop(seconds: float) -> None:
+    """Keep the event loop busy."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def _handler() -> None:
+    """Stand in for a request handler of the integration."""
+    await asyncio.sleep(0)
+    _hold_loop(0.03)
+    await asyncio.sleep(0)
+
+
+async def test_slow_callbacks_flagged(hass: HomeAssistant) -> None:
+    """Test await-free stretches are timed and slow callbacks flagged."""
+    profiler = LoopProfiler(hass)
+    await profiler.async_start(60, 0.02)
+    await asyncio.create_task(_handler())
+    # A slow callback that isn't ours
+    hass.loop.call_soon(_hold_loop, 0.03)
+    await asyncio.sleep(0.01)
+    await profiler.async_stop()
+
+    assert not profiler.running
+    assert profiler.slow_total == 2
+    assert profiler.slow_ours == 1
+    stats = profiler.stretches["test_profiling._handler"]
+    assert stats.count == 3
+    assert stats.slow == 1
+    diagnostics = profiler.as_dict()
+    assert [slow["ours"] for slow in diagnostics["slowest"]] == [True, False]
+    assert diagnostics["stretches"]["test_profiling._handler"]["max_ms"] >= 30
+
+
+async def test_profile_service(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry
+) -> None:
+    """Test the service samples integration code into a file."""
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PROFILE,
+        {"sample": True, "sample_interval_ms": 1},
+        blocking=True,
+        return_response=True,
+    )
+    path = Path(response["file"])
+    for _ in range(5):
+        await _handler()
+
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_PROFILE, {"duration": 0}, blocking=True, return_response=True
+    )
+    assert not response["running"]
+    assert response["sampling"]["samples"]
+    assert "test_profiling._handler" in response["sampling"]["top_functions"]
+    stacks = await hass.async_add_executor_job(path.read_text)
+    assert "test_profiling._handler" in stacks
+    await hass.async_add_executor_job(path.unlink)
@@ -0,0 +1,159 @@
+"""Test the STT Bridge request scheduler."""
+import asyncio
+
+import pytest
+
+from custom_components.sttbridge.exceptions import QueueFull, RequestShed
+from custom_components.sttbridge.pool import Backend, BackendPool
+from custom_components.sttbridge.scheduler import (
+    QUEUE_SIZES,
+    REQUEST_BACKGROUND,
+    REQUEST_STT,
+    REQUEST_TTS,
+    RequestScheduler,
+)
+
+
+async def _hold(
+    scheduler: RequestScheduler,
+    request_class: str,
+    release: asyncio.Event,
+    started: list[str],
+) -> None:
+    """Hold a slot until release is set."""
+    async with scheduler.slot(request_class):
+        started.append(request_class)
+        await release.wait()
+
+
+async def test_class_limits() -> None:
+    """Test TTS and background requests can't take every slot."""
+    scheduler = RequestScheduler(3, {REQUEST_STT: 3, REQUEST_TTS: 2, REQUEST_BACKGROUND: 1})
+    release = asyncio.Event()
+    started: list[str] = []
+    tasks = [
+        asyncio.create_task(_hold(scheduler, request_class, release, started))
+        for request_class in (REQUEST_BACKGROUND, REQUEST_BACKGROUND, REQUEST_TTS)
+    ]
+    await asyncio.sleep(0)
+
+    assert started == [REQUEST_BACKGROUND, REQUEST_TTS]
+    assert scheduler.queued(REQUEST_BACKGROUND) == 1
+    # The slot left over is still free for STT
+    async with scheduler.slot(REQUEST_STT, timeout=0.1):
+        assert scheduler.running[REQUEST_STT] == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert started == [REQUEST_BACKGROUND, REQUEST_TTS, REQUEST_BACKGROUND]
+    assert sum(scheduler.running.values()) == 0
+
+
+async def test_priority_order() -> None:
+    """Test a freed slot goes to the highest priority waiting request."""
+    scheduler = RequestScheduler(1)
+    release = asyncio.Event()
+    started: list[str] = []
+    first = asyncio.create_task(_hold(scheduler, REQUEST_TTS, release, started))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(_hold(scheduler, request_class, release, started))
+        for request_class in (REQUEST_BACKGROUND, REQUEST_TTS, REQUEST_STT)
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.as_dict()[REQUEST_STT]["queued"] == 1
+
+    release.set()
+    await asyncio.gather(first, *waiting)
+    assert started == [REQUEST_TTS, REQUEST_STT, REQUEST_TTS, REQUEST_BACKGROUND]
+
+
+async def test_shed_and_reject() -> None:
+    """Test requests past their deadline are shed and full queues rejected."""
+    scheduler = RequestScheduler(1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, REQUEST_STT, release, []))
+    await asyncio.sleep(0)
+
+    with pytest.raises(RequestShed):
+        async with scheduler.slot(REQUEST_TTS, timeout=0.01):
+            pass
+    assert scheduler.queued(REQUEST_TTS) == 0
+    assert scheduler.shed[REQUEST_TTS] == 1
+
+    waiting = [
+        asyncio.create_task(_hold(scheduler, REQUEST_BACKGROUND, release, []))
+        for _ in range(QUEUE_SIZES[REQUEST_BACKGROUND])
+    ]
+    await asyncio.sleep(0)
+    with pytest.raises(QueueFull):
+        async with scheduler.slot(REQUEST_BACKGROUND):
+            pass
+    assert scheduler.rejected[REQUEST_BACKGROUND] == 1
+
+    release.set()
+    await asyncio.gather(holder, *waiting)
+    assert scheduler.admitted[REQUEST_BACKGROUND] == QUEUE_SIZES[REQUEST_BACKGROUND]
+
+
+async def test_cancelled_waiter_passes_slot_on() -> None:
+    """Test a waiter cancelled as it is admitted doesn't leak its slot."""
+    scheduler = RequestScheduler(1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, REQUEST_TTS, release, []))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(scheduler, REQUEST_TTS, asyncio.Event(), []))
+    await asyncio.sleep(0)
+
+    release.set()
+    await holder
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert sum(scheduler.running.values()) == 0
+
+
+async def test_cancelled_waiter_skipped() -> None:
+    """Test a waiter cancelled just before a slot frees up is passed over."""
+    scheduler = RequestScheduler(1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, REQUEST_TTS, release, []))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(scheduler, REQUEST_TTS, asyncio.Event(), []))
+    await asyncio.sleep(0)
+
+    # The holder leaves its slot before the cancelled waiter resumes
+    release.set()
+    waiter.cancel()
+    await holder
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert sum(scheduler.running.values()) == 0
+    assert scheduler.queued(REQUEST_TTS) == 0
+
+    started: list[str] = []
+    await _hold(scheduler, REQUEST_TTS, release, started)
+    assert started == [REQUEST_TTS]
+
+
+async def test_pool_skips_busy_backend() -> None:
+    """Test the pool moves on to another backend when a queue is full."""
+    busy = Backend("busy", 1, RequestScheduler(1))
+    idle = Backend("idle", 1)
+    busy.record_latency(0.01)
+    idle.record_latency(0.05)
+    pool = BackendPool([busy, idle])
+    release = asyncio.Event()
+    waiting = [
+        asyncio.create_task(_hold(busy.scheduler, REQUEST_BACKGROUND, release, []))
+        for _ in range(QUEUE_SIZES[REQUEST_BACKGROUND] + 1)
+    ]
+    await asyncio.sleep(0)
+
+    async def request(backend: Backend) -> Backend:
+        return backend
+
+    assert await pool.async_run(request, REQUEST_BACKGROUND) is idle
+
+    release.set()
+    await asyncio.gather(*waiting)
@@ -0,0 +1,91 @@
+"""Test the STT Bridge single-flight deduplication."""
+import asyncio
+
+import pytest
+
+from custom_components.sttbridge.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_result() -> None:
+    """Test identical concurrent calls run once and get the same object."""
+    flights: SingleFlight[bytes] = SingleFlight("test")
+    release = asyncio.Event()
+    runs = 0
+
+    async def synthesize() -> bytes:
+        nonlocal runs
+        runs += 1
+        await release.wait()
+        return bytes(1000)
+
+    waiters = [
+        asyncio.create_task(flights.async_run("key", synthesize)) for _ in range(8)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert runs == 1
+    assert all(result is results[0] for result in results)
+    assert flights.as_dict() == {"in_flight": 0, "calls": 1, "shared": 7}
+
+    # A finished call is not reused
+    await flights.async_run("key", synthesize)
+    assert runs == 2
+
+
+async def test_failure_propagates() -> None:
+    """Test every caller gets the error of the shared call."""
+    flights: SingleFlight[bytes] = SingleFlight("test")
+
+    async def synthesize() -> bytes:
+        await asyncio.sleep(0)
+        raise RuntimeError("bridge down")
+
+    results = await asyncio.gather(
+        flights.async_run("key", synthesize),
+        flights.async_run("key", synthesize),
+        return_exceptions=True,
+    )
+
+    assert [str(result) for result in results] == ["bridge down", "bridge down"]
+
+
+async def test_cancellation() -> None:
+    """Test a cancelled caller leaves the call running for the others."""
+    flights: SingleFlight[bytes] = SingleFlight("test")
+    release = asyncio.Event()
+    started = asyncio.Event()
+    cancelled = False
+
+    async def synthesize() -> bytes:
+        nonlocal cancelled
+        started.set()
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return b"audio"
+
+    first = asyncio.create_task(flights.async_run("key", synthesize))
+    second = asyncio.create_task(flights.async_run("key", synthesize))
+    await started.wait()
+
+    first.cancel()
+    release.set()
+    assert await second == b"audio"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert not cancelled
+
+    # Once the last caller is cancelled, the call is cancelled too
+    release.clear()
+    started.clear()
+    only = asyncio.create_task(flights.async_run("other", synthesize))
+    await started.wait()
+    only.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await only
+    await asyncio.sleep(0)
+    assert cancelled
@@ -1,50 +1,479 @@
 """Test the STT Bridge STT platform."""
-from unittest.mock import AsyncMock
+import asyncio
+import json
 
+import aiohttp
 import pytest
 from homeassistant.components import stt
 from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_capture_events,
+)
 
-from custom_components.sttbridge.const import DOMAIN
+from custom_components.sttbridge.const import (
+    CONF_PARTIAL_STABLE_MS,
+    CONF_STT_MULTIPLEX,
+    CONF_STT_TRANSPORT,
+    DEFAULT_STT_CONCURRENCY,
+    DOMAIN,
+    EVENT_PARTIAL_TRANSCRIPT,
+    TRANSPORT_HTTP,
+    TRANSPORT_WEBSOCKET,
+)
+from custom_components.sttbridge.mux import (
+    SESSION_QUEUE_SIZE,
+    MuxConnection,
+    MuxSession,
+)
+from custom_components.sttbridge.pool import Backend
+from custom_components.sttbridge.scheduler import REQUEST_STT, REQUEST_TTS
+from custom_components.sttbridge.stt import STTBridgeSTTProvider
 
-from .conftest import mock_config_entry
+from .fake_bridge import FakeBridge
 
-MOCK_CONFIG = {
-    "host": "1.2.3.4",
-    "port": 8787,
-    "token": "test-token",
-}
+METADATA = stt.SpeechMetadata(
+    language="en-US",
+    format=stt.AudioFormats.WAV,
+    codec=stt.AudioCodecs.PCM,
+    bit_rate=stt.AudioBitRates.BITRATE_16,
+    sample_rate=stt.AudioSampleRates.SAMPLERATE_16000,
+    channel=stt.AudioChannels.CHANNEL_MONO,
+)
 
-async def test_process_audio_stream(hass: HomeAssistant, aioclient_mock) -> None:
-    """Test processing an audio stream."""
-    entry = mock_config_entry()
+
+def _provider(hass: HomeAssistant, entry: MockConfigEntry) -> STTBridgeSTTProvider:
+    """Return an STT provider for a set up entry."""
+    return STTBridgeSTTProvider(hass, hass.data[DOMAIN][entry.entry_id], entry)
+
+
+async def _audio(seconds: float, chunk_bytes: int = 1000):
+    """Yield silence in chunks that don't line up with frames."""
+    audio = bytes(int(16000 * seconds) * 2)
+    for offset in range(0, len(audio), chunk_bytes):
+        yield audio[offset : offset + chunk_bytes]
+
+
+async def test_process_audio_stream(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test streaming audio over the WebSocket and receiving the final."""
+    events = async_capture_events(hass, EVENT_PARTIAL_TRANSCRIPT)
+
+    result = await _provider(hass, fake_bridge_entry).async_process_audio_stream(
+        METADATA, _audio(1.0)
+    )
+    await hass.async_block_till_done()
+
+    assert result.result == stt.SpeechResultState.SUCCESS
+    assert result.text == fake_bridge.config.transcript
+    # Audio is sent in 40 ms frames
+    assert fake_bridge.stt_audio_bytes == 32000
+    assert set(fake_bridge.stt_frames) == {1280}
+    assert events
+    assert events[0].data["text"] == "turn"
+
+    metrics = hass.data[DOMAIN][fake_bridge_entry.entry_id].metrics.stt
+    assert metrics.calls == 1
+    assert metrics.bytes_sent == 32000
+    for phase in ("connect", "first_byte", "final", "total"):
+        assert metrics.phases[phase].count == 1
+
+
+async def test_process_audio_stream_error(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test an error message from the bridge fails the utterance."""
+    fake_bridge.config.failure_rate = 1.0
+
+    result = await _provider(hass, fake_bridge_entry).async_process_audio_stream(
+        METADATA, _audio(0.5)
+    )
+
+    assert result.result == stt.SpeechResultState.ERROR
+    metrics = hass.data[DOMAIN][fake_bridge_entry.entry_id].metrics.stt
+    assert metrics.errors == {"bridge_error": 1}
+
+
+async def test_stable_partial_returned_early(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test a stable partial is returned when the final is slow."""
+    fake_bridge.config.stt_latency = 5.0
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry, options={"partial_stable_ms": 50}
+    )
+
+    result = await _provider(hass, fake_bridge_entry).async_process_audio_stream(
+        METADATA, _audio(0.7)
+    )
+
+    assert result.result == stt.SpeechResultState.SUCCESS
+    assert result.text == "turn on"
+
+
+async def test_partial_stable_before_audio_end(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test a partial unchanged over a pause in speech isn't used right away."""
+    fake_bridge.config.stt_latency = 0.05
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry, options={CONF_PARTIAL_STABLE_MS: 100}
+    )
+
+    async def audio():
+        async for chunk in _audio(0.7):
+            yield chunk
+        # "turn on" stays the partial while the user pauses
+        await asyncio.sleep(0.3)
+        async for chunk in _audio(0.1):
+            yield chunk
+
+    result = await _provider(hass, fake_bridge_entry).async_process_audio_stream(
+        METADATA, audio()
+    )
+
+    assert result.result == stt.SpeechResultState.SUCCESS
+    assert result.text == fake_bridge.config.transcript
+
+
+async def test_http_transport(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test uploading the audio with a chunked POST /stt."""
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry, options={CONF_STT_TRANSPORT: TRANSPORT_HTTP}
+    )
+    backend = hass.data[DOMAIN][fake_bridge_entry.entry_id].pool.primary
+    backend.latency = None
+
+    result = await _provider(hass, fake_bridge_entry).async_process_audio_stream(
+        METADATA, _audio(1.0)
+    )
+
+    assert result.result == stt.SpeechResultState.SUCCESS
+    assert result.text == fake_bridge.config.transcript
+    assert fake_bridge.requests["stt_post"] == 1
+    # Measured from the end of the audio, not over the whole upload
+    assert backend.latency is not None
+    assert backend.latency < 1.0
+    assert "stt" not in fake_bridge.requests
+    assert fake_bridge.stt_audio_bytes == 32000
+
+
+async def test_rejected_websocket_falls_back_to_http(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> None:
+    """Test a refused WebSocket upgrade falls back to POST /stt."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": fake_bridge.host, "port": fake_bridge.port},
+    )
     entry.add_to_hass(hass)
     await hass.config_entries.async_setup(entry.entry_id)
     await hass.async_block_till_done()
+    # Like a proxy that drops WebSockets; /healthz still reports both
+    fake_bridge.config.stt_transports = ["http"]
+    provider = _provider(hass, entry)
+
+    for _ in range(2):
+        result = await provider.async_process_audio_stream(METADATA, _audio(0.5))
+        assert result.result == stt.SpeechResultState.SUCCESS
+
+    # The second utterance skips the WebSocket that just failed
+    assert fake_bridge.requests["stt"] == 1
+    assert fake_bridge.requests["stt_post"] == 2
+    data = hass.data[DOMAIN][entry.entry_id]
+    assert data.transports.fallbacks == 1
+    # A refused upgrade doesn't count against the server
+    assert data.pool.primary.breaker.available
+
 
-    aioclient_mock.post(
-        f"http://{MOCK_CONFIG['host']}:{MOCK_CONFIG['port']}/stt",
-        json={"text": "This is a test"},
+async def test_dropped_connections_replayed(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test connections cut at random points are resumed without losing audio."""
+    fake_bridge.config.drop_rate = 0.05
+    fake_bridge.config.max_drops = 3
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry,
+        options={CONF_STT_TRANSPORT: TRANSPORT_WEBSOCKET, CONF_PARTIAL_STABLE_MS: 0},
     )
+    provider = _provider(hass, fake_bridge_entry)
+
+    for _ in range(5):
+        result = await provider.async_process_audio_stream(METADATA, _audio(1.0))
+        assert result.result == stt.SpeechResultState.SUCCESS
+        assert result.text == fake_bridge.config.transcript
+
+    assert fake_bridge.drops == 3
+    # Every transcript was made from the complete utterance
+    assert fake_bridge.completed_streams == [32000] * 5
+    data = hass.data[DOMAIN][fake_bridge_entry.entry_id]
+    assert data.transports.reconnects == 3
+    assert not data.metrics.stt.errors
+
+
+async def test_more_utterances_than_stt_slots(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test utterances only hold a scheduler slot while they connect."""
+    scheduler = hass.data[DOMAIN][fake_bridge_entry.entry_id].pool.primary.scheduler
+    provider = _provider(hass, fake_bridge_entry)
+    gate = asyncio.Event()
+
+    async def audio():
+        async for chunk in _audio(0.5):
+            yield chunk
+        await gate.wait()
+
+    count = DEFAULT_STT_CONCURRENCY * 2
+    tasks = [
+        asyncio.create_task(provider.async_process_audio_stream(METADATA, audio()))
+        for _ in range(count)
+    ]
+    for _ in range(100):
+        if scheduler.streams == count:
+            break
+        await asyncio.sleep(0.01)
+    assert scheduler.streams == count
+    # Speaking satellites leave the server's capacity to TTS
+    assert scheduler.running[REQUEST_STT] == 0
+    async with scheduler.slot(REQUEST_TTS, timeout=0.1):
+        pass
+    gate.set()
 
-    provider = stt.get_provider(hass, DOMAIN)
-    assert provider is not None
+    results = await asyncio.gather(*tasks)
+    assert all(result.result == stt.SpeechResultState.SUCCESS for result in results)
+    assert scheduler.shed[REQUEST_STT] == 0
+    assert scheduler.streams == 0
 
-    async def mock_audio_stream():
-        yield b"fake_audio_chunk_1"
-        yield b"fake_audio_chunk_2"
 
-    result = await provider.async_process_audio_stream(
-        stt.SpeechMetadata(
-            language="en-US",
-            format=stt.AudioFormats.WAV,
-            codec=stt.AudioCodecs.PCM,
-            bit_rate=stt.AudioBitRates.BIT_16,
-            sample_rate=stt.AudioSampleRates.KHZ_16,
-            channel=stt.AudioChannels.MONO,
-        ),
-        mock_audio_stream(),
+async def _mux_entry(hass: HomeAssistant, fake_bridge: FakeBridge) -> MockConfigEntry:
+    """Set up an entry that multiplexes STT sessions."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": fake_bridge.host, "port": fake_bridge.port},
+        options={
+            CONF_STT_MULTIPLEX: True,
+            CONF_STT_TRANSPORT: TRANSPORT_WEBSOCKET,
+        },
     )
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_multiplexed_sessions(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> None:
+    """Test concurrent utterances share one WebSocket."""
+    fake_bridge.config.stt_multiplex = True
+    fake_bridge.config.stt_latency = 0.05
+    entry = await _mux_entry(hass, fake_bridge)
+    provider = _provider(hass, entry)
+
+    results = await asyncio.gather(
+        *(
+            provider.async_process_audio_stream(METADATA, _audio(0.5 + i / 10))
+            for i in range(4)
+        )
+    )
+
+    assert [result.text for result in results] == [fake_bridge.config.transcript] * 4
+    assert fake_bridge.requests["stt_mux"] == 1
+    assert "stt" not in fake_bridge.requests
+    assert fake_bridge.peak_sessions == 4
+    assert sorted(fake_bridge.completed_streams) == [16000, 19200, 22400, 25600]
+    mux = hass.data[DOMAIN][entry.entry_id].mux
+    assert mux.connects == 1
+    assert mux.sessions == 4
+
+
+async def test_multiplex_unsupported(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> None:
+    """Test a bridge without multiplexing gets a connection per utterance."""
+    entry = await _mux_entry(hass, fake_bridge)
+    provider = _provider(hass, entry)
+
+    for _ in range(2):
+        result = await provider.async_process_audio_stream(METADATA, _audio(0.5))
+        assert result.result == stt.SpeechResultState.SUCCESS
+
+    assert "stt_mux" not in fake_bridge.requests
+    assert fake_bridge.requests["stt"] == 2
+
+
+async def test_multiplex_refused(hass: HomeAssistant, fake_bridge: FakeBridge) -> None:
+    """Test a bridge refusing the upgrade is remembered and not tried again."""
+    fake_bridge.config.stt_multiplex = True
+    entry = await _mux_entry(hass, fake_bridge)
+    # E.g. a proxy in front of the bridge that doesn't know the endpoint
+    fake_bridge.config.stt_multiplex = False
+    provider = _provider(hass, entry)
+
+    for _ in range(2):
+        result = await provider.async_process_audio_stream(METADATA, _audio(0.5))
+        assert result.result == stt.SpeechResultState.SUCCESS
+
+    assert fake_bridge.requests["stt_mux"] == 1
+    assert fake_bridge.requests["stt"] == 2
+    data = hass.data[DOMAIN][entry.entry_id]
+    assert data.mux.unsupported
+
+    # The bridge comes back with multiplexing after an update
+    await data.health.async_refresh()
+    fake_bridge.config.stt_multiplex = True
+    await data.health.async_refresh()
+    assert not data.mux.unsupported
+    result = await provider.async_process_audio_stream(METADATA, _audio(0.5))
+    assert result.result == stt.SpeechResultState.SUCCESS
+    assert fake_bridge.requests["stt_mux"] == 2
+    assert fake_bridge.requests["stt"] == 2
+
+
+async def test_multiplex_refused_transiently(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> None:
+    """Test a bridge unavailable behind a proxy isn't remembered as refusing."""
+    fake_bridge.config.stt_multiplex = True
+    entry = await _mux_entry(hass, fake_bridge)
+    fake_bridge.config.stt_multiplex = False
+    fake_bridge.config.stt_mux_refusal = 503
+    provider = _provider(hass, entry)
+
+    for _ in range(2):
+        result = await provider.async_process_audio_stream(METADATA, _audio(0.5))
+        assert result.result == stt.SpeechResultState.SUCCESS
+
+    assert fake_bridge.requests["stt_mux"] == 2
+    assert not hass.data[DOMAIN][entry.entry_id].mux.unsupported
+
+
+class _SlowSocket:
+    """A WebSocket sending a message each time it is allowed to."""
+
+    def __init__(self) -> None:
+        """Initialize the socket."""
+        self.closed = False
+        self.broken = False
+        self.sent: list[str | bytes] = []
+        self.allowed = asyncio.Semaphore(0)
+        self.received: asyncio.Queue[aiohttp.WSMessage] = asyncio.Queue()
 
+    async def send_str(self, data: str) -> None:
+        await self._send(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._send(data)
+
+    async def _send(self, data: str | bytes) -> None:
+        await self.allowed.acquire()
+        if self.broken:
+            raise ConnectionResetError("Cannot write to closing transport")
+        self.sent.append(data)
+
+    async def receive(self) -> aiohttp.WSMessage:
+        return await self.received.get()
+
+    async def close(self) -> None:
+        self.closed = True
+        self.received.put_nowait(
+            aiohttp.WSMessage(aiohttp.WSMsgType.CLOSED, None, None)
+        )
+
+
+async def _send_frames(session: MuxSession, frames: int) -> None:
+    """Send frames of silence on a multiplexed session."""
+    for _ in range(frames):
+        await session.async_send_audio(memoryview(bytes(4)))
+
+
+async def test_multiplexed_sessions_take_turns(hass: HomeAssistant) -> None:
+    """Test a session sending fast neither queues much nor holds up the others."""
+    ws = _SlowSocket()
+    connection = MuxConnection(hass, ws, Backend("1.2.3.4", 8787), lambda _: None)
+    fast, slow = connection.async_open(), connection.async_open()
+
+    fast_sender = asyncio.create_task(_send_frames(fast, 50))
+    await asyncio.sleep(0.01)
+    # Nothing is sent yet, so the fast session waits with a full queue
+    assert not fast_sender.done()
+    assert fast.outbox.qsize() == SESSION_QUEUE_SIZE
+    slow_sender = asyncio.create_task(_send_frames(slow, 3))
+    await asyncio.sleep(0.01)
+    assert slow_sender.done()
+
+    for _ in range(8):
+        ws.allowed.release()
+    await asyncio.sleep(0.01)
+    senders = [int.from_bytes(message[:4]) for message in ws.sent]
+    # The fast session's first frame was already on its way
+    assert senders == [fast.id] + [fast.id, slow.id] * 3 + [fast.id]
+
+    fast_sender.cancel()
+    await connection.async_close()
+
+
+async def test_multiplexed_send_failure(hass: HomeAssistant) -> None:
+    """Test a failed send interrupts the running sessions, and only them."""
+    ws = _SlowSocket()
+    connection = MuxConnection(hass, ws, Backend("1.2.3.4", 8787), lambda _: None)
+    done, running = connection.async_open(), connection.async_open()
+    final = {"type": "final", "session": done.id, "text": "lights off"}
+    ws.received.put_nowait(
+        aiohttp.WSMessage(aiohttp.WSMsgType.TEXT, json.dumps(final), None)
+    )
+    assert (await done.events.get()).json() == final
+
+    sender = asyncio.create_task(_send_frames(running, 50))
+    await asyncio.sleep(0.01)
+    assert running.outbox.full()
+    ws.broken = True
+    ws.allowed.release()
+
+    # The sender waiting for room is woken up, and the reconnect can start
+    with pytest.raises(aiohttp.ClientConnectionResetError):
+        await asyncio.wait_for(sender, 1)
+    assert (await running.events.get()).type == aiohttp.WSMsgType.CLOSED
+    assert done.events.empty()
+    assert connection.closed
+
+
+async def test_multiplex_disabled_in_flight(
+    hass: HomeAssistant, fake_bridge: FakeBridge
+) -> None:
+    """Test turning multiplexing off lets the running utterance finish."""
+    fake_bridge.config.stt_multiplex = True
+    entry = await _mux_entry(hass, fake_bridge)
+    data = hass.data[DOMAIN][entry.entry_id]
+    provider = _provider(hass, entry)
+    gate = asyncio.Event()
+
+    async def audio():
+        async for chunk in _audio(0.5):
+            yield chunk
+        await gate.wait()
+        async for chunk in _audio(0.5):
+            yield chunk
+
+    mux = data.mux
+    task = asyncio.create_task(provider.async_process_audio_stream(METADATA, audio()))
+    while not mux.sessions:
+        await asyncio.sleep(0.01)
+    hass.config_entries.async_update_entry(
+        entry, options={**entry.options, CONF_STT_MULTIPLEX: False}
+    )
+    await hass.async_block_till_done()
+    assert data.mux is None
+    gate.set()
+
+    result = await task
+    assert result.result == stt.SpeechResultState.SUCCESS
+    assert fake_bridge.completed_streams == [32000]
+    result = await provider.async_process_audio_stream(METADATA, _audio(0.5))
     assert result.result == stt.SpeechResultState.SUCCESS
-    assert result.text == "This is a test"
+    assert fake_bridge.requests["stt_mux"] == 1
+    assert fake_bridge.requests["stt"] == 1
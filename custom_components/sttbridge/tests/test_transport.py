@@ -0,0 +1,75 @@
+"""Test the STT Bridge transport selector."""
+from unittest.mock import patch
+
+from custom_components.sttbridge.const import (
+    STT_TRANSPORTS,
+    TRANSPORT_AUTO,
+    TRANSPORT_HTTP,
+    TRANSPORT_WEBSOCKET,
+)
+from custom_components.sttbridge.transport import (
+    EXPLORE_EVERY,
+    TRANSPORT_COOLDOWN,
+    TransportSelector,
+)
+
+
+def test_unmeasured_transports_tried_first() -> None:
+    """Test WebSocket goes first until both transports are measured."""
+    selector = TransportSelector()
+
+    assert selector.order(STT_TRANSPORTS, TRANSPORT_AUTO) == [
+        TRANSPORT_WEBSOCKET,
+        TRANSPORT_HTTP,
+    ]
+    selector.record_success(TRANSPORT_WEBSOCKET, 0.3)
+    assert selector.order(STT_TRANSPORTS, TRANSPORT_AUTO)[0] == TRANSPORT_HTTP
+    selector.record_success(TRANSPORT_HTTP, 0.1)
+    assert selector.order(STT_TRANSPORTS, TRANSPORT_AUTO)[0] == TRANSPORT_HTTP
+
+
+def test_runner_up_explored() -> None:
+    """Test the slower transport goes first every EXPLORE_EVERY utterances."""
+    selector = TransportSelector()
+    selector.record_success(TRANSPORT_WEBSOCKET, 0.1)
+    selector.record_success(TRANSPORT_HTTP, 0.3)
+
+    firsts = [
+        selector.order(STT_TRANSPORTS, TRANSPORT_AUTO)[0]
+        for _ in range(EXPLORE_EVERY)
+    ]
+
+    assert firsts.count(TRANSPORT_HTTP) == 1
+    assert firsts[-1] == TRANSPORT_HTTP
+
+
+def test_failed_transport_goes_last() -> None:
+    """Test a transport that failed recently is only used as a fallback."""
+    selector = TransportSelector()
+    with patch("custom_components.sttbridge.transport.time.monotonic") as now:
+        now.return_value = 100.0
+        selector.record_failure(TRANSPORT_WEBSOCKET)
+
+        assert selector.order(STT_TRANSPORTS, TRANSPORT_AUTO) == [
+            TRANSPORT_HTTP,
+            TRANSPORT_WEBSOCKET,
+        ]
+        now.return_value = 100.0 + TRANSPORT_COOLDOWN
+        assert selector.order(STT_TRANSPORTS, TRANSPORT_AUTO)[0] == (
+            TRANSPORT_WEBSOCKET
+        )
+
+
+def test_capabilities_and_preference() -> None:
+    """Test unsupported transports are dropped and a preference goes first."""
+    selector = TransportSelector()
+
+    assert selector.order((TRANSPORT_HTTP,), TRANSPORT_AUTO) == [TRANSPORT_HTTP]
+    assert selector.order(STT_TRANSPORTS, TRANSPORT_HTTP) == [
+        TRANSPORT_HTTP,
+        TRANSPORT_WEBSOCKET,
+    ]
+    assert selector.order((TRANSPORT_WEBSOCKET,), TRANSPORT_HTTP) == [
+        TRANSPORT_WEBSOCKET
+    ]
+    assert selector.as_dict()["http"]["selected"] == 2
@@ -1,12 +1,34 @@
 """Test the STT Bridge TTS platform."""
+import asyncio
 from unittest.mock import patch
 
 import pytest
+from homeassistant.components.tts import TTSAudioRequest
 from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from custom_components.sttbridge.const import DOMAIN
+from custom_components.sttbridge.const import (
+    CONF_SEGMENT_LENGTH,
+    CONF_TTS_SAMPLE_RATE,
+    DOMAIN,
+)
+from custom_components.sttbridge.text import (
+    split_message,
+    split_segments,
+    split_sentences,
+)
+from custom_components.sttbridge.tts import STTBridgeProvider
+from custom_components.sttbridge.wav import (
+    WAVE_FORMAT_PCM,
+    WavError,
+    WavFormat,
+    build_wav_header,
+    concat_wavs,
+    parse_wav,
+)
 
 from .conftest import mock_config_entry  # Import the fixture
+from .fake_bridge import FakeBridge
 
 MOCK_CONFIG = {
     "host": "1.2.3.4",
@@ -14,29 +36,187 @@ MOCK_CONFIG = {
     "token": "test-token",
 }
 
-async def test_get_tts_audio(hass: HomeAssistant, aioclient_mock) -> None:
+async def test_get_tts_audio(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
     """Test getting TTS audio."""
-    entry = mock_config_entry()
-    entry.add_to_hass(hass)
-    await hass.config_entries.async_setup(entry.entry_id)
+    provider = STTBridgeProvider(
+        hass, hass.data[DOMAIN][fake_bridge_entry.entry_id], fake_bridge_entry
+    )
+
+    extension, data = await provider.async_get_tts_audio("Hello", "en-US", {})
+
+    assert extension == "wav"
+    fmt, _ = parse_wav(data)
+    assert fmt == fake_bridge.config.tts_format
+
+
+def _wav(pcm: bytes, sample_rate: int = 22050) -> bytes:
+    """Build a mono 16-bit WAV file around pcm."""
+    fmt = WavFormat(WAVE_FORMAT_PCM, 1, sample_rate, 16)
+    return build_wav_header(fmt, len(pcm)) + pcm
+
+
+def test_split_sentences() -> None:
+    """Test splitting text into sentences, merging very short ones."""
+    assert split_sentences(
+        "Ok. The front door is open! Please close it before you leave the house."
+    ) == [
+        "Ok. The front door is open!",
+        "Please close it before you leave the house.",
+    ]
+    assert split_sentences("") == []
+
+
+def test_split_segments() -> None:
+    """Test grouping sentences into segments and splitting long sentences."""
+    text = (
+        "The washing machine is done. The dryer needs another ten minutes. "
+        "Tomorrow it will rain, so take an umbrella, and the bins go out tonight."
+    )
+    assert split_segments(text, 70) == [
+        "The washing machine is done. The dryer needs another ten minutes.",
+        "Tomorrow it will rain, so take an umbrella,",
+        "and the bins go out tonight.",
+    ]
+    assert split_segments("one two three four five", 10) == [
+        "one two",
+        "three four",
+        "five",
+    ]
+    assert split_segments("Short.", 300) == ["Short."]
+
+
+def test_split_message() -> None:
+    """Test complete messages are split like streamed ones, sentence by sentence."""
+    text = (
+        "The washing machine is done. The dryer needs another ten minutes. "
+        "Tomorrow it will rain, so take an umbrella, and the bins go out tonight."
+    )
+    assert split_message(text, 70) == [
+        "The washing machine is done.",
+        "The dryer needs another ten minutes.",
+        "Tomorrow it will rain, so take an umbrella,",
+        "and the bins go out tonight.",
+    ]
+
+
+def test_concat_wavs() -> None:
+    """Test joining WAV files into one, dropping partial frames."""
+    joined = concat_wavs([_wav(b"\x01\x00" * 3), _wav(b"\x02\x00" * 2 + b"\x03")])
+    fmt, pcm = parse_wav(joined)
+    assert fmt.sample_rate == 22050
+    assert bytes(pcm) == b"\x01\x00" * 3 + b"\x02\x00" * 2
+
+    with pytest.raises(WavError):
+        concat_wavs([_wav(b"\x00\x00"), _wav(b"\x00\x00", sample_rate=16000)])
+    with pytest.raises(WavError):
+        concat_wavs([])
+
+
+async def test_stream_tts_audio(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test streaming TTS audio yields one header and the PCM of each sentence."""
+    provider = STTBridgeProvider(
+        hass, hass.data[DOMAIN][fake_bridge_entry.entry_id], fake_bridge_entry
+    )
+
+    async def message_gen():
+        yield "This is the first sentence. This is "
+        yield "the second sentence! And a third one without punctuation"
+
+    response = await provider.async_stream_tts_audio(
+        TTSAudioRequest("en-US", {}, message_gen())
+    )
+    chunks = [chunk async for chunk in response.data_gen]
+
+    assert response.extension == "wav"
+    assert fake_bridge.requests["tts"] == 3
+    assert len(chunks) == 4
+    fmt, _ = parse_wav(chunks[0])
+    assert fmt.sample_rate == 22050
+    assert all(len(chunk) % fmt.block_align == 0 for chunk in chunks[1:])
+
+
+async def _speak(
+    provider: STTBridgeProvider, message: str
+) -> tuple[WavFormat, bytes]:
+    """Stream a complete message like tts.speak does, return format and PCM."""
+
+    async def message_gen():
+        yield message
+
+    response = await provider.async_stream_tts_audio(
+        TTSAudioRequest("en-US", {}, message_gen())
+    )
+    chunks = [chunk async for chunk in response.data_gen]
+    return parse_wav(chunks[0])[0], b"".join(chunks[1:])
+
+
+async def test_identical_requests_synthesized_once(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test concurrent identical requests share one synthesis."""
+    fake_bridge.config.tts_latency = 0.05
+    provider = STTBridgeProvider(
+        hass, hass.data[DOMAIN][fake_bridge_entry.entry_id], fake_bridge_entry
+    )
+
+    results = await asyncio.gather(
+        *(_speak(provider, "Dinner is ready") for _ in range(8))
+    )
+
+    assert fake_bridge.requests["tts"] == 1
+    assert all(pcm == results[0][1] for _, pcm in results)
+
+
+async def test_long_sentence_synthesized_in_segments(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test a sentence over the segment length is synthesized in parts."""
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry, options={CONF_SEGMENT_LENGTH: 60}
+    )
     await hass.async_block_till_done()
+    provider = STTBridgeProvider(
+        hass, hass.data[DOMAIN][fake_bridge_entry.entry_id], fake_bridge_entry
+    )
+    message = (
+        "The washing machine has finished its cycle, "
+        "so please empty it before the laundry starts to smell."
+    )
+
+    fmt, pcm = await _speak(provider, message)
+
+    assert fake_bridge.requests["tts"] == 2
+    assert fmt == fake_bridge.config.tts_format
+    assert len(pcm) % fmt.block_align == 0
+
+
+async def test_post_processed_audio_cached(
+    hass: HomeAssistant, fake_bridge: FakeBridge, fake_bridge_entry: MockConfigEntry
+) -> None:
+    """Test audio is converted once and the converted audio is cached."""
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry, options={CONF_TTS_SAMPLE_RATE: 16000}
+    )
+    await hass.async_block_till_done()
+    provider = STTBridgeProvider(
+        hass, hass.data[DOMAIN][fake_bridge_entry.entry_id], fake_bridge_entry
+    )
 
-    aioclient_mock.post(
-        f"http://{MOCK_CONFIG['host']}:{MOCK_CONFIG['port']}/tts",
-        content=b"fake_wav_data",
-        headers={"Content-Type": "audio/wav"},
-    )
-
-    response = await hass.services.async_call(
-        "tts",
-        "speak",
-        {
-            "entity_id": "tts.stt_bridge",
-            "message": "Hello",
-            "language": "en-US",
-        },
-        blocking=True,
-        return_response=True,
-    )
-    
-    assert response
+    for _ in range(2):
+        fmt, pcm = await _speak(provider, "Hello")
+        assert fmt == WavFormat(WAVE_FORMAT_PCM, 1, 16000, 16)
+    assert fake_bridge.requests["tts"] == 1
+    assert abs(len(pcm) // 2 - 5 * 60 * 16) <= 2
+
+    # Other settings are another variant
+    hass.config_entries.async_update_entry(
+        fake_bridge_entry, options={CONF_TTS_SAMPLE_RATE: 8000}
+    )
+    await hass.async_block_till_done()
+    fmt, _ = await _speak(provider, "Hello")
+    assert fmt.sample_rate == 8000
+    assert fake_bridge.requests["tts"] == 2
@@ -0,0 +1,61 @@
+"""Test the STT Bridge voice activity detector."""
+import numpy as np
+
+from custom_components.sttbridge.vad import PRE_ROLL_MS, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+
+def _tone(seconds: float, amplitude: int = 8000) -> np.ndarray:
+    """Return a 220 Hz tone standing in for voiced speech."""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype("<i2")
+
+
+def _noise(seconds: float, amplitude: float = 30) -> np.ndarray:
+    """Return quiet background noise."""
+    rng = np.random.default_rng(0)
+    return rng.normal(0, amplitude, int(SAMPLE_RATE * seconds)).astype("<i2")
+
+
+def _feed(vad: VoiceActivityDetector, audio: bytes, chunk_size: int = 1234) -> bytes:
+    """Feed audio in odd sized chunks and collect the output."""
+    sent = b""
+    for offset in range(0, len(audio), chunk_size):
+        sent += vad.process(audio[offset : offset + chunk_size])
+        if vad.ended:
+            break
+    return sent
+
+
+def test_trims_leading_silence_and_detects_end() -> None:
+    """Test leading silence is dropped and trailing silence ends the stream."""
+    audio = np.concatenate([_noise(1.0), _tone(1.0), _noise(2.0)]).tobytes()
+    vad = VoiceActivityDetector(SAMPLE_RATE, trailing_silence_ms=500)
+
+    sent = _feed(vad, audio)
+
+    assert vad.speech_started
+    assert vad.ended
+    seconds = len(sent) / 2 / SAMPLE_RATE
+    # pre-roll + speech + trailing silence, give or take a frame
+    expected = PRE_ROLL_MS / 1000 + 1.0 + 0.5
+    assert abs(seconds - expected) < 0.05
+    assert vad.process(b"\x00" * 640) == b""
+
+
+def test_silence_only() -> None:
+    """Test nothing is sent while there is no speech."""
+    vad = VoiceActivityDetector(SAMPLE_RATE)
+
+    assert _feed(vad, _noise(2.0).tobytes()) == b""
+    assert not vad.speech_started
+    assert not vad.ended
+
+
+def test_hiss_is_not_speech() -> None:
+    """Test loud broadband noise with a high zero crossing rate is ignored."""
+    vad = VoiceActivityDetector(SAMPLE_RATE, threshold_db=-45)
+    hiss = _noise(1.0, amplitude=400).tobytes()
+
+    assert _feed(vad, hiss) == b""
@@ -0,0 +1,85 @@
+"""Test the STT Bridge voice catalog."""
+import asyncio
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.sttbridge.const import DEFAULT_LANGUAGES
+from custom_components.sttbridge.pool import Backend, BackendPool
+from custom_components.sttbridge.voices import VoiceCatalog
+
+BASE_URL = "http://1.2.3.4:8787"
+
+VOICES = {
+    "voices": [
+        {"identifier": "com.apple.voice.Anna", "name": "Anna", "language": "de-DE"},
+        {"identifier": "com.apple.voice.Ava", "name": "Ava", "language": "en_US"},
+        {"identifier": "com.apple.voice.Zoe", "name": "Zoe", "language": "en-US"},
+    ]
+}
+
+
+async def test_catalog_index(hass: HomeAssistant, aioclient_mock) -> None:
+    """Test the catalog indexes voices by language and vice versa."""
+    aioclient_mock.get(f"{BASE_URL}/voices", json=VOICES)
+    catalog = VoiceCatalog(
+        hass, async_get_clientsession(hass), BackendPool([Backend("1.2.3.4", 8787)]), None
+    )
+    assert catalog.languages == DEFAULT_LANGUAGES
+    assert not catalog.loaded
+
+    await catalog.async_refresh()
+
+    assert catalog.loaded
+    assert catalog.languages == ["de-DE", "en-US"]
+    assert [voice.name for voice in catalog.voices_for_language("en-US")] == [
+        "Ava",
+        "Zoe",
+    ]
+    assert catalog.language_for_voice("com.apple.voice.Anna") == "de-DE"
+    assert catalog.voices_for_language("fr-FR") is None
+
+
+async def test_catalog_revalidation(hass: HomeAssistant, aioclient_mock) -> None:
+    """Test the catalog keeps its index when the bridge answers 304."""
+    aioclient_mock.get(f"{BASE_URL}/voices", json=VOICES, headers={"ETag": '"v1"'})
+    catalog = VoiceCatalog(
+        hass, async_get_clientsession(hass), BackendPool([Backend("1.2.3.4", 8787)]), None
+    )
+    await catalog.async_refresh()
+    assert catalog.version == '"v1"'
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(f"{BASE_URL}/voices", status=304)
+    await catalog.async_refresh()
+
+    assert aioclient_mock.mock_calls[0][3]["If-None-Match"] == '"v1"'
+    assert catalog.version == '"v1"'
+    assert catalog.languages == ["de-DE", "en-US"]
+
+
+async def test_stop_cancels_initial_refresh(
+    hass: HomeAssistant, aioclient_mock
+) -> None:
+    """Test stopping the catalog doesn't leave its first fetch running."""
+    fetching = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow_voices(method, url, data):
+        fetching.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    aioclient_mock.get(f"{BASE_URL}/voices", side_effect=slow_voices)
+    catalog = VoiceCatalog(
+        hass, async_get_clientsession(hass), BackendPool([Backend("1.2.3.4", 8787)]), None
+    )
+    catalog.async_start()
+    await fetching.wait()
+    catalog.async_stop()
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert not catalog.loaded
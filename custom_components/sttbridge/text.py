@@ -0,0 +1,140 @@
+"""Text helpers for STT Bridge."""
+from __future__ import annotations
+
+from collections.abc import AsyncIterable, AsyncIterator
+import re
+
+# A sentence ends at terminal punctuation (optionally followed by closing
+# quotes/brackets) and whitespace, or at a blank line.
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"'»”)\]]*\s+|\n\s*\n")
+
+# Clause boundaries used to split sentences that are too long on their own
+_CLAUSE_END = re.compile(r"(?<=[,;:—–])\s+")
+
+# Sentences shorter than this are merged with the next one so we don't fire
+# a separate synthesis request for "Ok." or "Hi!".
+MIN_SENTENCE_LENGTH = 20
+
+
+def split_sentences(text: str, min_length: int = MIN_SENTENCE_LENGTH) -> list[str]:
+    """Split text into sentences suitable for separate synthesis."""
+    splitter = SentenceSplitter(min_length)
+    sentences = splitter.feed(text)
+    if tail := splitter.flush():
+        sentences.append(tail)
+    return sentences
+
+
+def split_segments(text: str, max_length: int) -> list[str]:
+    """Split text into segments of up to about max_length characters.
+
+    Whole sentences are grouped together; a sentence longer than max_length
+    is split at clause boundaries, and failing that between words.
+    """
+    segments: list[str] = []
+    current = ""
+    for sentence in split_sentences(text):
+        for part in _split_long(sentence, max_length):
+            if current and len(current) + 1 + len(part) > max_length:
+                segments.append(current)
+                current = part
+            else:
+                current = f"{current} {part}" if current else part
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _split_long(sentence: str, max_length: int) -> list[str]:
+    """Split a sentence into parts no longer than max_length if possible."""
+    if len(sentence) <= max_length:
+        return [sentence]
+    parts: list[str] = []
+    for clause in _CLAUSE_END.split(sentence):
+        if len(clause) <= max_length:
+            parts.append(clause)
+            continue
+        words = clause.split()
+        line = ""
+        for word in words:
+            if line and len(line) + 1 + len(word) > max_length:
+                parts.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        if line:
+            parts.append(line)
+    return parts
+
+
+class SentenceSplitter:
+    """Incrementally split a stream of text chunks into sentences."""
+
+    def __init__(self, min_length: int = MIN_SENTENCE_LENGTH) -> None:
+        """Initialize the splitter."""
+        self._min_length = min_length
+        self._buffer = ""
+        self._pending = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        """Add a chunk of text and return all sentences completed by it."""
+        self._buffer += chunk
+        sentences: list[str] = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start : match.end()]
+            start = match.end()
+            self._pending += sentence
+            if len(self._pending.strip()) >= self._min_length:
+                sentences.append(self._pending.strip())
+                self._pending = ""
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> str | None:
+        """Return whatever text is left once the input has ended."""
+        tail = (self._pending + self._buffer).strip()
+        self._pending = ""
+        self._buffer = ""
+        return tail or None
+
+
+async def async_iter_sentences(
+    chunks: AsyncIterable[str], min_length: int = MIN_SENTENCE_LENGTH
+) -> AsyncIterator[str]:
+    """Yield sentences from an async stream of text chunks as they complete."""
+    splitter = SentenceSplitter(min_length)
+    async for chunk in chunks:
+        for sentence in splitter.feed(chunk):
+            yield sentence
+    if tail := splitter.flush():
+        yield tail
+
+
+async def async_iter_segments(
+    chunks: AsyncIterable[str], max_length: int
+) -> AsyncIterator[str]:
+    """Yield the pieces to synthesize from an async stream of text chunks.
+
+    These are the sentences as they complete, with sentences longer than
+    max_length split like split_segments does.
+    """
+    async for sentence in async_iter_sentences(chunks):
+        for segment in _split_sentence(sentence, max_length):
+            yield segment
+
+
+def split_message(text: str, max_length: int) -> list[str]:
+    """Return the pieces async_iter_segments yields for a complete text."""
+    return [
+        segment
+        for sentence in split_sentences(text)
+        for segment in _split_sentence(sentence, max_length)
+    ]
+
+
+def _split_sentence(sentence: str, max_length: int) -> list[str]:
+    """Split a sentence longer than max_length into segments."""
+    if len(sentence) <= max_length:
+        return [sentence]
+    return split_segments(sentence, max_length)
@@ -0,0 +1,98 @@
+"""STT transport selection for STT Bridge."""
+from __future__ import annotations
+
+from collections import Counter
+import time
+from typing import Any
+
+from .const import STT_TRANSPORTS, TRANSPORT_AUTO
+from .pool import EWMA_ALPHA
+
+# A transport that failed within this many seconds is only used as a fallback
+TRANSPORT_COOLDOWN = 60.0
+# Every this many utterances the runner-up transport goes first, so its
+# latency estimate doesn't go stale
+EXPLORE_EVERY = 20
+
+
+class TransportSelector:
+    """Pick the STT transport for an utterance.
+
+    Transports the bridge doesn't advertise are never used. Of the others,
+    one that failed recently goes last, and otherwise the one that returned
+    transcripts faster after the end of the audio goes first. Unmeasured
+    transports are tried early so both get measured; ties keep the order of
+    STT_TRANSPORTS, i.e. WebSocket first.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the selector."""
+        self.latency: dict[str, float] = {}
+        self.last_failure: dict[str, float] = {}
+        self.selected: Counter[str] = Counter()
+        self.failures: Counter[str] = Counter()
+        self.fallbacks = 0
+        self.reconnects = 0
+        self._utterances = 0
+
+    def order(self, supported: tuple[str, ...], preferred: str) -> list[str]:
+        """Return the transports to try for an utterance, best first."""
+        transports = [t for t in STT_TRANSPORTS if t in supported]
+        self._utterances += 1
+        if preferred != TRANSPORT_AUTO:
+            if preferred in transports:
+                transports.remove(preferred)
+                transports.insert(0, preferred)
+        else:
+
+            def score(transport: str) -> tuple[bool, float]:
+                return (
+                    self._recently_failed(transport),
+                    self.latency.get(transport, 0.0),
+                )
+
+            transports.sort(key=score)
+            if (
+                len(transports) > 1
+                and self._utterances % EXPLORE_EVERY == 0
+                and not self._recently_failed(transports[1])
+            ):
+                transports[0], transports[1] = transports[1], transports[0]
+        if transports:
+            self.selected[transports[0]] += 1
+        return transports
+
+    def record_success(self, transport: str, latency: float | None) -> None:
+        """Record the time from the end of the audio to the transcript."""
+        self.last_failure.pop(transport, None)
+        if latency is None:
+            return
+        if (current := self.latency.get(transport)) is None:
+            self.latency[transport] = latency
+        else:
+            self.latency[transport] = current + EWMA_ALPHA * (latency - current)
+
+    def record_failure(self, transport: str) -> None:
+        """Record a transport that was rejected or broke down."""
+        self.failures[transport] += 1
+        self.last_failure[transport] = time.monotonic()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the selector state for diagnostics."""
+        return {
+            transport: {
+                "selected": self.selected[transport],
+                "failures": self.failures[transport],
+                "recently_failed": self._recently_failed(transport),
+                "latency_ms": round(latency * 1000, 1)
+                if (latency := self.latency.get(transport)) is not None
+                else None,
+            }
+            for transport in STT_TRANSPORTS
+        } | {"fallbacks": self.fallbacks, "reconnects": self.reconnects}
+
+    def _recently_failed(self, transport: str) -> bool:
+        """Return if a transport failed within the cooldown."""
+        return (
+            failed := self.last_failure.get(transport)
+        ) is not None and time.monotonic() - failed < TRANSPORT_COOLDOWN
@@ -1,17 +1,51 @@
 """TTS platform for STT Bridge."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncGenerator
 import logging
+import time
 from typing import Any
 
 import aiohttp
-from homeassistant.components.tts import TextToSpeechEntity, TtsAudioType
+from homeassistant.components.tts import (
+    TextToSpeechEntity,
+    TTSAudioRequest,
+    TTSAudioResponse,
+    TtsAudioType,
+    Voice,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
+from .cache import make_cache_key
+from .const import (
+    CONF_DEFAULT_LANGUAGE,
+    CONF_PREWARM_RATE,
+    CONF_SEGMENT_LENGTH,
+    CONF_STREAM_CONCURRENCY,
+    CONF_TIMEOUT_CONNECT,
+    CONF_TIMEOUT_FIRST_BYTE,
+    CONF_TIMEOUT_TOTAL,
+    DEFAULT_LANGUAGE,
+    DEFAULT_PREWARM_RATE,
+    DEFAULT_SEGMENT_LENGTH,
+    DEFAULT_STREAM_CONCURRENCY,
+    DEFAULT_TIMEOUT_CONNECT,
+    DEFAULT_TIMEOUT_FIRST_BYTE,
+    DEFAULT_TIMEOUT_TOTAL,
+    DOMAIN,
+)
+from .exceptions import STTBridgeError
+from .models import STTBridgeData
+from .pool import Backend
+from .postprocess import PostProcessing, process_wav
+from .prewarm import PrewarmWorker
+from .scheduler import REQUEST_BACKGROUND, REQUEST_TTS
+from .text import async_iter_segments, split_message
+from .wav import WavError, WavFormat, build_wav_header, concat_wavs, parse_wav
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,13 +56,20 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up STT Bridge TTS platform."""
-    data = hass.data[DOMAIN][config_entry.entry_id]
-    host = data["host"]
-    port = data["port"]
-    token = data.get("token")
-    base_url = f"http://{host}:{port}"
+    data: STTBridgeData = hass.data[DOMAIN][config_entry.entry_id]
+    provider = STTBridgeProvider(hass, data, config_entry)
 
-    async_add_entities([STTBridgeProvider(hass, base_url, token, config_entry)])
+    data.prewarm = PrewarmWorker(
+        hass,
+        config_entry.entry_id,
+        data.pool,
+        provider.async_prewarm,
+        config_entry.options.get(CONF_PREWARM_RATE, DEFAULT_PREWARM_RATE),
+    )
+    await data.prewarm.async_start()
+    config_entry.async_on_unload(data.prewarm.async_stop)
+
+    async_add_entities([provider])
 
 
 class STTBridgeProvider(TextToSpeechEntity):
@@ -37,14 +78,13 @@ class STTBridgeProvider(TextToSpeechEntity):
     def __init__(
         self,
         hass: HomeAssistant,
-        base_url: str,
-        token: str | None,
+        data: STTBridgeData,
         config_entry: ConfigEntry,
     ) -> None:
         """Initialize the provider."""
         self.hass = hass
-        self._base_url = base_url
-        self._token = token
+        self._data = data
+        self._token = data.token
         self._config_entry = config_entry
         self._attr_name = "STT/TTS Bridge TTS"
         self._attr_unique_id = f"{config_entry.entry_id}_tts"
@@ -52,25 +92,240 @@ class STTBridgeProvider(TextToSpeechEntity):
     @property
     def default_language(self) -> str:
         """Return the default language."""
-        # TODO: Make configurable in options flow
-        return "de-DE"
+        return self._config_entry.options.get(CONF_DEFAULT_LANGUAGE, DEFAULT_LANGUAGE)
 
     @property
     def supported_languages(self) -> list[str]:
         """Return list of supported languages."""
-        # TODO: Get from /voices endpoint
-        return ["de-DE", "en-US"]
+        return self._data.voices.languages
 
     @property
     def supported_options(self) -> list[str]:
         """Return list of supported options like voice, speed."""
         return ["voice", "rate", "pitch"]
 
+    @callback
+    def async_get_supported_voices(self, language: str) -> list[Voice] | None:
+        """Return the voices the bridge offers for a language."""
+        return self._data.voices.voices_for_language(language)
+
     async def async_get_tts_audio(
         self, message: str, language: str, options: dict[str, Any] | None = None
     ) -> TtsAudioType:
-        """Load TTS audio."""
-        session = async_get_clientsession(self.hass)
+        """Load TTS audio.
+
+        HA streams through async_stream_tts_audio; this serves other callers,
+        split and cached the same way.
+        """
+        segments = split_message(message, self._segment_length()) or [message]
+        try:
+            if len(segments) > 1:
+                data = await self._async_get_segmented_audio(
+                    segments, language, options
+                )
+            else:
+                data = await self._async_get_audio(segments[0], language, options)
+        except HomeAssistantError as e:
+            _LOGGER.error("%s", e)
+            return (None, None)
+        return ("wav", data)
+
+    async def _async_get_segmented_audio(
+        self, segments: list[str], language: str, options: dict[str, Any] | None
+    ) -> bytes:
+        """Synthesize segments concurrently and join them into one WAV file."""
+        slots = asyncio.Semaphore(
+            self._config_entry.options.get(
+                CONF_STREAM_CONCURRENCY, DEFAULT_STREAM_CONCURRENCY
+            )
+        )
+
+        async def synthesize(segment: str) -> bytes:
+            async with slots:
+                return await self._async_get_audio(segment, language, options)
+
+        _LOGGER.debug("Synthesizing %d segments", len(segments))
+        tasks = [
+            self.hass.async_create_task(
+                synthesize(segment), f"{DOMAIN} TTS segment", eager_start=False
+            )
+            for segment in segments
+        ]
+        try:
+            files = await asyncio.gather(*tasks)
+        finally:
+            # Stop the remaining segments if one of them failed
+            for task in tasks:
+                task.cancel()
+        try:
+            return concat_wavs(files)
+        except WavError as e:
+            raise HomeAssistantError(f"Invalid audio from STT Bridge: {e}") from e
+
+    async def async_stream_tts_audio(
+        self, request: TTSAudioRequest
+    ) -> TTSAudioResponse:
+        """Stream TTS audio, synthesizing the message sentence by sentence."""
+        return TTSAudioResponse("wav", self._async_stream_sentences(request))
+
+    async def _async_stream_sentences(
+        self, request: TTSAudioRequest
+    ) -> AsyncGenerator[bytes]:
+        """Yield one WAV header followed by the PCM frames of each sentence.
+
+        Sentences are requested from the bridge as soon as they are complete,
+        up to ``stream_concurrency`` ahead of the one currently being played,
+        and yielded strictly in order. Sentences longer than
+        ``segment_length`` are synthesized in parts.
+        """
+        concurrency = self._config_entry.options.get(
+            CONF_STREAM_CONCURRENCY, DEFAULT_STREAM_CONCURRENCY
+        )
+        # A slot is held from the moment a sentence is requested until its
+        # audio has been yielded, which bounds both requests and buffered audio.
+        slots = asyncio.Semaphore(concurrency)
+        queue: asyncio.Queue[asyncio.Task[bytes] | None] = asyncio.Queue()
+
+        async def produce() -> None:
+            try:
+                async for sentence in async_iter_segments(
+                    request.message_gen, self._segment_length()
+                ):
+                    await slots.acquire()
+                    queue.put_nowait(
+                        asyncio.create_task(
+                            self._async_get_audio(
+                                sentence, request.language, request.options
+                            )
+                        )
+                    )
+            finally:
+                queue.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        stream_format: WavFormat | None = None
+        try:
+            while (task := await queue.get()) is not None:
+                data = await task
+                try:
+                    fmt, pcm = parse_wav(data)
+                except WavError as err:
+                    raise HomeAssistantError(
+                        f"Invalid audio from STT Bridge: {err}"
+                    ) from err
+                if stream_format is None:
+                    stream_format = fmt
+                    yield build_wav_header(fmt)
+                elif fmt != stream_format:
+                    raise HomeAssistantError(
+                        f"STT Bridge returned mixed audio formats: {stream_format} and {fmt}"
+                    )
+                yield bytes(pcm)
+                slots.release()
+            # Surface errors from the incoming message stream
+            await producer
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                if (task := queue.get_nowait()) is not None:
+                    task.cancel()
+
+    async def async_prewarm(
+        self, message: str, language: str, options: dict[str, Any] | None
+    ) -> bool:
+        """Synthesize message into the cache as a background request.
+
+        The message is cached in the pieces playback streams it in, so
+        playing it needs no synthesis. Returns False if everything was cached
+        already.
+        """
+        segments = split_message(message, self._segment_length())
+        processing = PostProcessing.from_options(self._config_entry.options)
+        missing = [
+            segment
+            for segment in segments
+            if not self._data.tts_cache.contains(
+                self._cache_key(segment, language, options, processing)
+            )
+        ]
+        for segment in missing:
+            await self._async_get_audio(
+                segment, language, options, REQUEST_BACKGROUND
+            )
+        return bool(missing)
+
+    def _segment_length(self) -> int:
+        """Return the length above which a sentence is synthesized in parts."""
+        return self._config_entry.options.get(
+            CONF_SEGMENT_LENGTH, DEFAULT_SEGMENT_LENGTH
+        )
+
+    def _cache_key(
+        self,
+        message: str,
+        language: str,
+        options: dict[str, Any] | None,
+        processing: PostProcessing,
+    ) -> str:
+        """Return the cache key of a message."""
+        return make_cache_key(
+            message,
+            language,
+            options,
+            self._data.voices.version,
+            processing.variant,
+        )
+
+    async def _async_get_audio(
+        self,
+        message: str,
+        language: str,
+        options: dict[str, Any] | None,
+        request_class: str = REQUEST_TTS,
+    ) -> bytes:
+        """Return a WAV file for message from the cache or the bridge.
+
+        The audio is post-processed before it is cached, so that is done
+        once per phrase.
+        """
+        cache = self._data.tts_cache
+        processing = PostProcessing.from_options(self._config_entry.options)
+        key = self._cache_key(message, language, options, processing)
+        if (data := await cache.async_get(key)) is not None:
+            return data
+
+        async def synthesize() -> bytes:
+            data = await self._async_synthesize(
+                message, language, options, request_class
+            )
+            if processing.variant is not None:
+                try:
+                    data = await self.hass.async_add_executor_job(
+                        process_wav, data, processing
+                    )
+                except WavError as e:
+                    raise HomeAssistantError(
+                        f"Invalid audio from STT Bridge: {e}"
+                    ) from e
+            cache.async_put(key, data)
+            return data
+
+        # Identical concurrent requests (e.g. one announcement on several
+        # speakers) share a single synthesis. Only requests of the same class
+        # do, so an announcement doesn't wait behind a pre-warm's priority.
+        return await self._data.tts_flights.async_run(
+            f"{key}:{request_class}", synthesize
+        )
+
+    async def _async_synthesize(
+        self,
+        message: str,
+        language: str,
+        options: dict[str, Any] | None,
+        request_class: str = REQUEST_TTS,
+    ) -> bytes:
+        """Request a WAV file for message from the least loaded bridge server."""
+        session = self._data.session
         payload = {"text": message, "language": language}
         if options:
             payload.update(options)
@@ -79,19 +334,47 @@ class STTBridgeProvider(TextToSpeechEntity):
         if self._token:
             headers["Authorization"] = f"Bearer {self._token}"
 
-        try:
+        options = self._config_entry.options
+        timeout = aiohttp.ClientTimeout(
+            total=options.get(CONF_TIMEOUT_TOTAL, DEFAULT_TIMEOUT_TOTAL),
+            sock_connect=options.get(CONF_TIMEOUT_CONNECT, DEFAULT_TIMEOUT_CONNECT),
+            sock_read=options.get(CONF_TIMEOUT_FIRST_BYTE, DEFAULT_TIMEOUT_FIRST_BYTE),
+        )
+        timer = self._data.metrics.tts.start()
+        timer.sent(len(message.encode()))
+
+        async def synthesize(backend: Backend) -> bytes:
+            start = time.monotonic()
             async with session.post(
-                f"{self._base_url}/tts", json=payload, headers=headers
+                f"{backend.base_url}/tts",
+                json=payload,
+                headers=headers,
+                timeout=timeout,
             ) as resp:
+                timer.mark("first_byte")
                 if resp.status != 200:
-                    _LOGGER.error(
-                        "Error getting TTS audio: %s - %s",
-                        resp.status,
-                        await resp.text(),
+                    timer.error(f"http_{resp.status}")
+                    raise HomeAssistantError(
+                        f"Error getting TTS audio: {resp.status} - {await resp.text()}"
                     )
-                    return (None, None)
+                backend.record_latency(time.monotonic() - start)
                 data = await resp.read()
-                return ("wav", data)
+            timer.received(len(data))
+            timer.mark("total")
+            return data
+
+        try:
+            return await self._data.pool.async_run(
+                synthesize, request_class, timeout.total
+            )
+        except STTBridgeError as e:
+            timer.error(e)
+            raise
         except aiohttp.ClientError as e:
-            _LOGGER.error("Error communicating with STT Bridge for TTS: %s", e)
-            return (None, None)
+            timer.error(e)
+            raise HomeAssistantError(
+                f"Error communicating with STT Bridge for TTS: {e}"
+            ) from e
+        except TimeoutError as e:
+            timer.error(e)
+            raise HomeAssistantError("Timeout waiting for STT Bridge TTS audio") from e
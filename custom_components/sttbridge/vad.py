@@ -0,0 +1,121 @@
+"""Voice activity detection for STT Bridge."""
+from __future__ import annotations
+
+import numpy as np
+
+FRAME_MS = 20
+# Audio kept from before the detected onset so the first phoneme isn't clipped
+PRE_ROLL_MS = 300
+# Consecutive speech frames required before speech counts as started
+MIN_SPEECH_FRAMES = 3
+# Speech is mostly voiced and has a low zero crossing rate; frames above
+# this rate only count as speech when they are clearly louder than the
+# threshold (fricatives), which keeps hiss and fan noise out.
+MAX_ZERO_CROSSING_RATE = 0.25
+LOUD_MARGIN_DB = 15.0
+
+
+def _run_lengths(flags: np.ndarray, carry: int) -> np.ndarray:
+    """Return, for each position, the length of the run of True ending there.
+
+    carry is the length of the run of True at the end of the previous block.
+    """
+    index = np.arange(1, len(flags) + 1)
+    resets = np.where(flags, 0, index)
+    np.maximum.accumulate(resets, out=resets)
+    runs = index - resets
+    # Runs that reach back to the start of the block continue the carried run
+    runs[resets == 0] += carry
+    return runs
+
+
+class VoiceActivityDetector:
+    """Trim leading silence and detect the end of speech in 16-bit mono PCM.
+
+    Frames are classified with vectorized energy and zero crossing analysis.
+    Audio before the onset is held back (apart from a short pre-roll), and
+    ``ended`` becomes True once speech has been followed by
+    ``trailing_silence_ms`` of silence.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        threshold_db: float = -45.0,
+        trailing_silence_ms: int = 800,
+        frame_ms: int = FRAME_MS,
+    ) -> None:
+        """Initialize the detector."""
+        self.threshold_db = threshold_db
+        self._frame_samples = sample_rate * frame_ms // 1000
+        self._frame_bytes = self._frame_samples * 2
+        self._trailing_frames = max(1, trailing_silence_ms // frame_ms)
+        self._pre_roll_bytes = PRE_ROLL_MS // frame_ms * self._frame_bytes
+        self._remainder = b""
+        self._pre_roll = bytearray()
+        self._speech_run = 0
+        self._silence_run = 0
+        self.speech_started = False
+        self.ended = False
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """Return a speech flag for each row of an (n, frame_samples) array."""
+        samples = frames.astype(np.float32)
+        rms = np.sqrt(np.mean(samples * samples, axis=1))
+        level_db = 20.0 * np.log10(rms / 32768.0 + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (
+            frames.shape[1] - 1
+        )
+        return (level_db > self.threshold_db) & (
+            (zcr < MAX_ZERO_CROSSING_RATE)
+            | (level_db > self.threshold_db + LOUD_MARGIN_DB)
+        )
+
+    def process(self, chunk: bytes) -> bytes:
+        """Feed a chunk of PCM and return the audio that should be sent on."""
+        if self.ended:
+            return b""
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return b""
+        frames = np.frombuffer(data, dtype="<i2", count=usable // 2).reshape(
+            -1, self._frame_samples
+        )
+        speech = self.classify(frames)
+
+        start = 0
+        if not self.speech_started:
+            runs = _run_lengths(speech, self._speech_run)
+            onsets = np.flatnonzero(runs >= MIN_SPEECH_FRAMES)
+            if not len(onsets):
+                self._speech_run = int(runs[-1])
+                self._hold_pre_roll(data[:usable])
+                return b""
+            self.speech_started = True
+            # Start sending at the first frame of the run that triggered
+            first = max(0, int(onsets[0]) - MIN_SPEECH_FRAMES + 1)
+            start = first * self._frame_bytes
+            self._hold_pre_roll(data[:start])
+            head = bytes(self._pre_roll)
+            self._pre_roll.clear()
+            speech = speech[first:]
+        else:
+            head = b""
+
+        silence_runs = _run_lengths(~speech, self._silence_run)
+        ends = np.flatnonzero(silence_runs >= self._trailing_frames)
+        if len(ends):
+            self.ended = True
+            stop = start + (int(ends[0]) + 1) * self._frame_bytes
+            return head + data[start:stop]
+        self._silence_run = int(silence_runs[-1])
+        return head + data[start:usable]
+
+    def _hold_pre_roll(self, audio: bytes) -> None:
+        """Keep the most recent pre-roll worth of audio from before the onset."""
+        self._pre_roll += audio
+        if (excess := len(self._pre_roll) - self._pre_roll_bytes) > 0:
+            del self._pre_roll[:excess]
@@ -0,0 +1,231 @@
+"""Voice catalog for STT Bridge."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+import hashlib
+import logging
+from typing import Any
+
+import aiohttp
+from homeassistant.components.tts import Voice
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+
+from .const import (
+    DEFAULT_LANGUAGES,
+    DOMAIN,
+    VOICES_REFRESH_INTERVAL,
+    VOICES_TIMEOUT,
+)
+from .exceptions import NoBackendAvailable
+from .pool import Backend, BackendPool
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _normalize_language(language: str) -> str:
+    """Return a language tag in the form HA uses (de_DE -> de-DE)."""
+    return language.replace("_", "-")
+
+
+def _parse_voices(payload: Any) -> list[tuple[str, str, str]]:
+    """Return (voice id, name, language) tuples from a /voices response."""
+    if isinstance(payload, dict):
+        payload = payload.get("voices", [])
+    voices = []
+    for item in payload or []:
+        if not isinstance(item, dict):
+            continue
+        voice_id = item.get("identifier") or item.get("id") or item.get("name")
+        language = item.get("language") or item.get("locale") or item.get("lang")
+        if not voice_id or not language:
+            continue
+        voices.append(
+            (voice_id, item.get("name") or voice_id, _normalize_language(language))
+        )
+    return voices
+
+
+class VoiceCatalog:
+    """Cached index of the voices offered by the bridge.
+
+    The catalog is fetched in the background and revalidated periodically.
+    All lookups are served from precomputed indexes and never do I/O.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: aiohttp.ClientSession,
+        pool: BackendPool,
+        token: str | None,
+        on_update: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the catalog.
+
+        on_update is called when the voices change.
+        """
+        self._hass = hass
+        self._session = session
+        self._pool = pool
+        self._token = token
+        self._on_update = on_update
+        self._etag: str | None = None
+        self._unsub_refresh: Callable[[], None] | None = None
+        self._refresh_task: asyncio.Task[None] | None = None
+        self.version: str | None = None
+        self.last_refresh: datetime | None = None
+        self._languages: list[str] = list(DEFAULT_LANGUAGES)
+        self._voices: dict[str, list[Voice]] = {}
+        self._voice_language: dict[str, str] = {}
+        self._entries: list[tuple[str, str, str]] = []
+
+    @property
+    def loaded(self) -> bool:
+        """Return if the catalog has been fetched from the bridge."""
+        return self.version is not None
+
+    @property
+    def languages(self) -> list[str]:
+        """Return the supported languages."""
+        return self._languages
+
+    @callback
+    def voices_for_language(self, language: str) -> list[Voice] | None:
+        """Return the voices available for a language."""
+        return self._voices.get(language)
+
+    @callback
+    def language_for_voice(self, voice_id: str) -> str | None:
+        """Return the language of a voice."""
+        return self._voice_language.get(voice_id)
+
+    @callback
+    def async_start(self) -> None:
+        """Fetch the catalog in the background and keep it fresh."""
+        self._refresh_task = self._hass.async_create_background_task(
+            self.async_refresh(), f"{DOMAIN} voice catalog refresh"
+        )
+        self._unsub_refresh = async_track_time_interval(
+            self._hass, self._async_scheduled_refresh, VOICES_REFRESH_INTERVAL
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop refreshing the catalog."""
+        if self._unsub_refresh is not None:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def _async_scheduled_refresh(self, _now: datetime) -> None:
+        """Refresh the catalog on the refresh interval."""
+        await self.async_refresh()
+
+    async def async_refresh(self) -> None:
+        """Revalidate the catalog with the bridge."""
+        headers = {}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+
+        async def fetch(backend: Backend) -> tuple[int, bytes, str | None]:
+            async with self._session.get(
+                f"{backend.base_url}/voices",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=VOICES_TIMEOUT),
+            ) as resp:
+                return resp.status, await resp.read(), resp.headers.get("ETag")
+
+        try:
+            status, body, etag = await self._pool.async_run(fetch)
+        except (aiohttp.ClientError, TimeoutError, NoBackendAvailable) as err:
+            _LOGGER.warning("Could not fetch voices from STT Bridge: %s", err)
+            return
+        if status == 304:
+            self.last_refresh = dt_util.utcnow()
+            return
+        if status != 200:
+            _LOGGER.warning("Could not fetch voices: HTTP %s", status)
+            return
+        try:
+            payload = json_loads(body)
+        except ValueError as err:
+            _LOGGER.warning("Invalid voices response from STT Bridge: %s", err)
+            return
+
+        self.last_refresh = dt_util.utcnow()
+        # Without an ETag the content hash tells us whether anything changed
+        version = etag or hashlib.sha256(body).hexdigest()[:16]
+        self._etag = etag
+        if version == self.version:
+            return
+        self.async_set_voices(_parse_voices(payload), version)
+        if self._on_update is not None:
+            self._on_update()
+
+    @callback
+    def async_set_voices(
+        self, voices: list[tuple[str, str, str]], version: str
+    ) -> None:
+        """Rebuild the indexes from (voice id, name, language) tuples."""
+        by_language: dict[str, list[Voice]] = {}
+        voice_language: dict[str, str] = {}
+        for voice_id, name, language in voices:
+            by_language.setdefault(language, []).append(Voice(voice_id, name))
+            voice_language[voice_id] = language
+
+        self._voices = by_language
+        self._voice_language = voice_language
+        self._entries = voices
+        self._languages = sorted(by_language) or list(DEFAULT_LANGUAGES)
+        self.version = version
+        _LOGGER.debug(
+            "Voice catalog %s: %d voices in %d languages",
+            version,
+            len(voice_language),
+            len(by_language),
+        )
+
+    @callback
+    def async_restore(self, stored: dict[str, Any]) -> None:
+        """Restore a catalog saved with as_stored, until the bridge answers."""
+        try:
+            voices = [
+                (str(voice_id), str(name), str(language))
+                for voice_id, name, language in stored["voices"]
+            ]
+            version = str(stored["version"])
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.debug("Ignoring invalid stored voice catalog")
+            return
+        self._etag = stored.get("etag")
+        self.async_set_voices(voices, version)
+
+    def as_stored(self) -> dict[str, Any] | None:
+        """Return the catalog to store, None before it was fetched."""
+        if self.version is None:
+            return None
+        return {
+            "voices": [list(entry) for entry in self._entries],
+            "version": self.version,
+            "etag": self._etag,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return catalog state for diagnostics."""
+        return {
+            "version": self.version,
+            "last_refresh": self.last_refresh.isoformat()
+            if self.last_refresh
+            else None,
+            "languages": self._languages,
+            "voice_count": len(self._voice_language),
+        }
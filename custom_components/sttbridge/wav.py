@@ -0,0 +1,118 @@
+"""WAV (RIFF) helpers for STT Bridge."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import struct
+
+# Size field used for streamed WAV output whose final length isn't known yet.
+# Players (and ffmpeg) treat this as "read until EOF".
+STREAMING_SIZE = 0xFFFFFFFF
+
+WAVE_FORMAT_PCM = 1
+
+
+class WavError(ValueError):
+    """Raised when audio from the bridge is not a WAV file we understand."""
+
+
+@dataclass(frozen=True)
+class WavFormat:
+    """Format of the PCM payload in a WAV file."""
+
+    audio_format: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+
+    @property
+    def block_align(self) -> int:
+        """Return the size of one frame (all channels) in bytes."""
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def byte_rate(self) -> int:
+        """Return the number of payload bytes per second."""
+        return self.sample_rate * self.block_align
+
+
+def parse_wav(data: bytes | bytearray | memoryview) -> tuple[WavFormat, memoryview]:
+    """Parse a WAV file and return its format and a view on the PCM payload.
+
+    The returned view shares memory with ``data``; nothing is copied.
+    """
+    view = memoryview(data)
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise WavError("Not a RIFF/WAVE file")
+
+    fmt: WavFormat | None = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset : offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if chunk_size < 16:
+                raise WavError("Truncated fmt chunk")
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from(
+                "<HHIIHH", view, body
+            )
+            fmt = WavFormat(audio_format, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise WavError("data chunk before fmt chunk")
+            # Streamed WAVs carry a placeholder size, so clamp to what we got
+            end = min(body + chunk_size, len(view))
+            return fmt, view[body:end]
+        # Chunks are word aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise WavError("No data chunk found")
+
+
+def build_wav_header(fmt: WavFormat, data_size: int = STREAMING_SIZE) -> bytes:
+    """Build a canonical 44 byte WAV header for a PCM payload of data_size bytes."""
+    if data_size == STREAMING_SIZE:
+        riff_size = STREAMING_SIZE
+    else:
+        riff_size = 36 + data_size
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        riff_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        fmt.audio_format,
+        fmt.channels,
+        fmt.sample_rate,
+        fmt.byte_rate,
+        fmt.block_align,
+        fmt.bits_per_sample,
+        b"data",
+        data_size,
+    )
+
+
+def concat_wavs(files: Iterable[bytes | bytearray | memoryview]) -> bytes:
+    """Join WAV files with identical formats into a single WAV file.
+
+    The PCM payloads are collected as memoryviews and copied once, straight
+    into the buffer of the result.
+    """
+    fmt: WavFormat | None = None
+    payloads: list[memoryview] = []
+    for data in files:
+        file_fmt, pcm = parse_wav(data)
+        if fmt is None:
+            if not file_fmt.block_align:
+                raise WavError(f"Unsupported WAV format {file_fmt}")
+            fmt = file_fmt
+        elif file_fmt != fmt:
+            raise WavError(f"Cannot join WAV files in {fmt} and {file_fmt}")
+        # A truncated last frame would shift every following sample
+        payloads.append(pcm[: len(pcm) - len(pcm) % fmt.block_align])
+    if fmt is None:
+        raise WavError("No WAV files to join")
+    size = sum(len(pcm) for pcm in payloads)
+    return b"".join([build_wav_header(fmt, size), *payloads])
@@ -0,0 +1,210 @@
+"""Pre-warmed STT WebSocket connections for STT Bridge."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+import time
+from typing import Any
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DOMAIN
+from .pool import Backend
+
+_LOGGER = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = timedelta(seconds=10)
+
+
+@dataclass
+class _IdleSocket:
+    """An upgraded WebSocket waiting for an utterance."""
+
+    ws: aiohttp.ClientWebSocketResponse
+    created: float
+    watcher: asyncio.Task[None] | None = None
+
+
+class STTWebSocketPool:
+    """Keep a few upgraded /stt/stream WebSockets to one bridge server ready.
+
+    Pooled sockets are opened without the ``?lang=`` query, so only bridges
+    taking the language from the ``start`` message can use them. Each socket
+    is used for a single utterance and replaced in the background afterwards.
+    While idle, a watcher task reads from the socket so keepalive pongs are
+    processed and a socket closed by the server is replaced right away.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: aiohttp.ClientSession,
+        backend: Backend,
+        token: str | None,
+        size: int,
+        max_idle: float,
+        ping_interval: float,
+        connect_timeout: float,
+    ) -> None:
+        """Initialize the pool."""
+        self._hass = hass
+        self._session = session
+        self._backend = backend
+        self._token = token
+        self.size = size
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self.connect_timeout = connect_timeout
+        self._idle: deque[_IdleSocket] = deque()
+        self._fill_task: asyncio.Task[None] | None = None
+        self._unsub_maintenance: Callable[[], None] | None = None
+        self.checkouts = 0
+        self.misses = 0
+
+    @callback
+    def async_start(self) -> None:
+        """Open the idle connections and start periodic maintenance."""
+        self._async_schedule_fill()
+        self._unsub_maintenance = async_track_time_interval(
+            self._hass, self._async_maintenance, MAINTENANCE_INTERVAL
+        )
+
+    async def async_stop(self) -> None:
+        """Stop maintenance and close all idle connections."""
+        if self._unsub_maintenance is not None:
+            self._unsub_maintenance()
+            self._unsub_maintenance = None
+        if self._fill_task is not None:
+            self._fill_task.cancel()
+        self.size = 0
+        while self._idle:
+            await self._async_close(self._idle.popleft())
+
+    async def async_checkout(self) -> aiohttp.ClientWebSocketResponse | None:
+        """Return a warm WebSocket, or None if none is ready."""
+        while self._idle:
+            idle = self._idle.popleft()
+            if idle.watcher is not None:
+                idle.watcher.cancel()
+                # Let the watcher leave receive() before the caller reads
+                await asyncio.wait([idle.watcher])
+            if idle.ws.closed or self._expired(idle):
+                self._hass.async_create_background_task(
+                    self._async_close(idle), f"{DOMAIN} close idle WebSocket"
+                )
+                continue
+            self.checkouts += 1
+            self._async_schedule_fill()
+            return idle.ws
+        self.misses += 1
+        self._async_schedule_fill()
+        return None
+
+    @callback
+    def async_configure(
+        self,
+        size: int,
+        max_idle: float,
+        ping_interval: float,
+        connect_timeout: float,
+    ) -> None:
+        """Change the pool settings, closing idle connections that don't fit.
+
+        Connections already checked out are left to finish their utterance.
+        """
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self.size = size
+        if ping_interval != self.ping_interval:
+            # Idle sockets keep their heartbeat, so replace them
+            self.ping_interval = ping_interval
+            size = 0
+        while len(self._idle) > size:
+            self._hass.async_create_background_task(
+                self._async_close(self._idle.pop()), f"{DOMAIN} close idle WebSocket"
+            )
+        self._async_schedule_fill()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return pool state for diagnostics."""
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "checkouts": self.checkouts,
+            "misses": self.misses,
+        }
+
+    def _expired(self, idle: _IdleSocket) -> bool:
+        """Return if an idle socket has been idle for too long."""
+        return time.monotonic() - idle.created > self.max_idle
+
+    async def _async_maintenance(self, _now: datetime) -> None:
+        """Retire old connections and top the pool up."""
+        for idle in [idle for idle in self._idle if self._expired(idle)]:
+            self._idle.remove(idle)
+            await self._async_close(idle)
+        self._async_schedule_fill()
+
+    @callback
+    def _async_schedule_fill(self) -> None:
+        """Open missing connections in the background."""
+        if len(self._idle) >= self.size:
+            return
+        if self._fill_task is None or self._fill_task.done():
+            self._fill_task = self._hass.async_create_background_task(
+                self._async_fill(), f"{DOMAIN} fill WebSocket pool"
+            )
+
+    async def _async_fill(self) -> None:
+        """Open connections until the pool is full."""
+        headers = {}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        while len(self._idle) < self.size and self._backend.breaker.available:
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout(self.connect_timeout):
+                    ws = await self._session.ws_connect(
+                        f"{self._backend.ws_url}/stt/stream",
+                        headers=headers,
+                        heartbeat=self.ping_interval,
+                    )
+            except aiohttp.WSServerHandshakeError as err:
+                # The server is up but WebSockets don't get through (e.g. a
+                # proxy), which must not open its circuit for HTTP requests
+                _LOGGER.debug("WebSocket to %s rejected: %s", self._backend, err)
+                return
+            except (aiohttp.ClientError, TimeoutError) as err:
+                # Try again on the next maintenance run
+                _LOGGER.debug("Could not pre-connect to %s: %s", self._backend, err)
+                self._backend.record_failure()
+                return
+            self._backend.record_latency(time.monotonic() - start)
+            idle = _IdleSocket(ws, time.monotonic())
+            idle.watcher = self._hass.async_create_background_task(
+                self._async_watch(idle), f"{DOMAIN} watch idle WebSocket"
+            )
+            self._idle.append(idle)
+
+    async def _async_watch(self, idle: _IdleSocket) -> None:
+        """Read from an idle socket until the server closes it."""
+        msg = await idle.ws.receive()
+        # The bridge sends nothing before "start", so this is a close or error
+        _LOGGER.debug("Idle WebSocket to %s ended: %s", self._backend, msg.type)
+        if idle in self._idle:
+            self._idle.remove(idle)
+        idle.watcher = None
+        await self._async_close(idle)
+        self._async_schedule_fill()
+
+    async def _async_close(self, idle: _IdleSocket) -> None:
+        """Close an idle socket."""
+        if idle.watcher is not None:
+            idle.watcher.cancel()
+        await idle.ws.close()